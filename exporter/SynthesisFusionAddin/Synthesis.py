@@ -23,6 +23,7 @@ from .src.UI.Toolbar import Toolbar
 # Transition: AARD-1721
 # Should attempt to fix this ordering scheme within AARD-1741
 from .src.APS import APS  # isort:skip
+from .src import BackgroundTasks  # isort:skip
 
 
 @logFailure
@@ -40,6 +41,9 @@ def run(_):
     # creates the UI elements
     register_ui()
 
+    # lets exports finish in the background and report back to the main thread
+    BackgroundTasks.registerEvents()
+
     app = adsk.core.Application.get()
     ui = app.userInterface
 
@@ -55,6 +59,9 @@ def stop(_):
     """
     unregister_all()
 
+    # waits for exports still being written or uploaded
+    BackgroundTasks.unregisterEvents()
+
     app = adsk.core.Application.get()
     ui = app.userInterface
 
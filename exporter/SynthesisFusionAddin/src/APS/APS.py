@@ -6,21 +6,28 @@ import time
 import urllib.parse
 import urllib.request
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, BinaryIO
 
 import requests
 
+from ..BackgroundTasks import showMessage
 from ..general_imports import INTERNAL_ID, gm, my_addin_path
 from ..Logging import getLogger
+from .APSClient import APSClient
+from .MultipartUpload import MultipartUpload, UploadError
 
 logger = getLogger()
 
 CLIENT_ID = "GCxaewcLjsYlK8ud7Ka9AKf9dPwMR3e4GlybyfhAK2zvl3tU"
 auth_path = os.path.abspath(os.path.join(my_addin_path, "..", ".aps_auth"))
+upload_state_path = os.path.abspath(os.path.join(my_addin_path, "..", ".aps_uploads"))
 
 APS_AUTH = None
 APS_USER_INFO = None
 
+# Shared by every APS request, so connections and looked up ids are reused between uploads
+client = APSClient()
+
 
 @dataclass
 class APSAuth:
@@ -103,6 +110,8 @@ def convertAuthToken(code: str):
         pickle.dump(APS_AUTH, f)
         f.close()
 
+    # Ids looked up for another account may not be accessible anymore
+    client.ids.invalidate()
     _ = loadUserInfo()
 
 
@@ -110,6 +119,7 @@ def removeAuth():
     global APS_AUTH, APS_USER_INFO
     APS_AUTH = None
     APS_USER_INFO = None
+    client.ids.invalidate()
     pathlib.Path.unlink(pathlib.Path(auth_path))
 
 
@@ -145,7 +155,7 @@ def refreshAuthToken():
     except urllib.request.HTTPError as e:
         removeAuth()
         logger.error(f"Refresh Error:\n{e.code} - {e.reason}")
-        gm.ui.messageBox("Please sign in again.")
+        showMessage("Please sign in again.")
 
 
 def loadUserInfo() -> APSUserInfo | None:
@@ -177,7 +187,7 @@ def loadUserInfo() -> APSUserInfo | None:
     except urllib.request.HTTPError as e:
         removeAuth()
         logger.error(f"User Info Error:\n{e.code} - {e.reason}")
-        gm.ui.messageBox("Please sign in again.")
+        showMessage("Please sign in again.")
 
 
 def getUserInfo() -> APSUserInfo | None:
@@ -212,14 +222,15 @@ def create_folder(auth: str, project_id: str, parent_folder_id: str, folder_disp
         },
     }
 
-    res = requests.post(
+    res = client.session.post(
         f"https://developer.api.autodesk.com/data/v1/projects/{project_id}/folders", headers=headers, json=data
     )
     if not res.ok:
-        gm.ui.messageBox(f"Failed to create new folder: {res.text}", "ERROR")
+        showMessage(f"Failed to create new folder: {res.text}", "ERROR")
         return None
     json: dict[str, Any] = res.json()
     id: str = json["data"]["id"]
+    client.ids.put(("item", project_id, parent_folder_id, folder_display_name, "folders"), id)
     return id
 
 
@@ -227,7 +238,9 @@ def file_path_to_file_name(file_path: str) -> str:
     return file_path.split("/").pop()
 
 
-def upload_mirabuf(project_id: str, folder_id: str, file_name: str, file_contents: str) -> str | None:
+def upload_mirabuf(
+    project_id: str, folder_id: str, file_name: str, file_contents: bytes | BinaryIO, resume_key: str | None = None
+) -> str | None:
     """
     uploads mirabuf file to a specific folder in an APS project
     the folder and project must be created and valid
@@ -237,6 +250,7 @@ def upload_mirabuf(project_id: str, folder_id: str, file_name: str, file_content
     project - the project reference object, used for it's id ; may be changed to project_id in the future
     folder - the folder reference object, used for it's id ; may be changed to folder_id in the future
     file_path - the path to the file on your machine, to be uploaded to APS
+    resume_key - identifies what the file was made from, a failed upload is finished by the next one with the same key
 
     returns:
     success - if the file already exists, the new version id, otherwise, None
@@ -258,7 +272,7 @@ def upload_mirabuf(project_id: str, folder_id: str, file_name: str, file_content
     # data:create
     global APS_AUTH
     if APS_AUTH is None:
-        gm.ui.messageBox("You must login to upload designs to APS", "USER ERROR")
+        showMessage("You must login to upload designs to APS", "USER ERROR")
     auth = APS_AUTH.access_token
     # Get token from APS API later
 
@@ -270,37 +284,51 @@ def upload_mirabuf(project_id: str, folder_id: str, file_name: str, file_content
     (lineage_id, file_id, file_version) = get_file_id(auth, project_id, folder_id, file_name)
 
     """
-    Create APS Storage Location
-    """
-    object_id = create_storage_location(auth, project_id, folder_id, file_name)
-    if object_id is None:
-        gm.ui.messageBox("UPLOAD ERROR", "Object id is none; check create storage location")
-        return None
-    (prefix, object_key) = str(object_id).split("/", 1)
-    bucket_key = prefix.split(":", 3)[3]  # gets the last element smth like: wip.dm.prod
-
-    """
-    Create Signed URL For APS Upload
+    Upload to an APS Storage Location, resuming a previous failed upload of the same file
     """
-    generate_signed_url_result = generate_signed_url(auth, bucket_key, object_key)
-    if generate_signed_url_result is None:
-        return None
 
-    (upload_key, signed_url) = generate_signed_url_result
-    if upload_file(signed_url, file_contents) is None:
+    def log_progress(uploaded: int, total: int) -> None:
+        logger.debug(f"Uploaded {uploaded} of {total} bytes")
+
+    upload = MultipartUpload(
+        auth,
+        file_contents,
+        f"{project_id}/{folder_id}/{file_name}",
+        upload_state_path,
+        onProgress=log_progress,
+        session=client.session,
+        resumeKey=resume_key,
+    )
+    try:
+        object_id = upload.run(lambda: create_storage_location(auth, project_id, folder_id, file_name))
+    except (UploadError, requests.RequestException) as e:
+        # The cached folder may have been removed on APS, look it up again next time
+        client.ids.invalidate()
+        logger.error(f"Failed to upload {file_name}: {e}")
+        showMessage(f"UPLOAD ERROR: {e}", "Failed to upload to APS")
         return None
 
     """
-    Finish Upload and Initialize File Version
+    Initialize File Version
     """
-    if complete_upload(auth, upload_key, object_key, bucket_key) is None:
-        return None
+    file_key = ("file", project_id, folder_id, file_name)
     if file_id != "":
-        update_file_version(
+        new_id = update_file_version(
             auth, project_id, folder_id, lineage_id, file_id, file_name, file_contents, file_version, object_id
         )
+        if new_id is not None:
+            client.ids.put(file_key, (lineage_id, new_id, str(int(file_version) + 1)))
+        else:
+            client.ids.invalidate()
     else:
-        _lineage_info = create_first_file_version(auth, str(object_id), project_id, str(folder_id), file_name)
+        lineage_info = create_first_file_version(auth, str(object_id), project_id, str(folder_id), file_name)
+        if lineage_info is None:
+            client.ids.invalidate()
+        elif lineage_info[1] is None:
+            # The version id wasn't in the response, so the file is looked up again next time
+            client.ids.invalidate(file_key)
+        else:
+            client.ids.put(file_key, (lineage_info[0], lineage_info[1], "1"))
     return ""
 
 
@@ -317,15 +345,20 @@ def get_hub_id(auth: str, hub_name: str) -> str | None:
     failure - the API text if there's an error
     """
 
+    cached = client.ids.get(("hub", hub_name))
+    if cached is not None:
+        return cached
+
     headers = {"Authorization": f"Bearer {auth}"}
-    hub_list_res = requests.get("https://developer.api.autodesk.com/project/v1/hubs", headers=headers)
+    hub_list_res = client.session.get("https://developer.api.autodesk.com/project/v1/hubs", headers=headers)
     if not hub_list_res.ok:
-        gm.ui.messageBox("UPLOAD ERROR", f"Failed to retrieve hubs: {hub_list_res.text}")
+        showMessage("UPLOAD ERROR", f"Failed to retrieve hubs: {hub_list_res.text}")
         return None
     hub_list: list[dict[str, Any]] = hub_list_res.json()
     for hub in hub_list:
         if hub["attributes"]["name"] == hub_name:
             id: str = hub["id"]
+            client.ids.put(("hub", hub_name), id)
             return id
     return ""
 
@@ -347,35 +380,46 @@ def get_project_id(auth: str, hub_id: str, project_name: str) -> str | None:
     - a hub_id can be derived from it's name with the get_hub_id function
     """
 
+    cached = client.ids.get(("project", hub_id, project_name))
+    if cached is not None:
+        return cached
+
     headers = {"Authorization": f"Bearer {auth}"}
-    project_list_res = requests.get(
+    project_list_res = client.session.get(
         f"https://developer.api.autodesk.com/project/v1/hubs/{hub_id}/projects", headers=headers
     )
     if not project_list_res.ok:
-        gm.ui.messageBox("UPLOAD ERROR", f"Failed to retrieve hubs: {project_list_res.text}")
+        showMessage("UPLOAD ERROR", f"Failed to retrieve hubs: {project_list_res.text}")
         return None
     project_list: list[dict[str, Any]] = project_list_res.json()
     for project in project_list:
         if project["attributes"]["name"] == project_name:
             id: str = project["id"]
+            client.ids.put(("project", hub_id, project_name), id)
             return id
     return ""
 
 
 def get_item_id(auth: str, project_id: str, parent_folder_id: str, folder_name: str, item_type: str) -> str | None:
+    key = ("item", project_id, parent_folder_id, folder_name, item_type)
+    cached = client.ids.get(key)
+    if cached is not None:
+        return cached
+
     headers = {"Authorization": f"Bearer {auth}"}
-    res = requests.get(
+    res = client.session.get(
         f"https://developer.api.autodesk.com/data/v1/projects/{project_id}/folders/{parent_folder_id}/contents",
         headers=headers,
     )
     if not res.ok:
-        gm.ui.messageBox(f"Failed to get item: {res.text}")
+        showMessage(f"Failed to get item: {res.text}")
         return None
     data: list[dict[str, Any]] = res.json()["data"]
     if len(data) == 0:
         return ""
     for item in data:
         if item["type"] == item_type and item["attributes"]["name"] == folder_name:
+            client.ids.put(key, item["id"])
             return item["id"]
     return None
 
@@ -452,13 +496,13 @@ def update_file_version(
         "jsonapi": {"version": "1.0"},
         "data": {"type": "versions", "attributes": attributes, "relationships": relationships},
     }
-    update_res = requests.post(
+    update_res = client.session.post(
         f"https://developer.api.autodesk.com/data/v1/projects/{project_id}/versions", headers=headers, json=data
     )
     if not update_res.ok:
-        gm.ui.messageBox(f"UPLOAD ERROR:\n{update_res.text}", "Updating file to new version failed")
+        showMessage(f"UPLOAD ERROR:\n{update_res.text}", "Updating file to new version failed")
         return None
-    gm.ui.messageBox(
+    showMessage(
         f"Successfully updated file {file_name} to version {int(curr_file_version) + 1} on APS", "UPLOAD SUCCESS"
     )
     new_id: str = update_res.json()["data"]["id"]
@@ -486,11 +530,16 @@ def get_file_id(auth: str, project_id: str, folder_id: str, file_name: str) -> t
     - checking if a file exists is an intended use-case
     """
 
+    key = ("file", project_id, folder_id, file_name)
+    cached = client.ids.get(key)
+    if cached is not None:
+        return cached
+
     headers: dict[str, str] = {"Authorization": f"Bearer {auth}"}
 
     params = {"filter[attributes.name]": file_name}
 
-    file_res = requests.get(
+    file_res = client.session.get(
         f"https://developer.api.autodesk.com/data/v1/projects/{project_id}/folders/{folder_id}/search",
         headers=headers,
         params=params,
@@ -498,7 +547,7 @@ def get_file_id(auth: str, project_id: str, folder_id: str, file_name: str) -> t
     if file_res.status_code == 404:
         return ("", "", "")
     elif not file_res.ok:
-        gm.ui.messageBox(f"UPLOAD ERROR: {file_res.text}", "Failed to get file")
+        showMessage(f"UPLOAD ERROR: {file_res.text}", "Failed to get file")
         return None
     file_json: list[dict[str, Any]] = file_res.json()
     if len(file_json["data"]) == 0:
@@ -506,6 +555,7 @@ def get_file_id(auth: str, project_id: str, folder_id: str, file_name: str) -> t
     id: str = str(file_json["data"][0]["id"])
     lineage: str = str(file_json["data"][0]["relationships"]["item"]["data"]["id"])
     version: str = str(file_json["data"][0]["attributes"]["versionNumber"])
+    client.ids.put(key, (lineage, id, version))
     return (lineage, id, version)
 
 
@@ -543,107 +593,20 @@ def create_storage_location(auth: str, project_id: str, folder_id: str, file_nam
         "Authorization": f"Bearer {auth}",
         "Content-Type": "application/vnd.api+json",
     }
-    storage_location_res = requests.post(
+    storage_location_res = client.session.post(
         f"https://developer.api.autodesk.com/data/v1/projects/{project_id}/storage", json=data, headers=headers
     )
     if not storage_location_res.ok:
-        gm.ui.messageBox(f"UPLOAD ERROR: {storage_location_res.text}", f"Failed to create storage location")
+        showMessage(f"UPLOAD ERROR: {storage_location_res.text}", f"Failed to create storage location")
         return None
     storage_location_json: dict[str, Any] = storage_location_res.json()
     object_id: str = storage_location_json["data"]["id"]
     return object_id
 
 
-def generate_signed_url(auth: str, bucket_key: str, object_key: str) -> tuple[str, str] | None:
-    """
-    generates a signed_url for a bucket, given a bucket_key and object_key
-
-    params:
-    auth - authorization token
-    bucket_key - the key of the bucket that the file will be stored in
-    object_key - the key of the object that the file will be stored in
-
-    returns:
-    success - the upload_key and the signed_url
-    failure - the API error
-
-    notes:
-    - fails if auth, the bucket, or object keys are invalid
-    - both params are returned by the create_storage_location function
-    """
-
-    headers = {
-        "Authorization": f"Bearer {auth}",
-    }
-    signed_url_res = requests.get(
-        f"https://developer.api.autodesk.com/oss/v2/buckets/{bucket_key}/objects/{object_key}/signeds3upload",
-        headers=headers,
-    )
-    if not signed_url_res.ok:
-        gm.ui.messageBox(f"UPLOAD ERROR: {signed_url_res.text}", "Failed to get signed url")
-        return None
-    signed_url_json: dict[str, str] = signed_url_res.json()
-    return (signed_url_json["uploadKey"], signed_url_json["urls"][0])
-
-
-def upload_file(signed_url: str, file_contents: str) -> str | None:
-    """
-    uploads a file to APS given a signed_url a path to the file on your machine
-
-    params:
-    signed_url - the url to used to upload the file to a specific bucket ; returned by the generate_signed_url function
-    file_path - the path of the file to be uploaded
-
-    returns:
-    success - none
-    failure - the API error
-
-    notes:
-    - fails if the auth or the signed URL are invalid
-    """
-    upload_response = requests.put(url=signed_url, data=file_contents)
-    if not upload_response.ok:
-        gm.ui.messageBox("UPLOAD ERROR", f"Failed to upload to signed url: {upload_response.text}")
-        return None
-    return ""
-
-
-def complete_upload(auth: str, upload_key: str, object_key: str, bucket_key: str) -> str | None:
-    """
-    completes and verifies the APS file upload given the upload_key
-
-    params:
-    auth - authorization token
-    upload_key - the key to verify the upload, returned by generate_signed_url function
-    bucket_key - the key of the bucket that the file was uploaded to, returned by the create_storage_location function
-
-    returns:
-    success - none
-    failure - the API error
-    """
-
-    headers = {
-        "Authorization": f"Bearer {auth}",
-        "Content-Type": "application/json",
-    }
-    data = {"uploadKey": upload_key}
-
-    completed_res = requests.post(
-        f"https://developer.api.autodesk.com/oss/v2/buckets/{bucket_key}/objects/{object_key}/signeds3upload",
-        json=data,
-        headers=headers,
-    )
-    if not completed_res.ok:
-        gm.ui.messageBox(
-            f"UPLOAD ERROR: {completed_res.text}\n{completed_res.status_code}", "Failed to complete upload"
-        )
-        return None
-    return ""
-
-
 def create_first_file_version(
     auth: str, object_id: str, project_id: str, folder_id: str, file_name: str
-) -> tuple[str, str] | None:
+) -> tuple[str, str | None] | None:
     """
     initializes versioning for a file
 
@@ -655,7 +618,8 @@ def create_first_file_version(
     file_name - the name of the file
 
     returns:
-    success - the lineage id of the versioning history of the file and the href to the new version
+    success - the lineage id of the versioning history of the file and the id of its first version, or None if
+    the response didn't include the version
     failure - none
 
     potential causes of failure
@@ -703,17 +667,19 @@ def create_first_file_version(
         "included": included,
     }
 
-    first_version_res = requests.post(
+    first_version_res = client.session.post(
         f"https://developer.api.autodesk.com/data/v1/projects/{project_id}/items", json=data, headers=headers
     )
     if not first_version_res.ok:
-        gm.ui.messageBox(f"Failed to create first file version: {first_version_res.text}", "UPLOAD ERROR")
+        showMessage(f"Failed to create first file version: {first_version_res.text}", "UPLOAD ERROR")
         return None
     first_version_json: dict[str, Any] = first_version_res.json()
 
     lineage_id: str = first_version_json["data"]["id"]
-    href: str = first_version_json["links"]["self"]["href"]
+    # The version is included in the response the same way it was included in the request
+    versions = [entry for entry in first_version_json.get("included", []) if entry.get("type") == "versions"]
+    version_id: str | None = versions[0]["id"] if versions else None
 
-    gm.ui.messageBox(f"Successful Upload of {file_name} to APS", "UPLOAD SUCCESS")
+    showMessage(f"Successful Upload of {file_name} to APS", "UPLOAD SUCCESS")
 
-    return (lineage_id, href)
+    return (lineage_id, version_id)
@@ -0,0 +1,101 @@
+"""Shared HTTP session and id cache for APS requests.
+
+Every APS request used to go through its own `requests` call, so each one paid for a new connection and TLS
+handshake, and every upload looked up the same hub, project, folder and file ids again. The client keeps a single
+pooled keep-alive session, and remembers those ids for a while so repeated uploads of a design only make the
+storage and version requests.
+
+This module intentionally has no Fusion dependencies so it can be used from worker threads and tools.
+"""
+
+import threading
+import time
+from typing import Callable, Hashable, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+T = TypeVar("T")
+
+# Connections kept open per host, enough for every part of a parallel upload
+POOL_SIZE = 8
+
+# Ids are cached this long, a folder or file removed on APS in the meantime fails at most one upload
+ID_CACHE_TTL = 10 * 60
+
+# Idempotent requests that fail because APS is busy or briefly unavailable are retried this many times
+MAX_RETRIES = 2
+
+
+class TTLCache:
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        """Creates a thread safe cache whose entries expire `ttl` seconds after they were stored"""
+        self.ttl = ttl
+        self.clock = clock
+        self.entries: dict[Hashable, tuple[float, any]] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < self.clock():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: any) -> None:
+        with self.lock:
+            self.entries[key] = (self.clock() + self.ttl, value)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Removes an entry, or every entry if no key is given"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def getOrFetch(self, key: Hashable, fetch: Callable[[], T]) -> T:
+        """Gets a cached value, or fetches and caches it. Empty results like `None` or `""` aren't cached."""
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            if value:
+                self.put(key, value)
+
+        return value
+
+
+class APSClient:
+    def __init__(self, poolSize: int = POOL_SIZE, idTtl: float = ID_CACHE_TTL):
+        """Creates the shared session
+
+        Args:
+            poolSize (int): connections kept open per host
+            idTtl (float): seconds ids are cached for
+        """
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=("GET",),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=poolSize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # ("hub" | "project" | "item" | "file", *lookup arguments) -> id
+        self.ids = TTLCache(idTtl)
+
+    def close(self) -> None:
+        self.session.close()
+        self.ids.invalidate()
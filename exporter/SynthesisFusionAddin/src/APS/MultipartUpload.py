@@ -0,0 +1,393 @@
+"""Resumable, parallel multipart uploads to APS Object Storage.
+
+The file is split into parts which are uploaded in parallel through signed S3 urls, requested in batches from the
+`signeds3upload` API, and retried with a backoff when they fail.
+
+Uploads given a resume key can be resumed. Every export makes different bytes, new GUIDs and a new thumbnail, so
+the key names what the file was made from instead, like the saved version of a document and the export options.
+Progress is saved to disk after every part under the target and the key, and a copy of the file is kept next to
+it. Uploading to the same target with the same key after a failure sends the missing parts of the kept copy,
+for as long as APS keeps the upload open, and the new file is dropped since it was made from the same inputs.
+
+This module intentionally has no Fusion dependencies, see `tools/apsUploadStandIn.py` for a local stand-in of the
+APS endpoints it uses.
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import BinaryIO, Callable
+
+import requests
+
+from ..Logging import getLogger
+
+logger = getLogger()
+
+APS_BASE_URL = "https://developer.api.autodesk.com"
+
+# S3 requires every part but the last to be at least 5 MB
+PART_SIZE = 8 * 1024 * 1024
+MAX_WORKERS = 4
+
+# Most urls `signeds3upload` hands out per request
+MAX_URLS_PER_REQUEST = 25
+URL_LIFETIME_MINUTES = 60
+
+MAX_ATTEMPTS = 4
+RETRY_DELAY = 1.0
+REQUEST_TIMEOUT = 60
+
+# APS keeps multipart uploads open for 24 hours, saved progress older than that can't be resumed
+UPLOAD_LIFETIME = 24 * 60 * 60
+
+
+class UploadError(Exception):
+    pass
+
+
+@dataclass
+class UploadState:
+    contentHash: str
+    target: str
+    objectId: str
+    partSize: int
+    uploadKey: str | None = None
+    uploadExpiration: float = 0.0
+    completedParts: list[int] = field(default_factory=list)
+
+
+def splitObjectId(objectId: str) -> tuple[str, str]:
+    """Splits an object id like `urn:adsk.objects:os.object:wip.dm.prod/name.mira` into its bucket and object key"""
+    prefix, objectKey = objectId.split("/", 1)
+    return prefix.split(":", 3)[3], objectKey
+
+
+def _partRanges(parts: list[int], maxCount: int) -> list[tuple[int, int]]:
+    """Groups sorted part numbers into (first part, count) runs of consecutive parts"""
+    ranges: list[tuple[int, int]] = []
+    for part in parts:
+        if ranges and ranges[-1][0] + ranges[-1][1] == part and ranges[-1][1] < maxCount:
+            ranges[-1] = (ranges[-1][0], ranges[-1][1] + 1)
+        else:
+            ranges.append((part, 1))
+
+    return ranges
+
+
+class MultipartUpload:
+    def __init__(
+        self,
+        auth: str,
+        payload: bytes | BinaryIO,
+        target: str,
+        stateDirectory: str,
+        baseUrl: str = APS_BASE_URL,
+        partSize: int = PART_SIZE,
+        maxWorkers: int = MAX_WORKERS,
+        onProgress: Callable[[int, int], None] | None = None,
+        session: requests.Session | None = None,
+        resumeKey: str | None = None,
+    ):
+        """Prepares a file to be uploaded
+
+        Args:
+            auth (str): APS access token
+            payload (bytes | BinaryIO): contents of the file, a stream must be seekable
+            target (str): where the file is uploaded to, saved progress is only resumed for the same target
+            stateDirectory (str): directory progress is saved in
+            baseUrl (str): APS endpoint
+            partSize (int): size of every part but the last
+            maxWorkers (int): number of parts uploaded at once
+            onProgress (Callable[[int, int], None] | None): called on the calling thread with the uploaded and total
+                number of bytes whenever a part finishes
+            session (requests.Session | None): session to reuse connections from, its pool should be at least
+                `maxWorkers` large, a new one is made if none is given
+            resumeKey (str | None): identifies what the file was made from, files with the same key are
+                interchangeable. Without one progress isn't saved and a failed upload starts over.
+        """
+        self.auth = auth
+        self.payload = io.BytesIO(payload) if isinstance(payload, (bytes, bytearray)) else payload
+        self.target = target
+        self.stateDirectory = stateDirectory
+        self.baseUrl = baseUrl
+        self.partSize = partSize
+        self.maxWorkers = maxWorkers
+        self.onProgress = onProgress
+
+        self.session = session
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=maxWorkers)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+
+        # Guards reads of the payload, and changes to and saves of the state, from the worker threads
+        self.lock = threading.Lock()
+
+        # Names the saved progress and kept copy of the file
+        self.stateKey = hashlib.sha256(f"{target}\n{resumeKey}".encode()).hexdigest() if resumeKey else None
+
+        self.size = 0
+        self.state: UploadState | None = None
+
+    def run(self, createObject: Callable[[], str | None]) -> str:
+        """Uploads the file, resuming saved progress if there is any
+
+        Args:
+            createObject (Callable[[], str | None]): creates the storage object to upload to and returns its id,
+                only called if there is no upload to resume
+
+        Returns:
+            str: id of the uploaded object
+
+        Raises:
+            UploadError: if the upload failed, progress up to that point is saved if there is a resume key
+        """
+        self._pruneStates()
+        keptPayload = self._loadState()
+        try:
+            return self._run(createObject)
+        finally:
+            if keptPayload is not None:
+                keptPayload.close()
+
+    def _run(self, createObject: Callable[[], str | None]) -> str:
+        state = self.state
+        if state is None:
+            contentHash = self._hashPayload()
+            objectId = createObject()
+            if objectId is None:
+                raise UploadError("Object id is none; check create storage location")
+
+            state = self.state = UploadState(contentHash, self.target, objectId, self.partSize)
+            self._keepPayload()
+
+        partCount = max(1, math.ceil(self.size / self.partSize))
+        if state.completedParts:
+            logger.info(f"Resuming upload with {len(state.completedParts)} of {partCount} parts done")
+
+        bucketKey, objectKey = splitObjectId(state.objectId)
+        pending = [part for part in range(1, partCount + 1) if part not in state.completedParts]
+        self._reportProgress()
+
+        with ThreadPoolExecutor(self.maxWorkers, thread_name_prefix="SynthesisUpload") as executor:
+            futures = {}
+            for firstPart, count in _partRanges(pending, MAX_URLS_PER_REQUEST):
+                urls = self._signedUrls(bucketKey, objectKey, firstPart, count)
+                for i, url in enumerate(urls):
+                    part = firstPart + i
+                    futures[executor.submit(self._uploadPart, bucketKey, objectKey, part, url)] = part
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                failed = [future for future in done if future.exception() is not None]
+                if failed:
+                    for remaining in futures:
+                        remaining.cancel()
+
+                    # Parts that are already being sent still count towards a resumed upload
+                    wait(futures)
+                    done = set(futures)
+
+                # A worker can save the state at the same time when it gets a new upload key
+                with self.lock:
+                    for future in done:
+                        part = futures.pop(future)
+                        if not future.cancelled() and future.exception() is None:
+                            state.completedParts.append(part)
+
+                    self._saveState()
+
+                self._reportProgress()
+
+                if failed:
+                    raise failed[0].exception()
+
+        self._complete(bucketKey, objectKey)
+        self._deleteState()
+        return state.objectId
+
+    def _hashPayload(self) -> str:
+        hasher = hashlib.sha256()
+        self.payload.seek(0)
+        self.size = 0
+        while chunk := self.payload.read(self.partSize):
+            hasher.update(chunk)
+            self.size += len(chunk)
+
+        return hasher.hexdigest()
+
+    def _readPart(self, part: int) -> bytes:
+        with self.lock:
+            self.payload.seek((part - 1) * self.partSize)
+            return self.payload.read(self.partSize)
+
+    def _reportProgress(self) -> None:
+        if self.onProgress is not None:
+            completed = self.state.completedParts
+            lastPart = math.ceil(self.size / self.partSize)
+            uploaded = sum(
+                self.size - (part - 1) * self.partSize if part == lastPart else self.partSize for part in completed
+            )
+            self.onProgress(uploaded, self.size)
+
+    def _signedUrlEndpoint(self, bucketKey: str, objectKey: str) -> str:
+        return f"{self.baseUrl}/oss/v2/buckets/{bucketKey}/objects/{objectKey}/signeds3upload"
+
+    def _signedUrls(self, bucketKey: str, objectKey: str, firstPart: int, count: int) -> list[str]:
+        """Requests signed urls for a run of parts, starting a new multipart upload if there is none yet"""
+        params = {"firstPart": firstPart, "parts": count, "minutesExpiration": URL_LIFETIME_MINUTES}
+        with self.lock:
+            if self.state.uploadKey is not None:
+                params["uploadKey"] = self.state.uploadKey
+
+        res = self.session.get(
+            self._signedUrlEndpoint(bucketKey, objectKey),
+            params=params,
+            headers={"Authorization": f"Bearer {self.auth}"},
+            timeout=REQUEST_TIMEOUT,
+        )
+        if not res.ok:
+            raise UploadError(f"Failed to get signed urls: {res.status_code} {res.text}")
+
+        body = res.json()
+        with self.lock:
+            if self.state.uploadKey is None:
+                self.state.uploadKey = body["uploadKey"]
+                expiration = body.get("uploadExpiration")
+                self.state.uploadExpiration = (
+                    datetime.fromisoformat(expiration.replace("Z", "+00:00")).timestamp()
+                    if expiration
+                    else time.time() + UPLOAD_LIFETIME
+                )
+                self._saveState()
+
+        return body["urls"]
+
+    def _uploadPart(self, bucketKey: str, objectKey: str, part: int, url: str) -> None:
+        data = self._readPart(part)
+        error = ""
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt > 0:
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+            try:
+                res = self.session.put(url, data=data, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                error = str(e)
+                continue
+
+            if res.ok:
+                return
+
+            error = f"{res.status_code} {res.text}"
+            if res.status_code == 403:
+                # The signed url expired while waiting for a worker
+                url = self._signedUrls(bucketKey, objectKey, part, 1)[0]
+            elif res.status_code < 500 and res.status_code != 429:
+                break
+
+        raise UploadError(f"Failed to upload part {part}: {error}")
+
+    def _complete(self, bucketKey: str, objectKey: str) -> None:
+        res = self.session.post(
+            self._signedUrlEndpoint(bucketKey, objectKey),
+            json={"uploadKey": self.state.uploadKey},
+            headers={"Authorization": f"Bearer {self.auth}", "Content-Type": "application/json"},
+            timeout=REQUEST_TIMEOUT,
+        )
+        if not res.ok:
+            raise UploadError(f"Failed to complete upload: {res.status_code} {res.text}")
+
+    def _statePath(self) -> str:
+        return os.path.join(self.stateDirectory, f"{self.stateKey}.json")
+
+    def _payloadPath(self) -> str:
+        return os.path.join(self.stateDirectory, f"{self.stateKey}.payload")
+
+    def _loadState(self) -> BinaryIO | None:
+        """Picks up saved progress and switches to the kept copy of the file it belongs to
+
+        Returns:
+            BinaryIO | None: the kept copy of the file if the upload is resumed, to be closed once it's done
+        """
+        if self.stateKey is None:
+            return None
+
+        try:
+            with open(self._statePath(), "r") as f:
+                state = UploadState(**json.load(f))
+
+            keptPayload = open(self._payloadPath(), "rb")
+        except (OSError, ValueError, TypeError):
+            return None
+
+        # Parts can only be resumed into the same upload, split the same way
+        resumable = (
+            state.target == self.target
+            and state.partSize == self.partSize
+            and state.uploadKey is not None
+            and state.uploadExpiration >= time.time() + 60 * URL_LIFETIME_MINUTES
+        )
+
+        payload, self.payload = self.payload, keptPayload
+        if not resumable or self._hashPayload() != state.contentHash:
+            keptPayload.close()
+            self.payload = payload
+            return None
+
+        self.state = state
+        return keptPayload
+
+    def _keepPayload(self) -> None:
+        """Copies the file next to the saved progress, so a later upload with the same key can finish it"""
+        if self.stateKey is None:
+            return
+
+        os.makedirs(self.stateDirectory, exist_ok=True)
+        path = self._payloadPath()
+        self.payload.seek(0)
+        with open(f"{path}.tmp", "wb") as f:
+            shutil.copyfileobj(self.payload, f)
+
+        os.replace(f"{path}.tmp", path)
+
+    def _saveState(self) -> None:
+        """Saves the progress of the upload, with `self.lock` held so only one thread writes the file at a time"""
+        if self.stateKey is None:
+            return
+
+        os.makedirs(self.stateDirectory, exist_ok=True)
+        path = self._statePath()
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(asdict(self.state), f)
+
+        os.replace(f"{path}.tmp", path)
+
+    def _deleteState(self) -> None:
+        if self.stateKey is None:
+            return
+
+        for path in (self._statePath(), self._payloadPath()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _pruneStates(self) -> None:
+        if not os.path.isdir(self.stateDirectory):
+            return
+
+        for name in os.listdir(self.stateDirectory):
+            path = os.path.join(self.stateDirectory, name)
+            if time.time() - os.path.getmtime(path) > UPLOAD_LIFETIME:
+                os.remove(path)
@@ -0,0 +1,147 @@
+"""Runs work off of Fusion's main thread and reports back to it.
+
+The Fusion API may only be used from the main thread, and anything slow done there freezes the UI. Work that
+doesn't need Fusion, like writing or uploading a finished export, runs on a background thread instead. Whenever it
+needs the main thread again, for example to show a message, it fires a Fusion custom event whose handler runs the
+callback on the main thread.
+
+Until `registerEvents` is called, for example outside of the add-in, callbacks and tasks just run right away on the
+calling thread.
+"""
+
+import threading
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+import adsk.core
+
+from .general_imports import gm
+from .Logging import getLogger, logFailure
+from .strings import INTERNAL_ID
+
+logger = getLogger()
+
+MAIN_THREAD_EVENT = f"{INTERNAL_ID}MainThreadCallback"
+
+# Callbacks waiting for the custom event to run them on the main thread, by the id passed along with the event
+_pendingCallbacks: dict[str, Callable[[], None]] = {}
+_lock = threading.Lock()
+
+_event: adsk.core.CustomEvent | None = None
+
+# Tasks run one after another so exports of the same design are uploaded in the order they were started
+_executor: ThreadPoolExecutor | None = None
+
+
+class MainThreadCallbackHandler(adsk.core.CustomEventHandler):
+    def __init__(self):
+        super().__init__()
+
+    @logFailure(messageBox=True)
+    def notify(self, args: adsk.core.CustomEventArgs) -> None:
+        with _lock:
+            callback = _pendingCallbacks.pop(args.additionalInfo, None)
+
+        if callback is not None:
+            callback()
+
+
+def registerEvents() -> None:
+    """Registers the custom event used to get back onto the main thread, called when the add-in starts"""
+    global _event, _executor
+    app = adsk.core.Application.get()
+    app.unregisterCustomEvent(MAIN_THREAD_EVENT)
+
+    _event = app.registerCustomEvent(MAIN_THREAD_EVENT)
+    handler = MainThreadCallbackHandler()
+    _event.add(handler)
+    gm.handlers.append(handler)
+
+    _executor = ThreadPoolExecutor(1, thread_name_prefix="SynthesisBackground")
+
+
+def unregisterEvents() -> None:
+    """Waits for running tasks and removes the custom event, called when the add-in stops"""
+    global _event, _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+    if _event is not None:
+        adsk.core.Application.get().unregisterCustomEvent(MAIN_THREAD_EVENT)
+        _event = None
+
+    with _lock:
+        _pendingCallbacks.clear()
+
+
+def isMainThread() -> bool:
+    return threading.current_thread() is threading.main_thread()
+
+
+def callOnMainThread(callback: Callable[[], None]) -> None:
+    """Runs a callback on the main thread, right away if this already is the main thread
+
+    Args:
+        callback (Callable[[], None]): function that may use the Fusion API
+    """
+    if isMainThread() or _event is None:
+        callback()
+        return
+
+    deferToMainThread(callback)
+
+
+def deferToMainThread(callback: Callable[[], None]) -> None:
+    """Runs a callback on the main thread once it is idle, even when called from the main thread
+
+    Lets long work on the main thread run in small steps with the UI handling its events in between.
+
+    Args:
+        callback (Callable[[], None]): function that may use the Fusion API
+    """
+    if _event is None:
+        callback()
+        return
+
+    callbackId = uuid.uuid4().hex
+    with _lock:
+        _pendingCallbacks[callbackId] = callback
+
+    adsk.core.Application.get().fireCustomEvent(MAIN_THREAD_EVENT, callbackId)
+
+
+def showMessage(message: str, title: str = "") -> None:
+    """Shows a message box from any thread, messages from background threads are shown once the main thread is idle"""
+    callOnMainThread(lambda: gm.ui.messageBox(message, title))
+
+
+def runInBackground(name: str, task: Callable[[], None]) -> Future:
+    """Runs a task on the background thread after the ones started before it
+
+    Failures are logged and shown in a message box, the task should report anything else it needs to itself.
+
+    Args:
+        name (str): what the task does, used in log messages
+        task (Callable[[], None]): work that doesn't use the Fusion API, see `callOnMainThread` for anything that does
+
+    Returns:
+        Future: finishes when the task did
+    """
+
+    def run() -> None:
+        try:
+            task()
+        except BaseException:
+            logger.error(f"{name} failed:\n{traceback.format_exc()}")
+            showMessage(f"{name} failed:\n{traceback.format_exc(limit=-3)}", "Synthesis: Error")
+
+    if _executor is None:
+        future: Future = Future()
+        run()
+        future.set_result(None)
+        return future
+
+    return _executor.submit(run)
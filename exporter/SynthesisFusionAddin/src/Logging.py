@@ -9,8 +9,6 @@ import traceback
 from datetime import date, datetime
 from typing import cast
 
-import adsk.core
-
 from .strings import INTERNAL_ID
 from .UI.OsHelper import getOSPath
 
@@ -27,10 +25,19 @@ class SynthesisLogger(logging.Logger):
             handler.close()
 
 
+# Set on import so loggers created at module level, before `setupLogger` runs, can log timings too.
+logging.setLoggerClass(SynthesisLogger)
+logging.addLevelName(TIMING_LEVEL, "TIMING")
+
+
+def getLogFileFolder() -> str:
+    return getOSPath(f"{pathlib.Path(__file__).parent.parent}", "logs")
+
+
 def setupLogger() -> None:
     now = datetime.now().strftime("%H-%M-%S")
     today = date.today()
-    logFileFolder = getOSPath(f"{pathlib.Path(__file__).parent.parent}", "logs")
+    logFileFolder = getLogFileFolder()
     logFiles = [os.path.join(logFileFolder, file) for file in os.listdir(logFileFolder) if file.endswith(".log")]
     logFiles.sort()
     if len(logFiles) >= MAX_LOG_FILES_TO_KEEP:
@@ -41,8 +48,6 @@ def setupLogger() -> None:
     logHandler = logging.handlers.WatchedFileHandler(logFileName, mode="w")
     logHandler.setFormatter(logging.Formatter("%(name)s - %(levelname)s - %(message)s"))
 
-    logging.setLoggerClass(SynthesisLogger)
-    logging.addLevelName(TIMING_LEVEL, "TIMING")
     logger = getLogger(INTERNAL_ID)
     logger.setLevel(10)  # Debug
     logger.addHandler(logHandler)
@@ -73,6 +78,9 @@ def logFailure(func: callable = None, /, *, messageBox: bool = False) -> callabl
 
                 getLogger(f"{INTERNAL_ID}.{clsName}{func.__name__}").error(f"Failed:\n{formattedTb}")
                 if messageBox:
+                    # Imported here so modules without Fusion dependencies can log outside of Fusion
+                    import adsk.core
+
                     ui = adsk.core.Application.get().userInterface
                     ui.messageBox(f"Internal Failure: {formattedTb}", "Synthesis: Error")
 
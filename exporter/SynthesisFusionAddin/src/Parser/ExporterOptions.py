@@ -15,6 +15,7 @@ from ..Logging import logFailure, timed
 from ..strings import INTERNAL_ID
 from ..Types import (
     KG,
+    CompressionCodec,
     ExportLocation,
     ExportMode,
     Gamepiece,
@@ -52,6 +53,20 @@ class ExporterOptions:
     frictionOverrideCoeff: float | None = field(default=None)
 
     compressOutput: bool = field(default=True)
+    compressionCodec: CompressionCodec = field(default=CompressionCodec.GZIP)
+
+    # Clamped to the range of the codec, see `Compression.LEVELS`
+    compressionLevel: int = field(default=9)
+    cacheMeshes: bool = field(default=True)
+    cacheMaterials: bool = field(default=True)
+    cachePhysicalProperties: bool = field(default=True)
+    deduplicateParts: bool = field(default=True)
+    optimizeMeshes: bool = field(default=False)
+    quantizeMeshes: bool = field(default=False)
+    exportLods: bool = field(default=False)
+    exportColliders: bool = field(default=False)
+    profileExport: bool = field(default=False)
+    recordSnapshot: bool = field(default=False)
     exportAsPart: bool = field(default=False)
 
     exportLocation: ExportLocation = field(default=ExportLocation.UPLOAD)
@@ -59,7 +74,7 @@ class ExporterOptions:
     hierarchy: ModelHierarchy = field(default=ModelHierarchy.FusionAssembly)
     visualQuality: TriangleMeshQualityOptions = field(default=TriangleMeshQualityOptions.LowQualityTriangleMesh)
     physicalDepth: PhysicalDepth = field(default=PhysicalDepth.AllOccurrence)
-    physicalCalculationLevel: CalculationAccuracy = field(default=CalculationAccuracy.LowCalculationAccuracy)
+    physicalCalculationLevel: CalculationAccuracy = field(default=CalculationAccuracy.MediumCalculationAccuracy)
 
     @logFailure
     @timed
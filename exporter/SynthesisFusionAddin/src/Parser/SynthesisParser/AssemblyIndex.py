@@ -0,0 +1,140 @@
+"""Single pass index of the design shared by every stage of the parser
+
+Every call into the Fusion API is a round trip into Fusion itself, which dominates the time spent exporting.
+The parser stages used to each walk `allComponents`, `allOccurrences` and `allJoints` on their own and query the
+same tokens, visibility and grounded flags over and over. The index walks the design once up front and stores
+everything the stages look up in plain dicts keyed by entity token.
+"""
+
+from dataclasses import dataclass, field
+
+import adsk.fusion
+
+from ...Logging import getLogger, timed
+from .Utilities import guid_component
+
+logger = getLogger()
+
+
+@dataclass
+class OccurrenceEntry:
+    occurrence: adsk.fusion.Occurrence
+    token: str
+    guid: str
+    componentGuid: str
+    name: str
+    isLightBulbOn: bool
+    isGrounded: bool
+    skipCollider: bool
+    parent: str | None = None
+    children: list[str] = field(default_factory=list)
+
+
+@dataclass
+class JointEntry:
+    joint: adsk.fusion.Joint | adsk.fusion.AsBuiltJoint
+    token: str
+    name: str
+    jointType: int
+    isSuppressed: bool
+    occurrenceOne: str | None
+    occurrenceTwo: str | None
+
+
+class AssemblyIndex:
+    @timed
+    def __init__(self, design: adsk.fusion.Design):
+        """Walks the design and indexes every component, occurrence and joint
+
+        Args:
+            design (adsk.fusion.Design): design being exported
+        """
+        self.design = design
+
+        # component guid -> component
+        self.components: dict[str, adsk.fusion.Component] = {}
+
+        # occurrence token -> entry, in depth first order
+        self.occurrences: dict[str, OccurrenceEntry] = {}
+        self.rootOccurrences: list[str] = []
+
+        # component guid -> tokens of every occurrence of that component
+        self.componentOccurrences: dict[str, list[str]] = {}
+
+        # first grounded occurrence in the design, if any
+        self.grounded: OccurrenceEntry | None = None
+
+        self.joints: list[JointEntry] = []
+
+        # occurrence token -> every joint attached to it
+        self.occurrenceJoints: dict[str, list[JointEntry]] = {}
+
+        # occurrence tokens of every rigid group that isn't suppressed
+        self.rigidGroups: list[list[str]] = []
+
+        for component in design.allComponents:
+            self.components[guid_component(component)] = component
+
+        for occurrence in design.rootComponent.occurrences:
+            self.rootOccurrences.append(self._indexOccurrence(occurrence, None))
+
+        for joint in list(design.rootComponent.allJoints) + list(design.rootComponent.allAsBuiltJoints):
+            self._indexJoint(joint)
+
+        for group in design.rootComponent.allRigidGroups:
+            if not group.isSuppressed:
+                self.rigidGroups.append([occurrence.entityToken for occurrence in group.occurrences])
+
+        logger.debug(
+            f"Indexed {len(self.components)} components, {len(self.occurrences)} occurrences "
+            f"and {len(self.joints)} joints"
+        )
+
+    def entry(self, occurrence: adsk.fusion.Occurrence) -> OccurrenceEntry | None:
+        """Looks up the entry of an occurrence returned by the Fusion API"""
+        return self.occurrences.get(occurrence.entityToken) if occurrence else None
+
+    def _indexOccurrence(self, occurrence: adsk.fusion.Occurrence, parent: str | None) -> str:
+        token = occurrence.entityToken
+        componentGuid = guid_component(occurrence.component)
+
+        entry = OccurrenceEntry(
+            occurrence,
+            token,
+            f"{token}_{componentGuid}",
+            componentGuid,
+            occurrence.name,
+            occurrence.isLightBulbOn,
+            occurrence.isGrounded,
+            occurrence.attributes.itemByName("synthesis", "collision_off") is not None,
+            parent,
+        )
+        self.occurrences[token] = entry
+        self.componentOccurrences.setdefault(componentGuid, []).append(token)
+
+        if entry.isGrounded and self.grounded is None:
+            self.grounded = entry
+
+        for child in occurrence.childOccurrences:
+            entry.children.append(self._indexOccurrence(child, token))
+
+        return token
+
+    def _indexJoint(self, joint: adsk.fusion.Joint | adsk.fusion.AsBuiltJoint) -> None:
+        occurrenceOne = joint.occurrenceOne
+        occurrenceTwo = joint.occurrenceTwo
+
+        entry = JointEntry(
+            joint,
+            joint.entityToken,
+            joint.name,
+            joint.jointMotion.jointType,
+            joint.isSuppressed,
+            occurrenceOne.entityToken if occurrenceOne else None,
+            occurrenceTwo.entityToken if occurrenceTwo else None,
+        )
+        self.joints.append(entry)
+
+        for token in dict.fromkeys((entry.occurrenceOne, entry.occurrenceTwo)):
+            if token is not None:
+                self.occurrenceJoints.setdefault(token, []).append(entry)
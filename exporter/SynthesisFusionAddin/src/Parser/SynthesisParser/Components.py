@@ -1,4 +1,5 @@
 # Contains all of the logic for mapping the Components / Occurrences
+import functools
 import logging
 import traceback
 import uuid
@@ -9,69 +10,142 @@ import adsk.fusion
 
 from proto.proto_out import assembly_pb2, joint_pb2, material_pb2, types_pb2
 
-from ...Logging import logFailure, timed
+from ...Logging import getLogger, logFailure, timed
+from ...Profiling import profileSpan
 from ...Types import ExportMode
 from ..ExporterOptions import ExporterOptions
 from . import PhysicalProperties
+from .AssemblyIndex import AssemblyIndex, OccurrenceEntry
+from .MeshCache import MeshCache, bodyCacheKey
+from .MeshEncoding import meshIndexCount
+from .MeshPipeline import MeshPipeline, RawMesh
+from .MiraWriter import MiraWriter
+from .PartDefinitions import PartDefinitionFinalizer, collidingComponents
 from .PDMessage import PDMessage
 from .Utilities import *
 
+logger = getLogger()
+
 # TODO: Impelement Material overrides
 
 
 def _MapAllComponents(
-    design: adsk.fusion.Design,
+    index: AssemblyIndex,
     options: ExporterOptions,
     progressDialog: PDMessage,
     partsData: assembly_pb2.Parts,
     materials: material_pb2.Materials,
-) -> None:
-    for component in design.allComponents:
-        adsk.doEvents()
-        if progressDialog.wasCancelled():
-            raise RuntimeError("User canceled export")
-        progressDialog.addComponent(component.name)
+    writer: MiraWriter | None = None,
+) -> dict[str, str]:
+    """Maps every component in the design to a part definition
+
+    Args:
+        writer (MiraWriter | None): if supplied, finished part definitions are streamed to it instead of kept
+
+    Returns:
+        dict[str, str]: component guid -> guid of the identical part definition it was merged into
+    """
+    meshCache = MeshCache() if options.cacheMeshes else None
+    physicalCache = PhysicalProperties.PhysicalPropertiesCache() if options.cachePhysicalProperties else None
+
+    with MeshPipeline(optimizeMeshes=options.optimizeMeshes, quantizeMeshes=options.quantizeMeshes) as meshPipeline:
+        colliderComponents = None
+        if options.exportColliders:
+            colliderComponents = collidingComponents(
+                index.occurrences.values(), guid_component(index.design.rootComponent)
+            )
+
+        finalizer = PartDefinitionFinalizer(
+            partsData, options.deduplicateParts, writer, meshPipeline, options.exportLods, colliderComponents
+        )
+
+        for comp_ref, component in index.components.items():
+            progressDialog.processEvents()
+            if progressDialog.wasCancelled():
+                raise RuntimeError("User canceled export")
+            progressDialog.addComponent(component.name, comp_ref)
 
-        comp_ref = guid_component(component)
+            with profileSpan(component.name, "component"):
+                fill_info(partsData, None)
 
-        fill_info(partsData, None)
+                partDefinition = partsData.part_definitions[comp_ref]
 
-        partDefinition = partsData.part_definitions[comp_ref]
+                fill_info(partDefinition, component, comp_ref)
 
-        fill_info(partDefinition, component, comp_ref)
+                partDefinition.dynamic = _IsPartDynamic(options, comp_ref)
+                visibleBodies = []
 
-        PhysicalProperties.GetPhysicalProperties(component, partDefinition.physical_data)
+                def processBody(body: adsk.fusion.BRepBody | adsk.fusion.MeshBody):
+                    if progressDialog.wasCancelled():
+                        raise RuntimeError("User canceled export")
+                    if body.isLightBulbOn:
+                        visibleBodies.append(body)
+                        part_body = partDefinition.bodies.add()
+                        fill_info(part_body, body)
+                        part_body.part = comp_ref
 
-        if options.exportMode == ExportMode.FIELD:
-            partDefinition.dynamic = False
-        else:
-            partDefinition.dynamic = True
+                        with profileSpan(part_body.info.name, "body"):
+                            if isinstance(body, adsk.fusion.BRepBody):
+                                _ParseCachedBRep(
+                                    body, options, part_body.triangle_mesh, meshCache, meshPipeline, comp_ref
+                                )
+                            else:
+                                _ParseMesh(body, options, meshPipeline, part_body.triangle_mesh.ParseFromString)
 
-        def processBody(body: adsk.fusion.BRepBody | adsk.fusion.MeshBody):
-            if progressDialog.wasCancelled():
-                raise RuntimeError("User canceled export")
-            if body.isLightBulbOn:
-                part_body = partDefinition.bodies.add()
-                fill_info(part_body, body)
-                part_body.part = comp_ref
+                            part_body.appearance_override = _BodyAppearance(body, materials)
+
+                for body in component.bRepBodies:
+                    processBody(body)
+
+                for body in component.meshBodies:
+                    processBody(body)
+
+                with profileSpan("physical properties"):
+                    PhysicalProperties.GetComponentPhysicalProperties(
+                        component, comp_ref, visibleBodies, partDefinition.physical_data, options, physicalCache
+                    )
+
+                # The definition is finished once the meshes of all of its bodies are back
+                meshPipeline.then(functools.partial(finalizer.finalize, comp_ref))
+
+        # Waiting for the meshes still in flight isn't part of the last component
+        progressDialog.finishItem()
 
-                if isinstance(body, adsk.fusion.BRepBody):
-                    _ParseBRep(body, options, part_body.triangle_mesh)
-                else:
-                    _ParseMesh(body, options, part_body.triangle_mesh)
+    if meshCache is not None:
+        meshCache.flush()
 
-                appearance_key = "{}_{}".format(body.appearance.name, body.appearance.id)
-                # this should be appearance
-                if appearance_key in materials.appearances:
-                    part_body.appearance_override = appearance_key
-                else:
-                    part_body.appearance_override = "default"
+    if physicalCache is not None:
+        physicalCache.flush()
 
-        for body in component.bRepBodies:
-            processBody(body)
+    logger.debug(f"Merged {len(finalizer.partAliases)} duplicate part definitions")
+    return finalizer.partAliases
 
-        for body in component.meshBodies:
-            processBody(body)
+
+def _IsPartDynamic(options: ExporterOptions, comp_ref: str) -> bool:
+    # Only gamepieces are dynamic in a field
+    if options.exportMode == ExportMode.FIELD:
+        return any(gamepiece.occurrenceToken.endswith(comp_ref) for gamepiece in options.gamepieces or [])
+
+    return True
+
+
+def _BodyAppearance(body: adsk.fusion.BRepBody | adsk.fusion.MeshBody, materials: material_pb2.Materials) -> str:
+    appearance_key = "{}_{}".format(body.appearance.name, body.appearance.id)
+    # this should be appearance
+    if appearance_key in materials.appearances:
+        return appearance_key
+
+    return "default"
+
+
+def _OccurrenceAppearance(occurrence: adsk.fusion.Occurrence) -> str | None:
+    if not occurrence.appearance:
+        return None
+
+    try:
+        return "{}_{}".format(occurrence.appearance.name, occurrence.appearance.id)
+    except:
+        return "default"
 
 
 def _ParseComponentRoot(
@@ -81,6 +155,8 @@ def _ParseComponentRoot(
     partsData: assembly_pb2.Parts,
     material_map: dict,
     node: types_pb2.Node,
+    index: AssemblyIndex,
+    partAliases: dict[str, str],
 ) -> None:
     mapConstant = guid_component(component)
 
@@ -92,51 +168,57 @@ def _ParseComponentRoot(
 
     def_map = partsData.part_definitions
 
-    if mapConstant in def_map:
-        part.part_definition_reference = mapConstant
+    defRef = partAliases.get(mapConstant, mapConstant)
+    if defRef in def_map:
+        part.part_definition_reference = defRef
 
-    for occur in component.occurrences:
+    for token in index.rootOccurrences:
         if progressDialog.wasCancelled():
             raise RuntimeError("User canceled export")
 
-        if occur.isLightBulbOn:
+        entry = index.occurrences[token]
+        if entry.isLightBulbOn:
             child_node = types_pb2.Node()
-            __parseChildOccurrence(occur, progressDialog, options, partsData, material_map, child_node)
+            __parseChildOccurrence(
+                entry, progressDialog, options, partsData, material_map, child_node, index, partAliases
+            )
             node.children.append(child_node)
 
 
 def __parseChildOccurrence(
-    occurrence: adsk.fusion.Occurrence,
+    entry: OccurrenceEntry,
     progressDialog: PDMessage,
     options: ExporterOptions,
     partsData: assembly_pb2.Parts,
     material_map: dict,
     node: types_pb2.Node,
+    index: AssemblyIndex,
+    partAliases: dict[str, str],
+    parentTransform: adsk.core.Matrix3D | None = None,
 ) -> None:
-    if occurrence.isLightBulbOn is False:
+    if entry.isLightBulbOn is False:
         return
 
-    progressDialog.addOccurrence(occurrence.name)
+    occurrence = entry.occurrence
+
+    progressDialog.addOccurrence(entry.name)
 
-    mapConstant = guid_occurrence(occurrence)
+    mapConstant = entry.guid
 
-    compRef = guid_component(occurrence.component)
+    compRef = partAliases.get(entry.componentGuid, entry.componentGuid)
 
     part = partsData.part_instances[mapConstant]
 
     node.value = mapConstant
 
-    fill_info(part, occurrence, mapConstant)
+    construct_info(entry.name, part, GUID=mapConstant)
 
-    collision_attr = occurrence.attributes.itemByName("synthesis", "collision_off")
-    if collision_attr != None:
+    if entry.skipCollider:
         part.skip_collider = True
 
-    if occurrence.appearance:
-        try:
-            part.appearance = "{}_{}".format(occurrence.appearance.name, occurrence.appearance.id)
-        except:
-            part.appearance = "default"
+    appearance = _OccurrenceAppearance(occurrence)
+    if appearance is not None:
+        part.appearance = appearance
         # TODO: Add phyical_material parser
 
     if occurrence.component.material:
@@ -147,96 +229,111 @@ def __parseChildOccurrence(
     if compRef in def_map:
         part.part_definition_reference = compRef
 
-    # TODO: Maybe make this a separate step where you dont go backwards and search for the gamepieces
-    if options.exportMode == ExportMode.FIELD:
-        for x in options.gamepieces:
-            if x.occurrenceToken == mapConstant:
-                partsData.part_definitions[part.part_definition_reference].dynamic = True
-                break
-
-    part.transform.spatial_matrix.extend(occurrence.transform.asArray())
+    # The world transform of the parent is passed down so each occurrence only costs a single multiply
+    worldTransform = occurrence.transform
+    part.transform.spatial_matrix.extend(worldTransform.asArray())
 
-    worldTransform = GetMatrixWorld(occurrence)
+    if parentTransform:
+        worldTransform.transformBy(parentTransform)
 
-    if worldTransform:
-        part.global_transform.spatial_matrix.extend(worldTransform.asArray())
+    part.global_transform.spatial_matrix.extend(worldTransform.asArray())
 
-    for occur in occurrence.childOccurrences:
+    for token in entry.children:
         if progressDialog.wasCancelled():
             raise RuntimeError("User canceled export")
 
-        if occur.isLightBulbOn:
+        childEntry = index.occurrences[token]
+        if childEntry.isLightBulbOn:
             child_node = types_pb2.Node()
-            __parseChildOccurrence(occur, progressDialog, options, partsData, material_map, child_node)
+            __parseChildOccurrence(
+                childEntry,
+                progressDialog,
+                options,
+                partsData,
+                material_map,
+                child_node,
+                index,
+                partAliases,
+                worldTransform,
+            )
             node.children.append(child_node)
 
 
-# saw online someone used this to get the correct context but oh boy does it look pricey
-# I think if I can make all parts relative to a parent it should return that parents transform maybe
-# TESTED AND VERIFIED - but unoptimized
-def GetMatrixWorld(occurrence):
-    matrix = occurrence.transform
-    while occurrence.assemblyContext:
-        matrix.transformBy(occurrence.assemblyContext.transform)
-        occurrence = occurrence.assemblyContext
-    return matrix
+def _ParseCachedBRep(
+    body: adsk.fusion.BRepBody,
+    options: ExporterOptions,
+    trimesh: assembly_pb2.TriangleMesh,
+    meshCache: MeshCache | None,
+    meshPipeline: MeshPipeline,
+    comp_ref: str,
+) -> None:
+    if meshCache is None:
+        _ParseBRep(body, options, meshPipeline, trimesh.ParseFromString)
+        return
+
+    bodyKey = bodyCacheKey(body, options.visualQuality, options.optimizeMeshes, options.quantizeMeshes)
+    cached = meshCache.get(comp_ref, bodyKey)
+    if cached is not None:
+        trimesh.ParseFromString(cached)
+        return
+
+    def onComplete(data: bytes) -> None:
+        trimesh.ParseFromString(data)
+
+        # Don't cache the result of a failed tessellation
+        if meshIndexCount(trimesh) > 0:
+            meshCache.put(comp_ref, bodyKey, data)
+
+    _ParseBRep(body, options, meshPipeline, onComplete)
 
 
 @logFailure
 def _ParseBRep(
     body: adsk.fusion.BRepBody,
     options: ExporterOptions,
-    trimesh: assembly_pb2.TriangleMesh,
+    meshPipeline: MeshPipeline,
+    onComplete: Callable[[bytes], None],
 ) -> any:
-    meshManager = body.meshManager
-    calc = meshManager.createMeshCalculator()
-    calc.setQuality(options.visualQuality)
-    mesh = calc.calculate()
-
-    fill_info(trimesh, body)
-    trimesh.has_volume = True
-
-    plainmesh_out = trimesh.mesh
-
-    plainmesh_out.verts.extend(mesh.nodeCoordinatesAsFloat)
-    plainmesh_out.normals.extend(mesh.normalVectorsAsFloat)
-    plainmesh_out.indices.extend(mesh.nodeIndices)
-    plainmesh_out.uv.extend(mesh.textureCoordinatesAsFloat)
+    meshPipeline.submit(_ReadBRepMesh(body, options), onComplete)
 
 
 @logFailure
 def _ParseMesh(
     meshBody: adsk.fusion.MeshBody,
     options: ExporterOptions,
-    trimesh: assembly_pb2.TriangleMesh,
+    meshPipeline: MeshPipeline,
+    onComplete: Callable[[bytes], None],
 ) -> any:
-    mesh = meshBody.displayMesh
-
-    fill_info(trimesh, meshBody)
-    trimesh.has_volume = True
-
-    plainmesh_out = trimesh.mesh
+    meshPipeline.submit(_ReadMeshBody(meshBody), onComplete)
 
-    plainmesh_out.verts.extend(mesh.nodeCoordinatesAsFloat)
-    plainmesh_out.normals.extend(mesh.normalVectorsAsFloat)
-    plainmesh_out.indices.extend(mesh.nodeIndices)
-    plainmesh_out.uv.extend(mesh.textureCoordinatesAsFloat)
 
-
-def _MapRigidGroups(rootComponent: adsk.fusion.Component, joints: joint_pb2.Joints) -> None:
-    groups = rootComponent.allRigidGroups
-    for group in groups:
-        mira_group = joint_pb2.RigidGroup()
-        mira_group.name = group.entityToken
-        for occ in group.occurrences:
-            if occ == None:
-                a = 1
-                continue
-
-            if not occ.isLightBulbOn:
-                continue
-
-            occRef = guid_occurrence(occ)
-            mira_group.occurrences.append(occRef)
-        if len(mira_group.occurrences) > 1:
-            joints.rigid_groups.append(mira_group)
+def _ReadBRepMesh(body: adsk.fusion.BRepBody, options: ExporterOptions) -> RawMesh:
+    meshManager = body.meshManager
+    calc = meshManager.createMeshCalculator()
+    calc.setQuality(options.visualQuality)
+    with profileSpan("mesh calculation", "mesh"):
+        mesh = calc.calculate()
+
+    with profileSpan("read mesh arrays", "mesh"):
+        return RawMesh(
+            body.name,
+            body.entityToken,
+            mesh.nodeCoordinatesAsFloat,
+            mesh.normalVectorsAsFloat,
+            mesh.nodeIndices,
+            mesh.textureCoordinatesAsFloat,
+        )
+
+
+def _ReadMeshBody(meshBody: adsk.fusion.MeshBody) -> RawMesh:
+    with profileSpan("read mesh arrays", "mesh"):
+        mesh = meshBody.displayMesh
+
+        return RawMesh(
+            meshBody.name,
+            meshBody.entityToken,
+            mesh.nodeCoordinatesAsFloat,
+            mesh.normalVectorsAsFloat,
+            mesh.nodeIndices,
+            mesh.textureCoordinatesAsFloat,
+        )
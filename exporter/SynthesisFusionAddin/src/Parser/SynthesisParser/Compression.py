@@ -0,0 +1,231 @@
+"""Compression of exported mirabuf files.
+
+gzip, zlib and raw deflate all wrap the same deflate stream, which is written by a block compressor: the output is
+cut into blocks that are deflated in parallel, each primed with the last 32 KB of the block before it so matches
+can still reach back across blocks. The blocks are flushed to a byte boundary and joined into one ordinary deflate
+stream any inflater can read, so the ratio stays close to compressing on a single thread while the time scales
+with the number of cores, zlib releases the GIL while it compresses.
+
+The viewer reads gzip, zlib and raw deflate, see `UnzipMira` in `fission/src/mirabuf/MirabufLoader.ts`, so only
+those are offered in the export dialog. zstd and lz4 are only there for `tools/benchmarkCompression.py` to compare
+against, and are used if the `zstandard` or `lz4` packages are installed, zstd with its own worker threads.
+
+This module intentionally has no Fusion dependencies so it can be used from worker threads and tools, see
+`tools/benchmarkCompression.py`.
+"""
+
+import collections
+import os
+import struct
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO
+
+from ...Types import CompressionCodec
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+DEFLATE_CODECS = (CompressionCodec.GZIP, CompressionCodec.ZLIB, CompressionCodec.DEFLATE)
+
+# Lowest, highest and default level of every codec
+LEVELS = {
+    CompressionCodec.GZIP: (0, 9, 9),
+    CompressionCodec.ZLIB: (0, 9, 9),
+    CompressionCodec.DEFLATE: (0, 9, 9),
+    CompressionCodec.ZSTD: (1, 22, 9),
+    CompressionCodec.LZ4: (0, 16, 9),
+}
+
+BLOCK_SIZE = 1024 * 1024
+
+# Deflate can refer back this far, so this much of the previous block primes the next
+DICTIONARY_SIZE = 32 * 1024
+
+MAX_THREADS = 8
+
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00"
+GZIP_OS_UNKNOWN = 255
+
+
+def availableCodecs() -> list[CompressionCodec]:
+    """Gets the codecs that can be used, zstd and lz4 need optional packages"""
+    codecs = list(DEFLATE_CODECS)
+    if zstandard is not None:
+        codecs.append(CompressionCodec.ZSTD)
+
+    if lz4 is not None:
+        codecs.append(CompressionCodec.LZ4)
+
+    return codecs
+
+
+def clampLevel(codec: CompressionCodec, level: int | None) -> int:
+    """Gets a level the codec supports, the codec's default if none is given"""
+    low, high, default = LEVELS[codec]
+    return default if level is None else min(high, max(low, level))
+
+
+def defaultThreads() -> int:
+    return min(MAX_THREADS, os.cpu_count() or 1)
+
+
+def _deflateBlock(block: bytes, dictionary: bytes, level: int, last: bool) -> bytes:
+    if dictionary:
+        compressor = zlib.compressobj(
+            level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, dictionary
+        )
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    # A sync flush ends the block on a byte boundary so the next one can be appended to it
+    return compressor.compress(block) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class BlockDeflateWriter:
+    def __init__(
+        self,
+        out: BinaryIO,
+        codec: CompressionCodec = CompressionCodec.GZIP,
+        level: int = 9,
+        threads: int | None = None,
+        blockSize: int = BLOCK_SIZE,
+    ):
+        """Creates a writer that compresses blocks on a thread pool
+
+        Args:
+            out (BinaryIO): stream the compressed data is written to, it is left open
+            codec (CompressionCodec): gzip, zlib or raw deflate
+            level (int): deflate level from 0 to 9
+            threads (int | None): blocks compressed at once, defaults to the number of cores
+            blockSize (int): bytes per block
+        """
+        assert codec in DEFLATE_CODECS, f"{codec} isn't a deflate codec"
+        self.out = out
+        self.codec = codec
+        self.level = level
+        self.blockSize = blockSize
+        self.threads = threads or defaultThreads()
+        self.executor = ThreadPoolExecutor(self.threads, "SynthesisCompress") if self.threads > 1 else None
+
+        self.buffer = bytearray()
+        self.dictionary = b""
+        self.pending: collections.deque[Future] = collections.deque()
+        self.checksum = zlib.crc32(b"") if codec == CompressionCodec.GZIP else zlib.adler32(b"")
+        self.size = 0
+        self.closed = False
+
+        if codec == CompressionCodec.GZIP:
+            extraFlags = 2 if level == 9 else 4 if level == 1 else 0
+            self.out.write(GZIP_HEADER + bytes((extraFlags, GZIP_OS_UNKNOWN)))
+        elif codec == CompressionCodec.ZLIB:
+            compressionMethod = 0x78
+            levelFlags = (0 if level < 2 else 1 if level < 6 else 2 if level == 6 else 3) << 6
+            levelFlags += 31 - (compressionMethod * 256 + levelFlags) % 31
+            self.out.write(bytes((compressionMethod, levelFlags)))
+
+    def write(self, data: bytes) -> int:
+        if self.codec == CompressionCodec.GZIP:
+            self.checksum = zlib.crc32(data, self.checksum)
+        elif self.codec == CompressionCodec.ZLIB:
+            self.checksum = zlib.adler32(data, self.checksum)
+
+        self.size += len(data)
+        self.buffer += data
+        while len(self.buffer) >= self.blockSize:
+            block = bytes(self.buffer[: self.blockSize])
+            del self.buffer[: self.blockSize]
+            self._submit(block, last=False)
+
+        return len(data)
+
+    def _submit(self, block: bytes, last: bool) -> None:
+        dictionary = self.dictionary
+        self.dictionary = block[-DICTIONARY_SIZE:]
+
+        if self.executor is None:
+            self.out.write(_deflateBlock(block, dictionary, self.level, last))
+            return
+
+        self.pending.append(self.executor.submit(_deflateBlock, block, dictionary, self.level, last))
+
+        # Bounds memory to a few blocks per thread, written in order as they finish
+        while len(self.pending) > self.threads * 2:
+            self.out.write(self.pending.popleft().result())
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        self.closed = True
+        try:
+            self._submit(bytes(self.buffer), last=True)
+            self.buffer.clear()
+            while self.pending:
+                self.out.write(self.pending.popleft().result())
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+
+        if self.codec == CompressionCodec.GZIP:
+            self.out.write(struct.pack("<II", self.checksum & 0xFFFFFFFF, self.size & 0xFFFFFFFF))
+        elif self.codec == CompressionCodec.ZLIB:
+            self.out.write(struct.pack(">I", self.checksum & 0xFFFFFFFF))
+
+    def __enter__(self) -> "BlockDeflateWriter":
+        return self
+
+    def __exit__(self, *_: any) -> None:
+        self.close()
+
+
+def openCompressed(
+    out: BinaryIO, codec: CompressionCodec, level: int | None = None, threads: int | None = None
+) -> BinaryIO:
+    """Wraps a stream so everything written to it is compressed, closing the wrapper finishes the compressed data
+    but leaves `out` open
+
+    Args:
+        out (BinaryIO): stream to write the compressed data to
+        codec (CompressionCodec): codec to compress with, see `availableCodecs`
+        level (int | None): compression level, clamped to what the codec supports
+        threads (int | None): threads to compress with, defaults to the number of cores
+    """
+    level = clampLevel(codec, level)
+    if codec in DEFLATE_CODECS:
+        return BlockDeflateWriter(out, codec, level, threads)
+
+    if codec == CompressionCodec.ZSTD and zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=level, threads=threads or defaultThreads())
+        return compressor.stream_writer(out, closefd=False)
+
+    if codec == CompressionCodec.LZ4 and lz4 is not None:
+        return lz4.frame.LZ4FrameFile(out, "wb", compression_level=level)
+
+    raise ValueError(f"{codec.name} compression isn't available, install the package it needs")
+
+
+def decompress(data: bytes, codec: CompressionCodec) -> bytes:
+    if codec == CompressionCodec.GZIP:
+        return zlib.decompress(data, zlib.MAX_WBITS | 16)
+
+    if codec == CompressionCodec.ZLIB:
+        return zlib.decompress(data)
+
+    if codec == CompressionCodec.DEFLATE:
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+
+    if codec == CompressionCodec.ZSTD and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    if codec == CompressionCodec.LZ4 and lz4 is not None:
+        return lz4.frame.decompress(data)
+
+    raise ValueError(f"{codec.name} compression isn't available, install the package it needs")
@@ -0,0 +1,220 @@
+"""Convex hulls of tessellated bodies, used as cheap collision shapes.
+
+Implements 3D quickhull: starting from a tetrahedron of extreme points, the point furthest outside of a face is
+added to the hull until no point is left outside. Physics engines limit the vertices of a convex shape, so a
+finished hull with more vertices is simplified with `MeshSimplifier` and the hull of what is left is taken again.
+Simplifying the whole hull spreads the error over its surface, where stopping quickhull early would leave out
+whole regions that just weren't reached yet.
+
+This module intentionally has no Fusion dependencies so it can be used from worker threads and tools.
+"""
+
+from array import array
+from typing import Sequence
+
+from .MeshSimplifier import MeshSimplifier
+
+# Hulls with more vertices than this are simplified
+MAX_HULL_VERTICES = 128
+
+Point = tuple[float, float, float]
+
+
+class _Face:
+    __slots__ = ("vertices", "normal", "offset", "outside", "furthest", "furthestDistance", "alive")
+
+    def __init__(self, points: list[Point], a: int, b: int, c: int):
+        self.vertices = (a, b, c)
+        pa, pb, pc = points[a], points[b], points[c]
+        u = (pb[0] - pa[0], pb[1] - pa[1], pb[2] - pa[2])
+        v = (pc[0] - pa[0], pc[1] - pa[1], pc[2] - pa[2])
+        nx, ny, nz = u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0]
+        length = (nx * nx + ny * ny + nz * nz) ** 0.5 or 1.0
+        self.normal = (nx / length, ny / length, nz / length)
+        self.offset = self.normal[0] * pa[0] + self.normal[1] * pa[1] + self.normal[2] * pa[2]
+        self.outside: list[int] = []
+        self.furthest = -1
+        self.furthestDistance = 0.0
+        self.alive = True
+
+    def distance(self, point: Point) -> float:
+        return self.normal[0] * point[0] + self.normal[1] * point[1] + self.normal[2] * point[2] - self.offset
+
+
+def convexHull(verts: Sequence[float], maxVertices: int = MAX_HULL_VERTICES) -> tuple[array, array] | None:
+    """Computes the convex hull of a point cloud
+
+    Args:
+        verts (Sequence[float]): flat xyz positions
+        maxVertices (int): hulls with more vertices are simplified down to this many
+
+    Returns:
+        tuple[array, array] | None: flat xyz positions and outward facing triangle indices of the hull, or None if
+            the points are flat and don't enclose a volume
+    """
+    hull = _quickhull(verts)
+    if hull is None or len(hull[0]) // 3 <= maxVertices:
+        return hull
+
+    # A closed triangle mesh with every vertex on the hull has 2V - 4 triangles
+    simplified, _ = MeshSimplifier(*hull).simplify(2 * maxVertices - 4)
+
+    # Collapsed vertices can end up slightly inside of the surface, so the result is made convex again
+    return _quickhull(simplified) or hull
+
+
+def _quickhull(verts: Sequence[float]) -> tuple[array, array] | None:
+    points: list[Point] = list(dict.fromkeys(zip(verts[0::3], verts[1::3], verts[2::3])))
+    if len(points) < 4:
+        return None
+
+    extent = max(max(p[axis] for p in points) - min(p[axis] for p in points) for axis in range(3))
+    epsilon = max(extent, 1e-12) * 1e-7
+
+    initial = _initialTetrahedron(points, epsilon)
+    if initial is None:
+        return None
+
+    faces: list[_Face] = []
+
+    # directed edge (a, b) -> face containing it, with the face's vertices in counter clockwise order
+    edges: dict[tuple[int, int], _Face] = {}
+
+    def addFace(a: int, b: int, c: int) -> _Face:
+        face = _Face(points, a, b, c)
+        faces.append(face)
+        edges[(a, b)] = edges[(b, c)] = edges[(c, a)] = face
+        return face
+
+    a, b, c, d = initial
+    centroid = tuple(sum(points[i][axis] for i in initial) / 4 for axis in range(3))
+    for face in ((a, b, c), (a, c, d), (a, d, b), (b, d, c)):
+        candidate = _Face(points, *face)
+        if candidate.distance(centroid) > 0:
+            face = (face[0], face[2], face[1])
+        addFace(*face)
+
+    hullVertices = set(initial)
+    for i, point in enumerate(points):
+        if i not in hullVertices:
+            _assignOutside(faces, i, point, epsilon)
+
+    while True:
+        # Adding the point furthest outside first encloses the most other points with every step
+        face = max(
+            (face for face in faces if face.alive and face.outside),
+            key=lambda face: face.furthestDistance,
+            default=None,
+        )
+        if face is None:
+            break
+
+        eye = face.furthest
+        eyePoint = points[eye]
+
+        # Find every face the eye point can see, walking across edges from the face it is outside of
+        visible = [face]
+        face.alive = False
+        stack = [face]
+        while stack:
+            current = stack.pop()
+            for i in range(3):
+                neighbour = edges.get((current.vertices[(i + 1) % 3], current.vertices[i]))
+                if neighbour is not None and neighbour.alive and neighbour.distance(eyePoint) > epsilon:
+                    neighbour.alive = False
+                    visible.append(neighbour)
+                    stack.append(neighbour)
+
+        # The horizon is every edge of a visible face whose neighbour across it isn't visible
+        horizon = []
+        for current in visible:
+            for i in range(3):
+                edge = (current.vertices[i], current.vertices[(i + 1) % 3])
+                neighbour = edges.get((edge[1], edge[0]))
+                if neighbour is not None and neighbour.alive:
+                    horizon.append(edge)
+
+        orphans = [i for current in visible for i in current.outside if i != eye]
+        for current in visible:
+            for i in range(3):
+                edge = (current.vertices[i], current.vertices[(i + 1) % 3])
+                if edges.get(edge) is current:
+                    del edges[edge]
+
+        newFaces = [addFace(start, end, eye) for start, end in horizon]
+
+        for i in orphans:
+            _assignOutside(newFaces, i, points[i], epsilon)
+
+        # Compact the face list every so often so scanning it stays cheap
+        if len(faces) > 2 * len(edges) // 3 + 64:
+            faces = [face for face in faces if face.alive]
+
+    remap: dict[int, int] = {}
+    hullVerts = array("f")
+    hullIndices = array("i")
+    for face in faces:
+        if not face.alive:
+            continue
+
+        for vertex in face.vertices:
+            if vertex not in remap:
+                remap[vertex] = len(remap)
+                hullVerts.extend(points[vertex])
+
+            hullIndices.append(remap[vertex])
+
+    return hullVerts, hullIndices
+
+
+def _assignOutside(faces: list[_Face], index: int, point: Point, epsilon: float) -> None:
+    for face in faces:
+        if not face.alive:
+            continue
+
+        distance = face.distance(point)
+        if distance > epsilon:
+            face.outside.append(index)
+            if distance > face.furthestDistance:
+                face.furthest, face.furthestDistance = index, distance
+            return
+
+
+def _initialTetrahedron(points: list[Point], epsilon: float) -> tuple[int, int, int, int] | None:
+    # Most distant pair among the extreme points along each axis
+    extremes = set()
+    for axis in range(3):
+        extremes.add(min(range(len(points)), key=lambda i: points[i][axis]))
+        extremes.add(max(range(len(points)), key=lambda i: points[i][axis]))
+
+    def distanceSquared(i: int, j: int) -> float:
+        return sum((points[i][axis] - points[j][axis]) ** 2 for axis in range(3))
+
+    a, b = max(((i, j) for i in extremes for j in extremes if i < j), key=lambda pair: distanceSquared(*pair))
+    if distanceSquared(a, b) <= epsilon * epsilon:
+        return None
+
+    # Furthest point from the line through a and b
+    pa, pb = points[a], points[b]
+    direction = tuple(pb[axis] - pa[axis] for axis in range(3))
+
+    def lineDistanceSquared(i: int) -> float:
+        offset = tuple(points[i][axis] - pa[axis] for axis in range(3))
+        cross = (
+            offset[1] * direction[2] - offset[2] * direction[1],
+            offset[2] * direction[0] - offset[0] * direction[2],
+            offset[0] * direction[1] - offset[1] * direction[0],
+        )
+        return cross[0] ** 2 + cross[1] ** 2 + cross[2] ** 2
+
+    c = max(range(len(points)), key=lineDistanceSquared)
+    if lineDistanceSquared(c) <= (epsilon**2) * sum(x * x for x in direction):
+        return None
+
+    # Furthest point from the plane through a, b and c
+    plane = _Face(points, a, b, c)
+    d = max(range(len(points)), key=lambda i: abs(plane.distance(points[i])))
+    if abs(plane.distance(points[d])) <= epsilon:
+        return None
+
+    return a, b, c, d
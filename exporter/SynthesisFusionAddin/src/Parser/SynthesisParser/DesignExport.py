@@ -0,0 +1,152 @@
+"""Stages of an export that turn an indexed design into the assembly
+
+Shared by `Parser`, which runs them on the open design, and `HeadlessExport`, which runs them on a recorded
+`Snapshot` served by `SnapshotAdsk`, so both measure and produce the same thing.
+"""
+
+from typing import Callable, ContextManager
+
+import adsk.core
+import adsk.fusion
+
+from proto.proto_out import assembly_pb2, types_pb2
+
+from ...Profiling import profileSpan
+from ..ExporterOptions import ExporterOptions
+from . import Components, JointHierarchy, Joints, Materials, PDMessage, RigidGroup
+from .AssemblyIndex import AssemblyIndex
+from .MaterialCache import MaterialCache
+from .MiraWriter import MiraWriter
+
+
+def profileStage(name: str) -> ContextManager:
+    return profileSpan(name, "stage")
+
+
+def createProgressMessage(
+    assembly: assembly_pb2.Assembly,
+    design: adsk.fusion.Design,
+    index: AssemblyIndex,
+    appearances: dict[str, adsk.core.Appearance],
+    progressDialog: adsk.core.ProgressDialog,
+) -> PDMessage.PDMessage:
+    """Creates the formatter for the progress dialog of an export"""
+    # Components are weighted by their bodies when estimating the time left
+    componentBodies = {
+        guid: component.bRepBodies.count + component.meshBodies.count for guid, component in index.components.items()
+    }
+
+    return PDMessage.PDMessage(
+        assembly.info.name,
+        len(index.components),
+        len(index.occurrences),
+        design.materials.count,
+        len(appearances),
+        progressDialog,
+        componentBodies,
+    )
+
+
+def exportDesign(
+    design: adsk.fusion.Design,
+    index: AssemblyIndex,
+    assembly: assembly_pb2.Assembly,
+    appearances: dict[str, adsk.core.Appearance],
+    options: ExporterOptions,
+    progressDialog: PDMessage.PDMessage,
+    writer: MiraWriter,
+    materialCache: MaterialCache | None = None,
+    stage: Callable[[str], ContextManager] = profileStage,
+) -> None:
+    """Fills in the materials, parts, joints and joint hierarchy of the assembly
+
+    Args:
+        design (adsk.fusion.Design): design being exported
+        index (AssemblyIndex): index of the design
+        assembly (assembly_pb2.Assembly): assembly with its info filled in
+        appearances (dict[str, adsk.core.Appearance]): appearances to export, see `Materials._ReferencedAppearances`
+        options (ExporterOptions): options of the export
+        progressDialog (PDMessage.PDMessage): progress of the export
+        writer (MiraWriter): writer the finished part definitions are spooled to
+        materialCache (MaterialCache | None): cache of converted appearances and physical materials
+        stage (Callable[[str], ContextManager]): wraps every stage, profiles them by default
+    """
+    with stage("Appearances"):
+        Materials._MapAllAppearances(
+            appearances,
+            assembly.data.materials,
+            options,
+            progressDialog,
+            materialCache,
+        )
+        progressDialog.finishItem()
+
+    with stage("Physical materials"):
+        Materials._MapAllPhysicalMaterials(
+            design.materials,
+            assembly.data.materials,
+            options,
+            progressDialog,
+            materialCache,
+        )
+        progressDialog.finishItem()
+
+    if materialCache is not None:
+        materialCache.flush()
+
+    with stage("Components"):
+        partAliases = Components._MapAllComponents(
+            index,
+            options,
+            progressDialog,
+            assembly.data.parts,
+            assembly.data.materials,
+            writer,
+        )
+
+    rootNode = types_pb2.Node()
+
+    with stage("Occurrences"):
+        Components._ParseComponentRoot(
+            design.rootComponent,
+            progressDialog,
+            options,
+            assembly.data.parts,
+            assembly.data.materials.appearances,
+            rootNode,
+            index,
+            partAliases,
+        )
+        progressDialog.finishItem()
+
+    with stage("Rigid groups"):
+        RigidGroup.ExportRigidGroups(assembly.data.joints, index)
+
+    assembly.design_hierarchy.nodes.append(rootNode)
+
+    # Problem Child
+    with stage("Joints"):
+        Joints.populateJoints(
+            design,
+            assembly.data.joints,
+            assembly.data.signals,
+            progressDialog,
+            options,
+            assembly,
+            index,
+        )
+
+    # add condition in here for advanced joints maybe idk
+    # should pre-process to find if there are any grounded joints at all
+    # that or add code to existing parser to determine leftovers
+
+    with stage("Joint graph"):
+        Joints.createJointGraph(
+            options.joints,
+            options.wheels,
+            assembly.joint_hierarchy,
+            progressDialog,
+        )
+
+    with stage("Joint hierarchy"):
+        JointHierarchy.BuildJointPartHierarchy(design, assembly.data.joints, options, progressDialog, index)
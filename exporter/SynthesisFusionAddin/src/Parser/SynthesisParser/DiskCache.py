@@ -0,0 +1,100 @@
+"""Persistent on-disk LRU cache of serialized messages, shared by every design
+
+Stores everything in a single versioned pickle file which is read once when the cache is created and written
+back by `flush`. The least recently used entries are dropped once there are more than `maxEntries`, see
+`MaterialCache` and `PhysicalProperties` for what is cached.
+
+This module intentionally has no Fusion dependencies.
+"""
+
+import collections
+import os
+import pickle
+
+from ...Logging import getLogger, logFailure
+
+logger = getLogger()
+
+
+class DiskCache:
+    def __init__(self, path: str, version: int, maxEntries: int, name: str = "Cache"):
+        """Loads the cache file, if there is one with the same version
+
+        Args:
+            path (str): cache file, its directory is created when flushing
+            version (int): format version, files with another version are discarded
+            maxEntries (int): entries kept before the least recently used are dropped
+            name (str): name used in log messages
+        """
+        self.path = path
+        self.version = version
+        self.maxEntries = maxEntries
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.changed = False
+
+        # key -> serialized message, least recently used first
+        self.entries: collections.OrderedDict[str, bytes] = collections.OrderedDict()
+        self._load()
+
+    def get(self, key: str) -> bytes | None:
+        """Gets a cached entry and marks it as recently used
+
+        Only `put` marks the cache as changed, so a read only export doesn't rewrite the file. The new order is
+        written by the next flush after a `put`.
+
+        Args:
+            key (str): key of the entry
+
+        Returns:
+            bytes | None: serialized message, or None if not cached
+        """
+        data = self.entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self.entries[key] = data
+        self.entries.move_to_end(key)
+        self.changed = True
+
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+
+    @logFailure
+    def flush(self) -> None:
+        """Writes the cache back to disk if it was used"""
+        if self.changed:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tempPath = f"{self.path}.tmp"
+            with open(tempPath, "wb") as f:
+                pickle.dump({"version": self.version, "entries": self.entries}, f)
+
+            os.replace(tempPath, self.path)
+            self.changed = False
+
+        logger.debug(self.report())
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total else 0.0
+        return f"{self.name}: {self.hits} hits, {self.misses} misses ({ratio:.1f}% reused)"
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+
+            if data.get("version") == self.version:
+                self.entries = collections.OrderedDict(data["entries"])
+        except Exception:
+            logger.warning(f"Discarding unreadable cache file {self.path}")
@@ -0,0 +1,101 @@
+"""Replays a recorded `Snapshot` through the export outside of Fusion
+
+`SnapshotAdsk` serves the snapshot through stand ins for the Fusion API and the design is exported by the same
+`AssemblyIndex`, `Materials`, `Components`, `Joints` and `JointHierarchy` code the add-in runs, see
+`DesignExport.exportDesign`. Only tessellation, physical properties and joint origins are taken from the snapshot
+as Fusion calculated them while recording.
+
+The stand in modules have to be registered before the export is imported:
+
+    from src.Parser.SynthesisParser import SnapshotAdsk
+
+    SnapshotAdsk.install()
+
+    from src.Parser.SynthesisParser.HeadlessExport import HeadlessExport
+
+See `tools/exportSnapshot.py`.
+"""
+
+import contextlib
+import dataclasses
+import time
+from typing import BinaryIO, Iterator
+
+from proto.proto_out import assembly_pb2
+
+from ...Logging import getLogger
+from ...Profiling import profileSpan
+from ...Types import ExportMode, makeObjectFromJson
+from ..ExporterOptions import ExporterOptions
+from . import DesignExport, Materials, SnapshotAdsk
+from .AssemblyIndex import AssemblyIndex
+from .MiraWriter import MiraWriter
+from .Snapshot import Snapshot
+from .Utilities import fill_info
+
+logger = getLogger()
+
+
+class HeadlessExport:
+    def __init__(self, snapshot: Snapshot, options: ExporterOptions | None = None):
+        """Creates an export of a recorded snapshot
+
+        Args:
+            snapshot (Snapshot): snapshot to export
+            options (ExporterOptions | None): options to export with, defaults to those the snapshot was recorded with
+        """
+        self.snapshot = snapshot
+        self.options = options if options is not None else makeObjectFromJson(ExporterOptions, snapshot.options)
+
+        # stage name -> seconds spent in it during the last export
+        self.stageTimes: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        with profileSpan(name, "stage"):
+            yield
+
+        self.stageTimes[name] = time.perf_counter() - start
+
+    def export(self, out: BinaryIO) -> assembly_pb2.Assembly:
+        """Exports the snapshot
+
+        Args:
+            out (BinaryIO): binary stream the mirabuf assembly is written to
+
+        Returns:
+            assembly_pb2.Assembly: the written assembly, without the spooled part definitions
+        """
+        self.stageTimes = {}
+
+        # The caches of the add-in are keyed by revision, which a snapshot doesn't have
+        options = dataclasses.replace(
+            self.options, cacheMeshes=False, cacheMaterials=False, cachePhysicalProperties=False
+        )
+
+        design = SnapshotAdsk.buildDesign(self.snapshot)
+
+        assembly = assembly_pb2.Assembly()
+        fill_info(assembly, design.rootComponent, override_guid=design.parentDocument.name)
+        assembly.dynamic = options.exportMode == ExportMode.ROBOT
+
+        with self._stage("Index design"):
+            index = AssemblyIndex(design)
+
+        with self._stage("Referenced appearances"):
+            appearances = Materials._ReferencedAppearances(index)
+
+        progressDialog = DesignExport.createProgressMessage(
+            assembly, design, index, appearances, SnapshotAdsk.ProgressDialog()
+        )
+
+        with MiraWriter() as writer:
+            DesignExport.exportDesign(
+                design, index, assembly, appearances, options, progressDialog, writer, stage=self._stage
+            )
+
+            with self._stage("Write"):
+                writer.write(assembly, out)
+
+        return assembly
@@ -0,0 +1,192 @@
+"""Flat adjacency list graph of the joints in an assembly
+
+Used by `JointHierarchy.JointParser` to work out which occurrences move with which joint. The graph is built once
+from the joint list and every traversal is iterative, so the cost is linear in the size of the assembly and deep
+mechanisms can't hit the recursion limit.
+
+- Rigid joints are merged into rigid clusters with a union-find
+- Every dynamic joint is an axis, rooted at its first occurrence
+- The occurrences of an axis are found by walking the occurrence hierarchy and rigid clusters from its root,
+  stopping at grounded occurrences and at the roots of other axes
+- Axes are linked into a tree with a breadth first search starting at the grounded occurrence
+
+This module intentionally has no Fusion dependencies so it can be benchmarked outside of Fusion.
+"""
+
+import collections
+import enum
+from typing import Iterable, Protocol
+
+GROUND = "GROUND"
+
+
+class OccurrenceRelationship(enum.Enum):
+    TRANSFORM = 1  # As in hierarchy parenting
+    CONNECTION = 2  # As in a rigid joint or other designator
+    GROUP = 3  # As in a Rigid Grouping
+    NEXT = 4  # As in next_joint in list
+    END = 5  # Orphaned child relationship
+
+
+class OccurrenceLike(Protocol):
+    isGrounded: bool
+    children: list[str]
+
+
+class JointLike(Protocol):
+    jointType: int
+    occurrenceOne: str | None
+    occurrenceTwo: str | None
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: dict[str, str] = {}
+        self.size: dict[str, int] = {}
+
+    def find(self, item: str) -> str:
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            return item
+
+        # Path halving keeps the trees flat without recursion
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+
+        return item
+
+    def union(self, a: str, b: str) -> str:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+    def groups(self) -> dict[str, list[str]]:
+        """Gets every set, keyed by its root, with members in insertion order"""
+        groups: dict[str, list[str]] = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+
+        return groups
+
+
+# (index of the parent entry or -1 for the root, occurrence token, relationship to the parent)
+TreeEntry = tuple[int, str, OccurrenceRelationship | None]
+
+
+class JointGraph:
+    def __init__(self, occurrences: dict[str, OccurrenceLike], joints: Iterable[JointLike], grounded: str):
+        """Builds the graph and links every axis
+
+        Args:
+            occurrences (dict[str, OccurrenceLike]): occurrence token -> occurrence entry
+            joints (Iterable[JointLike]): every joint in the assembly
+            grounded (str): token of the grounded occurrence
+        """
+        self.occurrences = occurrences
+        self.grounded = grounded
+
+        # axis root token -> first dynamic joint rooted there
+        self.axes: dict[str, JointLike] = {}
+
+        # occurrence token -> roots of the axes driven from it
+        self.nextAxes: dict[str, list[str]] = {}
+
+        self.rigidClusters = UnionFind()
+
+        for joint in joints:
+            one, two = joint.occurrenceOne, joint.occurrenceTwo
+            if one is None or two is None:
+                continue
+
+            if joint.jointType != 0:
+                self.axes.setdefault(one, joint)
+                if one != two:
+                    self.nextAxes.setdefault(two, []).append(one)
+            else:
+                self.rigidClusters.union(one, two)
+
+        self.clusterMembers = self.rigidClusters.groups()
+
+        # GROUND or axis root token -> occurrences moving with it, parents always come before their children
+        self.trees: dict[str, list[TreeEntry]] = {}
+
+        # GROUND or axis root token -> roots of the axes connected to it
+        self.connections: dict[str, list[str]] = {}
+
+        self._buildTree(GROUND, grounded, isGround=True)
+        for root in self.axes:
+            if root in self.occurrences and not self.occurrences[root].isGrounded:
+                self._buildTree(root, root, isGround=False)
+
+        # (parent, child) pairs of the axis tree in breadth first order
+        self.links: list[tuple[str, str]] = self._linkAxes()
+
+    def _buildTree(self, key: str, root: str, isGround: bool) -> None:
+        tree: list[TreeEntry] = [(-1, root, None)]
+        connected: list[str] = []
+        visited = {root}
+        expandedClusters = set()
+        stack = [0]
+
+        def canVisit(token: str) -> bool:
+            occurrence = self.occurrences.get(token)
+            if occurrence is None or (occurrence.isGrounded and not isGround):
+                return False
+
+            return token not in visited and token not in self.axes
+
+        while stack:
+            position = stack.pop()
+            token = tree[position][1]
+
+            neighbours = [(child, OccurrenceRelationship.TRANSFORM) for child in self.occurrences[token].children]
+
+            if token in self.rigidClusters.parent:
+                cluster = self.rigidClusters.find(token)
+                if cluster not in expandedClusters:
+                    expandedClusters.add(cluster)
+                    neighbours.extend(
+                        (member, OccurrenceRelationship.CONNECTION) for member in self.clusterMembers[cluster]
+                    )
+
+            for neighbour, relationship in neighbours:
+                if canVisit(neighbour):
+                    visited.add(neighbour)
+                    tree.append((position, neighbour, relationship))
+                    stack.append(len(tree) - 1)
+
+            for axis in self.nextAxes.get(token, ()):
+                occurrence = self.occurrences.get(axis)
+                if occurrence is None or (occurrence.isGrounded and not isGround) or axis in connected:
+                    continue
+
+                connected.append(axis)
+                tree.append((position, axis, OccurrenceRelationship.NEXT))
+
+        self.trees[key] = tree
+        self.connections[key] = connected
+
+    def _linkAxes(self) -> list[tuple[str, str]]:
+        links = []
+        linked = {GROUND}
+        queue = collections.deque([GROUND])
+        while queue:
+            parent = queue.popleft()
+            for axis in self.connections.get(parent, ()):
+                if axis in linked or axis not in self.trees:
+                    continue
+
+                linked.add(axis)
+                links.append((parent, axis))
+                queue.append(axis)
+
+        return links
@@ -11,8 +11,9 @@ from proto.proto_out import joint_pb2, types_pb2
 from ...general_imports import *
 from ...Logging import getLogger, logFailure
 from ..ExporterOptions import ExporterOptions
+from .AssemblyIndex import AssemblyIndex, JointEntry, OccurrenceEntry
+from .JointGraph import GROUND, JointGraph, OccurrenceRelationship
 from .PDMessage import PDMessage
-from .Utilities import guid_component, guid_occurrence
 
 logger = getLogger()
 
@@ -74,14 +75,6 @@ class GraphEdge:
         return (edge for edge in self.node.edges)
 
 
-class OccurrenceRelationship(enum.Enum):
-    TRANSFORM = 1  # As in hierarchy parenting
-    CONNECTION = 2  # As in a rigid joint or other designator
-    GROUP = 3  # As in a Rigid Grouping
-    NEXT = 4  # As in next_joint in list
-    END = 5  # Orphaned child relationship
-
-
 class JointRelationship(enum.Enum):
     GROUND = 1  # This currently has no bearing
     ROTATIONAL = 2  # This currently has no bearing
@@ -91,10 +84,11 @@ class JointRelationship(enum.Enum):
 
 
 class DynamicOccurrenceNode(GraphNode):
-    def __init__(self, occurrence: adsk.fusion.Occurrence, isGround=False, previous=None):
-        super().__init__(occurrence)
+    def __init__(self, entry: OccurrenceEntry, isGround=False, previous=None):
+        super().__init__(entry.occurrence)
+        self.entry = entry
         self.isGround = isGround
-        self.name = occurrence.name
+        self.name = entry.name
 
     def print(self):
         print(f"\n\t-------{self.data.name}-------")
@@ -124,7 +118,7 @@ class DynamicOccurrenceNode(GraphNode):
         nextItems = list()
         for edge in self.edges:
             if edge.relationship == OccurrenceRelationship.NEXT:
-                nextItems.append(edge.node.data.entityToken)
+                nextItems.append(edge.node.entry.token)
             else:
                 nextItems.extend(edge.node.getConnectedAxisTokens())
         return nextItems
@@ -147,7 +141,7 @@ class SimulationNode(GraphNode):
     def __init__(
         self,
         dynamicJoint: DynamicOccurrenceNode,
-        joint: adsk.fusion.Joint,
+        joint: JointEntry | None,
         grounded=False,
     ):
         super().__init__(dynamicJoint)
@@ -182,7 +176,7 @@ class SimulationEdge(GraphEdge):
 
 class JointParser:
     @logFailure
-    def __init__(self, design):
+    def __init__(self, design, index: AssemblyIndex):
         # Create hierarchy with just joint assembly
         # - Assembly
         #   - Grounded
@@ -190,250 +184,51 @@ class JointParser:
         #   - Axis 2
         #     - Axis 3
 
-        # 1. Find all Dynamic joint items to isolate                        [o]
-        # 2. Find the grounded component                                    [x] (possible - not optimized)
-        # 3. Populate tree with all items from each set of joints           [x] (done with grounding)
-        # - 3. a) Each Child element with no joints                         [x]
-        # - 3. b) Each Rigid Joint Connection                               [x]
-        # 4. Link Joint trees by discovery from root                        [x]
-        # 5. Record which trees have no children for creating end effectors [x] (next up) - this kinda already exists
-
-        # Need to investigate creating an additional button for end effector possibly
-        # It might be possible to have multiple end effectors
-        # Total Number of final elements
+        # 1. Find all Dynamic joint items to isolate
+        # 2. Find the grounded component
+        # 3. Populate tree with all items from each set of joints
+        # - 3. a) Each Child element with no joints
+        # - 3. b) Each Rigid Joint Connection
+        # 4. Link Joint trees by discovery from root
+        # 5. Record which trees have no children for creating end effectors
 
-        self.current = None
-        self.previousJoint = None
+        # The graph itself is built by JointGraph, this only wraps it in the node types used by the exporter
 
         self.design = design
+        self.index = index
 
         # this can be dynamically assigned if we want
-        self.grounded = searchForGrounded(design.rootComponent)
+        self.grounded = index.grounded
 
         if self.grounded is None:
             gm.ui.messageBox("There is not currently a Grounded Component in the assembly, stopping kinematic export.")
             raise RuntimeWarning("There is no grounded component")
 
-        self.currentTraversal = dict()
-        self.groundedConnections = []
-
-        # populate the rigidJoints connected to a given occurrence
-        self.rigidJoints = dict()
-        # populate all joints
-        self.dynamicJoints = dict()
-
-        self.simulationNodesRef = dict()
-
-        # TODO: need to look through every single joint and find the starting point that is connected to ground
-        # Next add that occurrence to the graph and then traverse down that path etc
-        self.__getAllJoints()
+        self.graph = JointGraph(index.occurrences, index.joints, self.grounded.token)
 
         # dynamic joint node for grounded components and static components
-        rootNode = self._populateNode(self.grounded, None, None, is_ground=True)
-        self.groundSimNode = SimulationNode(rootNode, None, grounded=True)
+        self.groundSimNode = SimulationNode(self._createTree(GROUND), None, grounded=True)
+        self.simulationNodesRef = {GROUND: self.groundSimNode}
 
-        self.simulationNodesRef["GROUND"] = self.groundSimNode
+        # creates the axis elements
+        for token, joint in self.graph.axes.items():
+            if token in self.graph.trees:
+                self.simulationNodesRef[token] = SimulationNode(self._createTree(token), joint)
 
-        # combine all ground prior to this possibly
-        self._lookForGroundedJoints()
+        for parent, child in self.graph.links:
+            edge = SimulationEdge(JointRelationship.GROUND, self.simulationNodesRef[child])
+            self.simulationNodesRef[parent].edges.append(edge)
 
-        # creates the axis elements - adds all elements to axisNodes
-        for key, value in self.dynamicJoints.items():
-            self._populateAxis(key, value)
+    def _createTree(self, key: str) -> DynamicOccurrenceNode:
+        nodes: list[DynamicOccurrenceNode] = []
+        for parent, token, relationship in self.graph.trees[key]:
+            node = DynamicOccurrenceNode(self.index.occurrences[token])
+            nodes.append(node)
 
-        self._linkAllAxis()
+            if parent >= 0:
+                nodes[parent].edges.append(DynamicEdge(relationship, node))
 
-        # self.groundSimNode.printLink()
-
-    @logFailure
-    def __getAllJoints(self):
-        for joint in list(self.design.rootComponent.allJoints) + list(self.design.rootComponent.allAsBuiltJoints):
-            if joint and joint.occurrenceOne and joint.occurrenceTwo:
-                occurrenceOne = joint.occurrenceOne
-                occurrenceTwo = joint.occurrenceTwo
-            else:
-                return None
-
-            if occurrenceOne is None:
-                try:
-                    occurrenceOne = joint.geometryOrOriginOne.entityOne.assemblyContext
-                except:
-                    pass
-
-            if occurrenceTwo is None:
-                try:
-                    occurrenceTwo = joint.geometryOrOriginTwo.entityOne.assemblyContext
-                except:
-                    pass
-
-            oneEntityToken = ""
-            twoEntityToken = ""
-
-            try:
-                oneEntityToken = occurrenceOne.entityToken
-            except:
-                oneEntityToken = occurrenceOne.name
-
-            try:
-                twoEntityToken = occurrenceTwo.entityToken
-            except:
-                twoEntityToken = occurrenceTwo.name
-
-            typeJoint = joint.jointMotion.jointType
-
-            if typeJoint != 0:
-                if oneEntityToken not in self.dynamicJoints.keys():
-                    self.dynamicJoints[oneEntityToken] = joint
-
-                if occurrenceTwo is None and occurrenceOne is None:
-                    logger.error(
-                        f"Occurrences that connect joints could not be found\n\t1: {occurrenceOne}\n\t2: {occurrenceTwo}"
-                    )
-                    return None
-            else:
-                if oneEntityToken == self.grounded.entityToken:
-                    self.groundedConnections.append(occurrenceTwo)
-                elif twoEntityToken == self.grounded.entityToken:
-                    self.groundedConnections.append(occurrenceOne)
-
-    def _linkAllAxis(self):
-        # looks through each simulation nood starting with ground and orders them using edges
-        # self.groundSimNode is ground
-        self._recurseLink(self.groundSimNode)
-
-    def _recurseLink(self, simNode: SimulationNode):
-        connectedAxisNodes = [
-            self.simulationNodesRef.get(componentKeys, None) for componentKeys in simNode.data.getConnectedAxisTokens()
-        ]
-        for connectedAxis in connectedAxisNodes:
-            # connected is the occurrence
-            if connectedAxis is not None:
-                edge = SimulationEdge(JointRelationship.GROUND, connectedAxis)
-                simNode.edges.append(edge)
-                self._recurseLink(connectedAxis)
-
-    def _lookForGroundedJoints(self):
-        grounded_token = self.grounded.entityToken
-        rootDynamicJoint = self.groundSimNode.data
-
-        for grounded_connect in self.groundedConnections:
-            self.currentTraversal = dict()
-            self._populateNode(
-                grounded_connect,
-                rootDynamicJoint,
-                OccurrenceRelationship.CONNECTION,
-                is_ground=False,
-            )
-
-    def _populateAxis(self, occ_token: str, joint: adsk.fusion.Joint):
-        occ = self.design.findEntityByToken(occ_token)[0]
-
-        if occ is None:
-            return
-
-        self.currentTraversal = dict()
-
-        rootNode = self._populateNode(occ, None, None)
-
-        if rootNode is not None:
-            axisNode = SimulationNode(rootNode, joint)
-            self.simulationNodesRef[occ_token] = axisNode
-
-    def _populateNode(
-        self,
-        occ: adsk.fusion.Occurrence,
-        prev: DynamicOccurrenceNode,
-        relationship: OccurrenceRelationship,
-        is_ground=False,
-    ):
-        if occ.isGrounded and not is_ground:
-            return
-        elif (relationship == OccurrenceRelationship.NEXT) and (prev is not None):
-            node = DynamicOccurrenceNode(occ)
-            edge = DynamicEdge(relationship, node)
-            prev.edges.append(edge)
-            return
-        elif ((occ.entityToken in self.dynamicJoints.keys()) and (prev is not None)) or self.currentTraversal.get(
-            occ.entityToken
-        ) is not None:
-            return
-
-        node = DynamicOccurrenceNode(occ)
-
-        self.currentTraversal[occ.entityToken] = True
-
-        for occurrence in occ.childOccurrences:
-            self._populateNode(occurrence, node, OccurrenceRelationship.TRANSFORM, is_ground=is_ground)
-
-        # if not is_ground:  # THIS IS A BUG - OCCURRENCE ACCESS VIOLATION
-        try:
-            for joint in occ.joints:
-                if joint and joint.occurrenceOne and joint.occurrenceTwo:
-                    occurrenceOne = joint.occurrenceOne
-                    occurrenceTwo = joint.occurrenceTwo
-                    connection = None
-                    rigid = joint.jointMotion.jointType == 0
-
-                    if rigid:
-                        if joint.occurrenceOne == occ:
-                            connection = joint.occurrenceTwo
-                        if joint.occurrenceTwo == occ:
-                            connection = joint.occurrenceOne
-                    else:
-                        if joint.occurrenceOne != occ:
-                            connection = joint.occurrenceOne
-
-                    if connection is not None:
-                        if prev is None or connection.entityToken != prev.data.entityToken:
-                            self._populateNode(
-                                connection,
-                                node,
-                                (OccurrenceRelationship.CONNECTION if rigid else OccurrenceRelationship.NEXT),
-                                is_ground=is_ground,
-                            )
-                else:
-                    continue
-        except:
-            pass  # This is to temporarily bypass the bug
-
-        if prev is not None:
-            edge = DynamicEdge(relationship, node)
-            prev.edges.append(edge)
-
-        self.currentTraversal[occ.entityToken] = node
-        return node
-
-
-def searchForGrounded(
-    occ: adsk.fusion.Occurrence,
-) -> Union[adsk.fusion.Occurrence, None]:
-    """Search for a grounded component or occurrence in the assembly
-
-    Args:
-        occ (adsk.fusion.Occurrence): start point
-
-    Returns:
-        Union(adsk.fusion.Occurrence, None): Either a grounded part or nothing
-    """
-    if occ.objectType == "adsk::fusion::Component":
-        # this makes it possible to search an object twice (unoptimized)
-        collection = occ.allOccurrences
-
-        # components cannot be grounded technically
-
-    else:  # Object is an occurrence
-        if occ.isGrounded:
-            return occ
-
-        collection = occ.childOccurrences
-
-    for occ in collection:
-        searched = searchForGrounded(occ)
-
-        if searched != None:
-            return searched
-
-    return None
+        return nodes[0]
 
 
 # ________________________ Build implementation ______________________ #
@@ -445,12 +240,13 @@ def BuildJointPartHierarchy(
     joints: joint_pb2.Joints,
     options: ExporterOptions,
     progressDialog: PDMessage,
+    index: AssemblyIndex,
 ):
     try:
         progressDialog.currentMessage = f"Constructing Simulation Hierarchy"
         progressDialog.update()
 
-        jointParser = JointParser(design)
+        jointParser = JointParser(design, index)
         rootSimNode = jointParser.groundSimNode
 
         populateJoint(rootSimNode, joints, progressDialog)
@@ -473,31 +269,27 @@ def BuildJointPartHierarchy(
 
 
 def populateJoint(simNode: SimulationNode, joints: joint_pb2.Joints, progressDialog):
-    if progressDialog.wasCancelled():
-        raise RuntimeError("User canceled export")
-
-    if not simNode.joint:
-        proto_joint = joints.joint_instances["grounded"]
-    else:
-        proto_joint = joints.joint_instances[simNode.joint.entityToken]
-
-    progressDialog.currentMessage = f"Linking Parts to Joint: {proto_joint.info.name}"
-    progressDialog.update()
+    # Iterative so long joint chains can't hit the recursion limit
+    pending = [simNode]
+    while pending:
+        if progressDialog.wasCancelled():
+            raise RuntimeError("User canceled export")
 
-    if not proto_joint:
-        logger.error(f"Could not find protobuf joint for {simNode.name}")
-        return
+        simNode = pending.pop()
 
-    root = types_pb2.Node()
+        if not simNode.joint:
+            proto_joint = joints.joint_instances["grounded"]
+        else:
+            proto_joint = joints.joint_instances[simNode.joint.token]
 
-    # construct body tree if possible
-    createTreeParts(simNode.data, OccurrenceRelationship.CONNECTION, root, progressDialog)
+        progressDialog.currentMessage = f"Linking Parts to Joint: {proto_joint.info.name}"
+        progressDialog.update()
 
-    proto_joint.parts.nodes.append(root)
+        # construct body tree if possible
+        createTreeParts(simNode.data, OccurrenceRelationship.CONNECTION, proto_joint.parts.nodes.add(), progressDialog)
 
-    # next in line to be populated
-    for edge in simNode.edges:
-        populateJoint(edge.node, joints, progressDialog)
+        # next in line to be populated
+        pending.extend(edge.node for edge in reversed(simNode.edges))
 
 
 def createTreeParts(
@@ -506,33 +298,21 @@ def createTreeParts(
     node: types_pb2.Node,
     progressDialog,
 ):
-    if progressDialog.wasCancelled():
-        raise RuntimeError("User canceled export")
+    pending = [(dynNode, relationship, node)]
+    while pending:
+        if progressDialog.wasCancelled():
+            raise RuntimeError("User canceled export")
 
-    # if it's the next part just exit early for our own sanity
-    if relationship == OccurrenceRelationship.NEXT or dynNode.data.isLightBulbOn == False:
-        return
+        dynNode, relationship, node = pending.pop()
 
-    # set the occurrence / component id to reference the part
+        # if it's the next part just exit early for our own sanity
+        if relationship == OccurrenceRelationship.NEXT or dynNode.entry.isLightBulbOn == False:
+            continue
 
-    try:
-        objectType = dynNode.data.objectType
-    except:
-        objectType = ""
-
-    if objectType == "adsk::fusion::Occurrence":
-        node.value = guid_occurrence(dynNode.data)
-    elif objectType == "adsk::fusion::Component":
-        node.value = guid_component(dynNode.data)
-    else:
-        try:
-            node.value = dynNode.data.entityToken
-        except RuntimeError:
-            node.value = dynNode.data.name
-
-    # possibly add additional information for the type of connection made
-    # recurse and add all children connections
-    for edge in dynNode.edges:
-        child_node = types_pb2.Node()
-        createTreeParts(edge.node, edge.relationship, child_node, progressDialog)
-        node.children.append(child_node)
+        # set the occurrence id to reference the part
+        node.value = dynNode.entry.guid
+
+        # possibly add additional information for the type of connection made
+        # add all children connections
+        for edge in dynNode.edges:
+            pending.append((edge.node, edge.relationship, node.children.add()))
@@ -35,8 +35,9 @@ from ...general_imports import *
 from ...Logging import getLogger
 from ...Types import JointParentType, SignalType
 from ..ExporterOptions import ExporterOptions
+from .AssemblyIndex import AssemblyIndex, JointEntry
 from .PDMessage import PDMessage
-from .Utilities import construct_info, fill_info, guid_occurrence
+from .Utilities import construct_info, fill_info
 
 logger = getLogger()
 
@@ -69,6 +70,7 @@ def populateJoints(
     progressDialog: PDMessage,
     options: ExporterOptions,
     assembly: assembly_pb2.Assembly,
+    index: AssemblyIndex,
 ):
     fill_info(joints, None)
 
@@ -88,37 +90,38 @@ def populateJoints(
 
     # Add the rest of the dynamic objects
 
-    for joint in list(design.rootComponent.allJoints) + list(design.rootComponent.allAsBuiltJoints):
-        if joint.isSuppressed:
+    for entry in index.joints:
+        if entry.isSuppressed:
             continue
 
-        # turn RigidJoints into RigidGroups
-        if joint.jointMotion.jointType == 0:
-            _addRigidGroup(joint, assembly)
+        # RigidJoints are merged into RigidGroups by RigidGroup.ExportRigidGroups
+        if entry.jointType == 0:
             continue
 
         # for now if it's not a revolute or slider joint ignore it
-        if joint.jointMotion.jointType != 1 and joint.jointMotion.jointType != 2:
+        if entry.jointType != 1 and entry.jointType != 2:
             continue
 
+        joint = entry.joint
+
         try:
             #  Fusion has no instances of joints but lets roll with it anyway
 
             # progressDialog.message = f"Exporting Joint configuration {joint.name}"
-            progressDialog.addJoint(joint.name)
+            progressDialog.addJoint(entry.name)
 
             # create the definition
-            joint_definition = joints.joint_definitions[joint.entityToken]
+            joint_definition = joints.joint_definitions[entry.token]
             _addJoint(joint, joint_definition)
 
             # create the instance of the single definition
-            joint_instance = joints.joint_instances[joint.entityToken]
+            joint_instance = joints.joint_instances[entry.token]
 
             for parse_joints in options.joints:
-                if parse_joints.jointToken == joint.entityToken:
+                if parse_joints.jointToken == entry.token:
                     guid = str(uuid.uuid4())
                     signal = signals.signal_map[guid]
-                    construct_info(joint.name, signal, GUID=guid)
+                    construct_info(entry.name, signal, GUID=guid)
                     signal.io = signal_pb2.IOType.OUTPUT
 
                     # really could just map the enum to a friggin string
@@ -128,19 +131,19 @@ def populateJoints(
                         elif parse_joints.signalType == SignalType.PWM:
                             signal.device_type = signal_pb2.DeviceType.PWM
 
-                        motor = joints.motor_definitions[joint.entityToken]
-                        fill_info(motor, joint)
+                        motor = joints.motor_definitions[entry.token]
+                        construct_info(entry.name, motor, GUID=entry.token)
                         simple_motor = motor.simple_motor
                         simple_motor.stall_torque = parse_joints.force
                         simple_motor.max_velocity = parse_joints.speed
                         simple_motor.braking_constant = 0.8  # Default for now
-                        joint_definition.motor_reference = joint.entityToken
+                        joint_definition.motor_reference = entry.token
 
                         joint_instance.signal_reference = signal.info.GUID
                     # else:
                     #     signals.signal_map.remove(guid)
 
-            _addJointInstance(joint, joint_instance, joint_definition, signals, options)
+            _addJointInstance(entry, joint_instance, joint_definition, signals, options, index)
 
             # adds information for joint motion and limits
             _motionFromJoint(joint.jointMotion, joint_definition)
@@ -170,22 +173,23 @@ def _addJoint(joint: adsk.fusion.Joint, joint_definition: joint_pb2.Joint):
 
 
 def _addJointInstance(
-    joint: adsk.fusion.Joint,
+    entry: JointEntry,
     joint_instance: joint_pb2.JointInstance,
     joint_definition: joint_pb2.Joint,
     signals: signal_pb2.Signals,
     options: ExporterOptions,
+    index: AssemblyIndex,
 ):
-    fill_info(joint_instance, joint)
+    construct_info(entry.name, joint_instance, GUID=entry.token)
     # because there is only one and we are using the token - should be the same
     joint_instance.joint_reference = joint_instance.info.GUID
 
     # Need to check if it is in a rigidgroup first, if yes then make the parent the actual parent
 
     # assign part id values - bug with entity tokens
-    joint_instance.parent_part = guid_occurrence(joint.occurrenceOne)
+    joint_instance.parent_part = index.occurrences[entry.occurrenceOne].guid
 
-    joint_instance.child_part = guid_occurrence(joint.occurrenceTwo)
+    joint_instance.child_part = index.occurrences[entry.occurrenceTwo].guid
 
     # FIX FOR ISSUE WHERE CHILD PART IS ACTUAL PART OF A LARGER GROUP THAT IS RIGID
     # MAY ALSO BE A FIX FR THE HIERARCHY DETECTION
@@ -205,7 +209,7 @@ def _addJointInstance(
 
     if options.wheels:
         for wheel in options.wheels:
-            if wheel.jointToken == joint.entityToken:
+            if wheel.jointToken == entry.token:
                 joint_definition.user_data.data["wheel"] = "true"
 
                 # Must convert type 'enum' to int to store wheelType in mirabuf
@@ -230,19 +234,6 @@ def _addJointInstance(
                     joint_instance.signal_reference = ""
 
 
-def _addRigidGroup(joint: adsk.fusion.Joint, assembly: assembly_pb2.Assembly):
-    if joint.jointMotion.jointType != 0 or not (
-        joint.occurrenceOne.isLightBulbOn and joint.occurrenceTwo.isLightBulbOn
-    ):
-        return
-
-    mira_group = joint_pb2.RigidGroup()
-    mira_group.name = f"group_{joint.occurrenceOne.name}_{joint.occurrenceTwo.name}"
-    mira_group.occurrences.append(guid_occurrence(joint.occurrenceOne))
-    mira_group.occurrences.append(guid_occurrence(joint.occurrenceTwo))
-    assembly.data.joints.rigid_groups.append(mira_group)
-
-
 def _motionFromJoint(fusionMotionDefinition: adsk.fusion.JointMotion, proto_joint: joint_pb2.Joint) -> None:
     # if fusionJoint.geometryOrOriginOne.objectType == "adsk::fusion::JointGeometry"
     # create the DOF depending on what kind of information the joint has
@@ -341,40 +332,6 @@ def noop(*argv):
     pass
 
 
-def _searchForGrounded(
-    occ: adsk.fusion.Occurrence,
-) -> Union[adsk.fusion.Occurrence, None]:
-    """Search for a grounded component or occurrence in the assembly
-
-    Args:
-        occ (adsk.fusion.Occurrence): start point
-
-    Returns:
-        Union(adsk.fusion.Occurrence, None): Either a grounded part or nothing
-    """
-
-    # Why did I not just supply all occurrences for some reason?
-    if occ.objectType == "adsk::fusion::Component":
-        # this makes it possible to search an object twice (unoptimized)
-        collection = occ.allOccurrences
-
-        # components cannot be grounded technically
-
-    else:  # Object is an occurrence
-        if occ.isGrounded:
-            return occ
-
-        collection = occ.childOccurrences
-
-    for occ in collection:
-        searched = _searchForGrounded(occ)
-
-        if searched != None:
-            return searched
-
-    return None
-
-
 def _jointOrigin(fusionJoint: Union[adsk.fusion.Joint, adsk.fusion.AsBuiltJoint]) -> adsk.core.Point3D:
     """#### Joint Origin Internal Finder that was orignally created for Synthesis by Liam Wang
 
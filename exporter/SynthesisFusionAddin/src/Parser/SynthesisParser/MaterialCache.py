@@ -0,0 +1,62 @@
+"""Persistent on-disk cache of converted appearances and physical materials
+
+Converting a material reads a dozen properties through the Fusion API, and a design is usually exported many
+times while tuning the export options, so every export converted the same materials all over again. This cache
+stores the serialized `Appearance` and `PhysicalMaterial` messages across exports.
+
+- A single cache file shared by every design
+- Entries are keyed by the saved version of the design, along with the Fusion id and name of the material and the
+  options that change the conversion. The materials and appearances of a design are its own copies, and one edited
+  in the design keeps the id and name of the library entry it was copied from, so nothing on the material itself
+  tells whether it was edited. Saving the edit makes a new version of the design though.
+- Designs with changes that aren't saved yet aren't cached at all, see `openMaterialCache`
+- The least recently used entries are dropped once there are more than `MAX_ENTRIES`, see `DiskCache`
+"""
+
+import os
+
+from ...general_imports import my_addin_path
+from ..ExporterOptions import ExporterOptions
+from .DiskCache import DiskCache
+
+# Bump whenever the conversion in `Materials` or the format of the cached data changes to invalidate old caches.
+CACHE_VERSION = 2
+CACHE_DIRECTORY = os.path.abspath(os.path.join(my_addin_path, "..", "cache", "materials"))
+MAX_ENTRIES = 4096
+
+
+def appearanceCacheKey(designVersion: str, appearanceId: str, name: str) -> str:
+    return f"appearance_{designVersion}_{appearanceId}_{name}"
+
+
+def physicalMaterialCacheKey(designVersion: str, materialId: str, name: str, options: ExporterOptions) -> str:
+    """Creates the cache key for a physical material, which depends on the friction override"""
+    friction = f"override_{options.frictionOverrideCoeff}" if options.frictionOverride else "table"
+    return f"physical_{designVersion}_{materialId}_{name}_{friction}"
+
+
+class MaterialCache(DiskCache):
+    def __init__(self, designVersion: str, directory: str = CACHE_DIRECTORY, maxEntries: int = MAX_ENTRIES):
+        """Opens the cache for a saved version of a design
+
+        Args:
+            designVersion (str): version id of the saved design, entries of other versions aren't used
+        """
+        super().__init__(os.path.join(directory, "materials.cache"), CACHE_VERSION, maxEntries, "Material cache")
+        self.designVersion = designVersion
+
+
+def openMaterialCache(document: any, directory: str = CACHE_DIRECTORY) -> MaterialCache | None:
+    """Opens the cache for the saved version of a document
+
+    Args:
+        document (adsk.core.Document): document of the design being exported
+
+    Returns:
+        MaterialCache | None: the cache, or None if the document has changes that aren't saved, since edits to its
+            materials can't be told apart from the saved ones
+    """
+    if not document.isSaved or document.isModified:
+        return None
+
+    return MaterialCache(document.dataFile.versionId, directory)
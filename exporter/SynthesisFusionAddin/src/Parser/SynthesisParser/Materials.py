@@ -11,6 +11,8 @@ from proto.proto_out import material_pb2
 from ...general_imports import *
 from ...Logging import logFailure, timed
 from ..ExporterOptions import ExporterOptions
+from .AssemblyIndex import AssemblyIndex
+from .MaterialCache import MaterialCache, appearanceCacheKey, physicalMaterialCacheKey
 from .PDMessage import PDMessage
 from .Utilities import *
 
@@ -39,17 +41,26 @@ def _MapAllPhysicalMaterials(
     materials: material_pb2.Materials,
     options: ExporterOptions,
     progressDialog: PDMessage,
+    cache: MaterialCache | None = None,
 ) -> None:
     setDefaultMaterial(materials.physicalMaterials["default"], options)
 
     for material in physicalMaterials:
-        progressDialog.addMaterial(material.name)
+        name = material.name
+        progressDialog.addMaterial(name)
 
         if progressDialog.wasCancelled():
             raise RuntimeError("User canceled export")
 
         newmaterial = materials.physicalMaterials[material.id]
-        getPhysicalMaterialData(material, newmaterial, options)
+
+        # Only trusted for the version of the design the entry was converted from, see `MaterialCache`
+        key = physicalMaterialCacheKey(cache.designVersion, material.id, name, options) if cache is not None else ""
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            newmaterial.ParseFromString(cached)
+        elif getPhysicalMaterialData(material, newmaterial, options) and cache is not None:
+            cache.put(key, newmaterial.SerializeToString())
 
 
 def setDefaultMaterial(physical_material: material_pb2.PhysicalMaterial, options: ExporterOptions):
@@ -76,6 +87,9 @@ def getPhysicalMaterialData(fusion_material, proto_material, options):
         fusion_material (fusionmaterial): Fusion Material
         proto_material (protomaterial): proto material mirabuf
         options (parseoptions): parse options
+
+    Returns:
+        bool: True once all of the data was read, failures are logged and return None
     """
     construct_info("", proto_material, fus_object=fusion_material)
 
@@ -144,12 +158,46 @@ def getPhysicalMaterialData(fusion_material, proto_material, options):
     ).value
     """
 
+    return True
+
+
+def _ReferencedAppearances(index: AssemblyIndex) -> dict[str, adsk.core.Appearance]:
+    """Collects the appearances used by visible bodies and occurrence overrides
+
+    `design.appearances` also holds every appearance ever applied to the design, which is usually far more than
+    what is still used, so only these are exported.
+
+    Returns:
+        dict[str, adsk.core.Appearance]: appearance key, as referenced by bodies and part instances -> appearance
+    """
+    referenced: dict[str, adsk.core.Appearance] = {}
+
+    def addAppearance(appearance: adsk.core.Appearance | None) -> None:
+        if appearance:
+            referenced.setdefault("{}_{}".format(appearance.name, appearance.id), appearance)
+
+    for component in index.components.values():
+        for bodies in (component.bRepBodies, component.meshBodies):
+            for body in bodies:
+                if body.isLightBulbOn:
+                    addAppearance(body.appearance)
+
+    for entry in index.occurrences.values():
+        try:
+            addAppearance(entry.occurrence.appearance)
+        except:
+            # Same as `Components._OccurrenceAppearance`, which falls back to the default appearance
+            pass
+
+    return referenced
+
 
 def _MapAllAppearances(
-    appearances: list,
+    appearances: dict[str, adsk.core.Appearance],
     materials: material_pb2.Materials,
     options: ExporterOptions,
     progressDialog: PDMessage,
+    cache: MaterialCache | None = None,
 ) -> None:
     # in case there are no appearances on a body
     # this is just a color tho
@@ -157,14 +205,24 @@ def _MapAllAppearances(
 
     fill_info(materials, None)
 
-    for appearance in appearances:
-        progressDialog.addAppearance(appearance.name)
+    for key, appearance in appearances.items():
+        name = appearance.name
+        progressDialog.addAppearance(name)
 
         if progressDialog.wasCancelled():
             raise RuntimeError("User canceled export")
 
-        material = materials.appearances["{}_{}".format(appearance.name, appearance.id)]
-        getMaterialAppearance(appearance, options, material)
+        material = materials.appearances[key]
+
+        # Only trusted for the version of the design the entry was converted from, see `MaterialCache`
+        cacheKey = appearanceCacheKey(cache.designVersion, appearance.id, name) if cache is not None else ""
+        cached = cache.get(cacheKey) if cache is not None else None
+        if cached is not None:
+            material.ParseFromString(cached)
+        else:
+            getMaterialAppearance(appearance, options, material)
+            if cache is not None:
+                cache.put(cacheKey, material.SerializeToString())
 
 
 def setDefaultAppearance(appearance: material_pb2.Appearance) -> None:
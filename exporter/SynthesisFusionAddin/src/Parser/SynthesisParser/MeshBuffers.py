@@ -0,0 +1,89 @@
+"""Bulk conversion of raw mesh arrays into mirabuf `Mesh` messages.
+
+The protobuf runtime already converts a Python list handed to `.extend()` in a single native call,
+so lists coming straight from the Fusion API are passed through as is. Float data that is already
+held in a contiguous buffer (`array('f')`, `bytes`, `memoryview`) is instead handed to protobuf as
+an encoded packed field, which is copied without converting a single value.
+
+See `tools/benchmarkMeshTransfer.py` for the numbers behind these choices.
+
+This module intentionally has no Fusion dependencies so it can be used from worker threads and tools.
+"""
+
+import sys
+from array import array
+from typing import Sequence
+
+# Field numbers of `mirabuf.Mesh`
+VERTS_FIELD = 1
+NORMALS_FIELD = 2
+UV_FIELD = 3
+
+LENGTH_DELIMITED = 2
+
+BUFFER_TYPES = (array, bytes, bytearray, memoryview)
+
+
+def encodeVarint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    out.append(value)
+    return bytes(out)
+
+
+def packFloats(values: Sequence[float]) -> bytes:
+    """Packs floats as little endian 32 bit floats, the protobuf wire format of a packed float field."""
+    if isinstance(values, (bytes, bytearray, memoryview)):
+        return bytes(values)
+
+    buffer = values if isinstance(values, array) and values.typecode == "f" else array("f", values)
+    if sys.byteorder == "big":
+        buffer = array("f", buffer)
+        buffer.byteswap()
+
+    return buffer.tobytes()
+
+
+def encodePackedField(fieldNumber: int, payload: bytes) -> bytes:
+    """Encodes an already packed payload as a length delimited protobuf field."""
+    if not payload:
+        return b""
+
+    return encodeVarint((fieldNumber << 3) | LENGTH_DELIMITED) + encodeVarint(len(payload)) + payload
+
+
+def fillMesh(
+    plainmesh_out,
+    verts: Sequence[float],
+    normals: Sequence[float],
+    indices: Sequence[int],
+    uv: Sequence[float],
+) -> None:
+    """Appends the raw mesh arrays to a `mirabuf.Mesh` message.
+
+    Args:
+        plainmesh_out (assembly_pb2.Mesh): mesh message to fill
+        verts (Sequence[float]): flat xyz vertex positions
+        normals (Sequence[float]): flat xyz vertex normals
+        indices (Sequence[int]): triangle indices
+        uv (Sequence[float]): flat uv coordinates
+    """
+    packed = b""
+    for fieldNumber, field, values in (
+        (VERTS_FIELD, plainmesh_out.verts, verts),
+        (NORMALS_FIELD, plainmesh_out.normals, normals),
+        (UV_FIELD, plainmesh_out.uv, uv),
+    ):
+        if isinstance(values, BUFFER_TYPES):
+            packed += encodePackedField(fieldNumber, packFloats(values))
+        else:
+            field.extend(values)
+
+    if packed:
+        plainmesh_out.MergeFromString(packed)
+
+    # int32 fields are varint encoded on the wire so they can't be copied as a raw buffer.
+    plainmesh_out.indices.extend(indices)
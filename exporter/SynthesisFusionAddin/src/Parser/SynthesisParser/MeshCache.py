@@ -0,0 +1,119 @@
+"""Persistent on-disk cache of tessellated body meshes
+
+Re-exporting a design re-tessellates every BRep body even if only a single subassembly was modified.
+This cache stores the serialized `TriangleMesh` of each body so that unchanged bodies can be reused.
+
+- One cache file per component, named after a hash of `guid_component(component)`
+- Entries are keyed by body entity token, visual quality and body revision id
+- Entries not used during an export are pruned when the component file is rewritten
+"""
+
+import hashlib
+import os
+import pickle
+
+import adsk.fusion
+
+from ...general_imports import my_addin_path
+from ...Logging import getLogger, logFailure
+
+logger = getLogger()
+
+# Bump whenever the format of the cached mesh data changes to invalidate old caches.
+CACHE_VERSION = 1
+CACHE_DIRECTORY = os.path.abspath(os.path.join(my_addin_path, "..", "cache", "meshes"))
+
+
+def bodyCacheKey(body: adsk.fusion.BRepBody, quality: int, optimized: bool = False, quantized: bool = False) -> str:
+    """Creates the cache key for a body at a given tessellation quality
+
+    Args:
+        body (adsk.fusion.BRepBody): Fusion body
+        quality (int): TriangleMeshQualityOptions used to calculate the mesh
+        optimized (bool): if the mesh was welded and reordered by `MeshOptimizer`
+        quantized (bool): if the mesh was stored quantized by `MeshEncoding`
+
+    Returns:
+        str: key that changes whenever the body is modified
+    """
+    suffix = ("_optimized" if optimized else "") + ("_quantized" if quantized else "")
+    return f"{body.entityToken}_{int(quality)}{suffix}_{body.revisionId}"
+
+
+class MeshCache:
+    def __init__(self, directory: str = CACHE_DIRECTORY):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+        # component ref -> { body key -> TriangleMesh bytes } as read from disk
+        self._loaded: dict[str, dict[str, bytes]] = {}
+
+        # component ref -> { body key -> TriangleMesh bytes } used during this export
+        self._used: dict[str, dict[str, bytes]] = {}
+
+    def get(self, componentRef: str, bodyKey: str) -> bytes | None:
+        """Gets the serialized mesh of a body if it has been cached
+
+        Args:
+            componentRef (str): guid of the component containing the body
+            bodyKey (str): key generated by `bodyCacheKey`
+
+        Returns:
+            bytes | None: serialized `TriangleMesh` or None if not cached
+        """
+        data = self._load(componentRef).get(bodyKey)
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._used.setdefault(componentRef, {})[bodyKey] = data
+        return data
+
+    def put(self, componentRef: str, bodyKey: str, data: bytes) -> None:
+        self._used.setdefault(componentRef, {})[bodyKey] = data
+
+    @logFailure
+    def flush(self) -> None:
+        """Writes every component touched during this export back to disk, dropping stale entries"""
+        os.makedirs(self.directory, exist_ok=True)
+        for componentRef, entries in self._used.items():
+            if entries == self._loaded.get(componentRef):
+                continue
+
+            path = self._path(componentRef)
+            tempPath = f"{path}.tmp"
+            with open(tempPath, "wb") as f:
+                pickle.dump({"version": CACHE_VERSION, "entries": entries}, f)
+
+            os.replace(tempPath, path)
+
+        logger.debug(self.report())
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total else 0.0
+        return f"Mesh cache: {self.hits} hits, {self.misses} misses ({ratio:.1f}% reused)"
+
+    def _path(self, componentRef: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha1(componentRef.encode()).hexdigest()}.cache")
+
+    def _load(self, componentRef: str) -> dict[str, bytes]:
+        if componentRef in self._loaded:
+            return self._loaded[componentRef]
+
+        entries = {}
+        path = self._path(componentRef)
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    data = pickle.load(f)
+
+                if data.get("version") == CACHE_VERSION:
+                    entries = data["entries"]
+            except Exception:
+                logger.warning(f"Discarding unreadable mesh cache file {path}")
+
+        self._loaded[componentRef] = entries
+        return entries
@@ -0,0 +1,232 @@
+"""Quantized encoding of mirabuf meshes into `TriangleMesh.bmesh`.
+
+Raw 32 bit floats make up most of an exported assembly. Quantized meshes are stored in `BinaryMesh.data` instead of
+`TriangleMesh.mesh`, little endian, with everything needed to decode them in the header:
+
+    char[4]     magic, "MQM1"
+    uint32      flags, 1 if there are normals, 2 if there are uvs
+    uint32      vertex count
+    uint32      index count
+    float32[3]  position offset
+    float32[3]  position scale
+    float32[2]  uv offset
+    float32[2]  uv scale
+    uint16[3n]  positions, offset + value * scale, so 16 bits across the bounding box of the body
+    int16[2n]   normals, octahedral encoded and normalized to [-32767, 32767]
+    uint16[2n]  uvs, offset + value * scale
+    varint[]    indices, every index as the zigzag encoded difference to the previous index
+
+The viewer expands them back into `Mesh` when loading, see `fission/src/mirabuf/BinaryMesh.ts`.
+
+This module intentionally has no Fusion dependencies so it can be used from worker threads and tools.
+"""
+
+import struct
+import sys
+from array import array
+from typing import Sequence
+
+MAGIC = b"MQM1"
+HAS_NORMALS = 1
+HAS_UV = 2
+
+HEADER = struct.Struct("<4s3I10f")
+
+QUANTIZED_MAX = 65535
+NORMAL_MAX = 32767
+
+
+def _toFloat32(value: float) -> float:
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def _littleEndian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def _fromLittleEndian(typecode: str, data: bytes) -> array:
+    values = array(typecode, data)
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values
+
+
+def _quantizationRange(values: Sequence[float], components: int) -> tuple[list[float], list[float]]:
+    """Gets the offset and scale per component, rounded to float32 so the encoder matches the decoder exactly"""
+    offsets, scales = [], []
+    for component in range(components):
+        column = values[component::components]
+        low = _toFloat32(min(column)) if column else 0.0
+        high = max(column) if column else 0.0
+        offsets.append(low)
+        scales.append(_toFloat32((high - low) / QUANTIZED_MAX))
+
+    return offsets, scales
+
+
+def _quantize(values: Sequence[float], components: int, offsets: list[float], scales: list[float]) -> array:
+    quantized = array("H", bytes(len(values) * 2))
+    for component in range(components):
+        offset, scale = offsets[component], scales[component]
+        if scale == 0.0:
+            continue
+
+        quantized[component::components] = array(
+            "H", [min(QUANTIZED_MAX, max(0, round((x - offset) / scale))) for x in values[component::components]]
+        )
+
+    return quantized
+
+
+def encodeOctahedral(normals: Sequence[float]) -> array:
+    """Encodes unit normals as two signed 16 bit values each, by projecting them onto an octahedron"""
+    encoded = array("h")
+    for i in range(0, len(normals) - 2, 3):
+        x, y, z = normals[i], normals[i + 1], normals[i + 2]
+        length = abs(x) + abs(y) + abs(z)
+        if length == 0.0:
+            encoded.extend((0, 0))
+            continue
+
+        x, y, z = x / length, y / length, z / length
+        if z < 0.0:
+            x, y = (1.0 - abs(y)) * (1.0 if x >= 0.0 else -1.0), (1.0 - abs(x)) * (1.0 if y >= 0.0 else -1.0)
+
+        encoded.extend((round(max(-1.0, min(1.0, x)) * NORMAL_MAX), round(max(-1.0, min(1.0, y)) * NORMAL_MAX)))
+
+    return encoded
+
+
+def decodeOctahedral(encoded: Sequence[int]) -> array:
+    normals = array("f")
+    for i in range(0, len(encoded) - 1, 2):
+        x, y = encoded[i] / NORMAL_MAX, encoded[i + 1] / NORMAL_MAX
+        z = 1.0 - abs(x) - abs(y)
+        if z < 0.0:
+            x, y = (1.0 - abs(y)) * (1.0 if x >= 0.0 else -1.0), (1.0 - abs(x)) * (1.0 if y >= 0.0 else -1.0)
+
+        length = (x * x + y * y + z * z) ** 0.5
+        normals.extend((x / length, y / length, z / length))
+
+    return normals
+
+
+def encodeIndices(indices: Sequence[int]) -> bytes:
+    """Encodes indices as zigzag varints of the difference to the previous index, which is small for ordered meshes"""
+    out = bytearray()
+    previous = 0
+    for index in indices:
+        delta = index - previous
+        previous = index
+        value = (delta << 1) ^ (delta >> 63)
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+
+        out.append(value)
+
+    return bytes(out)
+
+
+def decodeIndices(data: bytes, count: int, offset: int = 0) -> array:
+    indices = array("i")
+    previous = 0
+    for _ in range(count):
+        value = shift = 0
+        while True:
+            byte = data[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+
+        previous += (value >> 1) ^ -(value & 1)
+        indices.append(previous)
+
+    return indices
+
+
+def encodeBinaryMesh(
+    verts: Sequence[float], normals: Sequence[float], indices: Sequence[int], uv: Sequence[float]
+) -> bytes:
+    """Encodes a mesh in the quantized format described above
+
+    Args:
+        verts (Sequence[float]): flat xyz vertex positions
+        normals (Sequence[float]): flat xyz vertex normals, left out unless there is one per vertex
+        indices (Sequence[int]): triangle indices
+        uv (Sequence[float]): flat uv coordinates, left out unless there is one per vertex
+    """
+    vertexCount = len(verts) // 3
+    hasNormals = len(normals) == len(verts) and vertexCount > 0
+    hasUv = len(uv) == vertexCount * 2 and vertexCount > 0
+    positionOffset, positionScale = _quantizationRange(verts, 3)
+    uvOffset, uvScale = _quantizationRange(uv, 2) if hasUv else ([0.0, 0.0], [0.0, 0.0])
+
+    flags = (HAS_NORMALS if hasNormals else 0) | (HAS_UV if hasUv else 0)
+    parts = [
+        HEADER.pack(MAGIC, flags, vertexCount, len(indices), *positionOffset, *positionScale, *uvOffset, *uvScale),
+        _littleEndian(_quantize(verts, 3, positionOffset, positionScale)),
+    ]
+
+    if hasNormals:
+        parts.append(_littleEndian(encodeOctahedral(normals)))
+
+    if hasUv:
+        parts.append(_littleEndian(_quantize(uv, 2, uvOffset, uvScale)))
+
+    parts.append(encodeIndices(indices))
+    return b"".join(parts)
+
+
+def decodeBinaryMesh(data: bytes) -> tuple[array, array, array, array]:
+    """Decodes a mesh encoded by `encodeBinaryMesh`
+
+    Returns:
+        tuple[array, array, array, array]: verts, normals, indices and uv, normals and uv are empty if left out
+    """
+    magic, flags, vertexCount, indexCount, *ranges = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Unknown binary mesh format {magic!r}")
+
+    positionOffset, positionScale, uvOffset, uvScale = ranges[0:3], ranges[3:6], ranges[6:8], ranges[8:10]
+    offset = HEADER.size
+
+    quantized = _fromLittleEndian("H", data[offset : offset + vertexCount * 6])
+    offset += vertexCount * 6
+    verts = array("f", [positionOffset[i % 3] + value * positionScale[i % 3] for i, value in enumerate(quantized)])
+
+    normals = array("f")
+    if flags & HAS_NORMALS:
+        normals = decodeOctahedral(_fromLittleEndian("h", data[offset : offset + vertexCount * 4]))
+        offset += vertexCount * 4
+
+    uv = array("f")
+    if flags & HAS_UV:
+        quantized = _fromLittleEndian("H", data[offset : offset + vertexCount * 4])
+        offset += vertexCount * 4
+        uv = array("f", [uvOffset[i % 2] + value * uvScale[i % 2] for i, value in enumerate(quantized)])
+
+    return verts, normals, decodeIndices(data, indexCount, offset), uv
+
+
+def meshIndexCount(trimesh) -> int:
+    """Gets the number of indices of a `TriangleMesh` without decoding it"""
+    if trimesh.WhichOneof("mesh_type") == "bmesh":
+        return HEADER.unpack_from(trimesh.bmesh.data)[3]
+
+    return len(trimesh.mesh.indices)
+
+
+def meshArrays(trimesh) -> tuple[Sequence[float], Sequence[float], Sequence[int], Sequence[float]]:
+    """Gets the verts, normals, indices and uv of a `TriangleMesh`, whichever way it is stored"""
+    if trimesh.WhichOneof("mesh_type") == "bmesh":
+        return decodeBinaryMesh(trimesh.bmesh.data)
+
+    return trimesh.mesh.verts, trimesh.mesh.normals, trimesh.mesh.indices, trimesh.mesh.uv
@@ -0,0 +1,218 @@
+"""Vertex welding and index buffer optimization of tessellated bodies.
+
+Fusion tessellates every face of a body on its own, so vertices along the seams between faces are duplicated and
+the triangles come out face by face. Optimizing a mesh:
+
+- welds vertices whose position, normal and uv are equal after quantizing them to a tolerance, so hard edges with
+  different normals on each side are kept
+- drops triangles that are degenerate once welded
+- reorders the triangles for the post transform vertex cache, with Tom Forsyth's "Linear-Speed Vertex Cache
+  Optimisation"
+- reorders the vertices in the order the triangles first use them, so vertex fetches are close together
+
+This module intentionally has no Fusion dependencies so it can be used from worker threads and tools.
+"""
+
+from array import array
+from dataclasses import dataclass
+from typing import Sequence
+
+# Fusion lengths are in centimeters, positions closer than this are welded
+WELD_TOLERANCE = 1e-5
+NORMAL_TOLERANCE = 1e-3
+UV_TOLERANCE = 1e-5
+
+# Size of the simulated vertex cache, and the scoring constants suggested by Forsyth
+CACHE_SIZE = 32
+CACHE_DECAY_POWER = 1.5
+LAST_TRIANGLE_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+_CACHE_SCORES = [LAST_TRIANGLE_SCORE] * 3 + [
+    (1.0 - (position - 3) / (CACHE_SIZE - 3)) ** CACHE_DECAY_POWER for position in range(3, CACHE_SIZE)
+]
+
+
+@dataclass
+class MeshOptimizationStats:
+    verticesBefore: int
+    verticesAfter: int
+    indicesBefore: int
+    indicesAfter: int
+
+
+def _vertexScore(cachePosition: int, remainingTriangles: int) -> float:
+    if remainingTriangles == 0:
+        return -1.0
+
+    score = _CACHE_SCORES[cachePosition] if 0 <= cachePosition < CACHE_SIZE else 0.0
+    return score + VALENCE_BOOST_SCALE * remainingTriangles**-VALENCE_BOOST_POWER
+
+
+def weldVertices(
+    verts: Sequence[float],
+    normals: Sequence[float],
+    uv: Sequence[float],
+    tolerance: float = WELD_TOLERANCE,
+) -> tuple[array, list[int]]:
+    """Finds the vertices that are equal once quantized
+
+    Normals and uvs are only compared when there is one per vertex.
+
+    Returns:
+        tuple[array, list[int]]: welded index of every vertex, and the first vertex of every welded index
+    """
+    vertexCount = len(verts) // 3
+    scale = 1.0 / tolerance
+    quantized = [round(x * scale) for x in verts]
+    keyParts = [quantized[0::3], quantized[1::3], quantized[2::3]]
+
+    if len(normals) == len(verts):
+        quantized = [round(x / NORMAL_TOLERANCE) for x in normals]
+        keyParts += [quantized[0::3], quantized[1::3], quantized[2::3]]
+
+    if len(uv) == vertexCount * 2:
+        quantized = [round(x / UV_TOLERANCE) for x in uv]
+        keyParts += [quantized[0::2], quantized[1::2]]
+
+    remap = array("i", bytes(vertexCount * 4))
+    representatives: list[int] = []
+    unique: dict[tuple, int] = {}
+    for vertex, key in enumerate(zip(*keyParts)):
+        welded = unique.setdefault(key, len(representatives))
+        if welded == len(representatives):
+            representatives.append(vertex)
+
+        remap[vertex] = welded
+
+    return remap, representatives
+
+
+def dropDegenerateTriangles(indices: Sequence[int], verts: Sequence[float], representatives: list[int]) -> array:
+    """Drops triangles that reuse a vertex or have no area
+
+    Args:
+        indices (Sequence[int]): welded triangle indices
+        verts (Sequence[float]): flat xyz positions of the original vertices
+        representatives (list[int]): original vertex of every welded index
+    """
+    kept = array("i")
+    for i in range(0, len(indices) - 2, 3):
+        a, b, c = indices[i], indices[i + 1], indices[i + 2]
+        if a == b or b == c or a == c:
+            continue
+
+        pa, pb, pc = representatives[a] * 3, representatives[b] * 3, representatives[c] * 3
+        ux, uy, uz = verts[pb] - verts[pa], verts[pb + 1] - verts[pa + 1], verts[pb + 2] - verts[pa + 2]
+        vx, vy, vz = verts[pc] - verts[pa], verts[pc + 1] - verts[pa + 1], verts[pc + 2] - verts[pa + 2]
+        if uy * vz - uz * vy == 0.0 and uz * vx - ux * vz == 0.0 and ux * vy - uy * vx == 0.0:
+            continue
+
+        kept.extend((a, b, c))
+
+    return kept
+
+
+def optimizeVertexCache(indices: Sequence[int], vertexCount: int) -> array:
+    """Reorders triangles so consecutive triangles reuse the vertices the GPU still has cached"""
+    triangleCount = len(indices) // 3
+    vertexTriangles: list[list[int]] = [[] for _ in range(vertexCount)]
+    for t in range(triangleCount):
+        for vertex in indices[t * 3 : t * 3 + 3]:
+            vertexTriangles[vertex].append(t)
+
+    cachePositions = [-1] * vertexCount
+    vertexScores = [_vertexScore(-1, len(triangles)) for triangles in vertexTriangles]
+    triangleScores = [
+        vertexScores[indices[t * 3]] + vertexScores[indices[t * 3 + 1]] + vertexScores[indices[t * 3 + 2]]
+        for t in range(triangleCount)
+    ]
+    emitted = [False] * triangleCount
+
+    output = array("i")
+    cache: list[int] = []
+    best = max(range(triangleCount), key=triangleScores.__getitem__, default=-1)
+    nextUnemitted = 0
+    while best != -1:
+        emitted[best] = True
+        triangle = indices[best * 3 : best * 3 + 3]
+        output.extend(triangle)
+
+        for vertex in triangle:
+            vertexTriangles[vertex].remove(best)
+
+        # Most recently used first, vertices pushed past the end of the cache are evicted
+        cache = list(triangle) + [vertex for vertex in cache if vertex not in triangle]
+        evicted = cache[CACHE_SIZE:]
+        cache = cache[:CACHE_SIZE]
+
+        touched: set[int] = set()
+        for position, vertex in enumerate(cache):
+            cachePositions[vertex] = position
+        for vertex in evicted:
+            cachePositions[vertex] = -1
+
+        for vertex in cache + evicted:
+            remaining = vertexTriangles[vertex]
+            if not remaining:
+                continue
+
+            score = _vertexScore(cachePositions[vertex], len(remaining))
+            delta = score - vertexScores[vertex]
+            vertexScores[vertex] = score
+            for t in remaining:
+                triangleScores[t] += delta
+            touched.update(remaining)
+
+        best = max(touched, key=triangleScores.__getitem__, default=-1)
+        if best == -1:
+            # Nothing left around the cache, continue with the next triangle in the original order
+            while nextUnemitted < triangleCount and emitted[nextUnemitted]:
+                nextUnemitted += 1
+            best = nextUnemitted if nextUnemitted < triangleCount else -1
+
+    return output
+
+
+def optimizeMesh(
+    verts: Sequence[float],
+    normals: Sequence[float],
+    indices: Sequence[int],
+    uv: Sequence[float],
+    tolerance: float = WELD_TOLERANCE,
+) -> tuple[array, array, array, array, MeshOptimizationStats]:
+    """Welds, cleans and reorders a triangle mesh
+
+    Args:
+        verts (Sequence[float]): flat xyz vertex positions
+        normals (Sequence[float]): flat xyz vertex normals, empty if they are computed later
+        indices (Sequence[int]): valid triangle indices
+        uv (Sequence[float]): flat uv coordinates, empty if the mesh has none
+        tolerance (float): distance below which positions are welded
+
+    Returns:
+        tuple[array, array, array, array, MeshOptimizationStats]: verts, normals, indices and uv of the optimized
+            mesh, normals and uv are empty if they weren't supplied for every vertex
+    """
+    vertexCount = len(verts) // 3
+    remap, representatives = weldVertices(verts, normals, uv, tolerance)
+    welded = dropDegenerateTriangles([remap[i] for i in indices], verts, representatives)
+    ordered = optimizeVertexCache(welded, len(representatives))
+
+    # Number the vertices in the order they are first used, unused vertices are dropped
+    fetchOrder: dict[int, int] = {}
+    outIndices = array("i", [fetchOrder.setdefault(i, len(fetchOrder)) for i in ordered])
+    originals = [representatives[i] for i in fetchOrder]
+
+    outVerts = array("f", [verts[v * 3 + axis] for v in originals for axis in range(3)])
+    outNormals = array("f")
+    if len(normals) == len(verts):
+        outNormals = array("f", [normals[v * 3 + axis] for v in originals for axis in range(3)])
+
+    outUv = array("f")
+    if len(uv) == vertexCount * 2:
+        outUv = array("f", [uv[v * 2 + axis] for v in originals for axis in range(2)])
+
+    stats = MeshOptimizationStats(vertexCount, len(originals), len(indices), len(outIndices))
+    return outVerts, outNormals, outIndices, outUv, stats
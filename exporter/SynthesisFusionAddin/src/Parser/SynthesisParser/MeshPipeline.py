@@ -0,0 +1,314 @@
+"""Producer / consumer pipeline that builds `TriangleMesh` messages on worker threads.
+
+The Fusion API can only be used from the main thread, so the main thread only pulls the raw mesh arrays out of
+Fusion and hands them off as a `RawMesh`. Everything that does not touch Fusion (index validation, optional
+welding and reordering, normal recomputation, simplification, convex hulls, float packing and serialization) runs
+on worker threads. Finished meshes are handed back to the main thread through a callback so the protobuf assembly
+is only ever modified from a single thread.
+
+These stages are pure Python and hold the GIL, so workers never build meshes in parallel with each other or with
+the export on the main thread. What the workers overlap is the time the main thread spends in Fusion tessellating
+the next body, which happens in native code. A process pool isn't an option since Fusion's embedded interpreter
+can't start worker processes. See `tools/benchmarkExport.py workers` for the difference the workers make against
+building the meshes inline.
+
+The number of meshes in flight is bounded so memory use stays capped on large assemblies.
+"""
+
+import collections
+import math
+import os
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from proto.proto_out import assembly_pb2
+
+from ...Logging import getLogger
+from ...Profiling import currentStack, profileSpan
+from .ConvexHull import convexHull
+from .MeshBuffers import fillMesh
+from .MeshEncoding import encodeBinaryMesh
+from .MeshOptimizer import optimizeMesh
+from .MeshSimplifier import MeshSimplifier
+
+logger = getLogger()
+
+# Matches the version used by `Utilities.construct_info`
+INFO_VERSION = 5
+
+# Worker threads building meshes, 0 builds them inline on the main thread
+MESH_WORKERS = min(8, os.cpu_count() or 1)
+
+
+@dataclass
+class RawMesh:
+    name: str
+    guid: str
+    verts: Sequence[float]
+    normals: Sequence[float]
+    indices: Sequence[int]
+    uv: Sequence[float]
+
+
+def validateIndices(indices: Sequence[int], vertexCount: int) -> Sequence[int]:
+    """Drops any triangle that is incomplete or references a vertex that does not exist."""
+    triangleCount = len(indices) // 3
+    if len(indices) == triangleCount * 3 and (not indices or (min(indices) >= 0 and max(indices) < vertexCount)):
+        return indices
+
+    valid = array("i")
+    for i in range(0, triangleCount * 3, 3):
+        a, b, c = indices[i], indices[i + 1], indices[i + 2]
+        if 0 <= a < vertexCount and 0 <= b < vertexCount and 0 <= c < vertexCount:
+            valid.extend((a, b, c))
+
+    logger.warning(f"Dropped {triangleCount - len(valid) // 3} invalid triangles")
+    return valid
+
+
+def computeNormals(verts: Sequence[float], indices: Sequence[int]) -> array:
+    """Computes smooth, area weighted vertex normals for a triangle mesh."""
+    normals = array("f", bytes(len(verts) * 4))
+    for i in range(0, len(indices) - 2, 3):
+        a, b, c = indices[i] * 3, indices[i + 1] * 3, indices[i + 2] * 3
+        e1x, e1y, e1z = verts[b] - verts[a], verts[b + 1] - verts[a + 1], verts[b + 2] - verts[a + 2]
+        e2x, e2y, e2z = verts[c] - verts[a], verts[c + 1] - verts[a + 1], verts[c + 2] - verts[a + 2]
+        nx, ny, nz = e1y * e2z - e1z * e2y, e1z * e2x - e1x * e2z, e1x * e2y - e1y * e2x
+        for v in (a, b, c):
+            normals[v] += nx
+            normals[v + 1] += ny
+            normals[v + 2] += nz
+
+    for v in range(0, len(normals), 3):
+        length = math.sqrt(normals[v] ** 2 + normals[v + 1] ** 2 + normals[v + 2] ** 2)
+        if length > 0.0:
+            normals[v] /= length
+            normals[v + 1] /= length
+            normals[v + 2] /= length
+
+    return normals
+
+
+def buildTriangleMesh(
+    raw: RawMesh, parentStack: tuple[str, ...] | None = None, optimize: bool = False, quantize: bool = False
+) -> bytes:
+    """Builds and serializes a `TriangleMesh` from raw mesh arrays. Safe to call from any thread.
+
+    Args:
+        raw (RawMesh): raw arrays pulled from Fusion
+        parentStack (tuple[str, ...] | None): profiling stack of the body the mesh was submitted from
+        optimize (bool): weld duplicate vertices and reorder the triangles, see `MeshOptimizer`
+        quantize (bool): store the mesh quantized in `bmesh` instead of `mesh`, see `MeshEncoding`
+    """
+    with profileSpan("build mesh", "mesh", parentStack, body=raw.name):
+        verts, normals, uv = raw.verts, raw.normals, raw.uv
+        with profileSpan("convert", "mesh"):
+            indices = validateIndices(raw.indices, len(verts) // 3)
+
+        if optimize:
+            with profileSpan("optimize", "mesh"):
+                verts, normals, indices, uv, stats = optimizeMesh(verts, normals, indices, uv)
+                logger.debug(
+                    f"Optimized mesh of {raw.name}: {stats.verticesBefore} -> {stats.verticesAfter} vertices, "
+                    f"{stats.indicesBefore} -> {stats.indicesAfter} indices"
+                )
+
+        with profileSpan("convert", "mesh"):
+            if len(normals) != len(verts):
+                normals = computeNormals(verts, indices)
+
+        with profileSpan("serialize", "mesh"):
+            trimesh = assembly_pb2.TriangleMesh()
+            trimesh.info.name = raw.name
+            trimesh.info.GUID = raw.guid
+            trimesh.info.version = INFO_VERSION
+            trimesh.has_volume = True
+
+            if quantize:
+                trimesh.bmesh.data = encodeBinaryMesh(verts, normals, indices, uv)
+            else:
+                fillMesh(trimesh.mesh, array("f", verts), array("f", normals), indices, array("f", uv))
+
+            return trimesh.SerializeToString()
+
+
+def buildLodChain(
+    raw: RawMesh,
+    triangleRatios: Sequence[float],
+    parentStack: tuple[str, ...] | None = None,
+    quantize: bool = False,
+) -> list[tuple[int, bytes]]:
+    """Builds and serializes a `TriangleMesh` for every level of detail of a mesh. Safe to call from any thread.
+
+    Each level is simplified from the previous one, normals are recomputed and uvs are dropped.
+
+    Args:
+        raw (RawMesh): full detail mesh
+        triangleRatios (Sequence[float]): decreasing fraction of the triangles of the full mesh to keep per level
+        parentStack (tuple[str, ...] | None): profiling stack of the body the mesh was submitted from
+        quantize (bool): store the levels quantized, see `buildTriangleMesh`
+
+    Returns:
+        list[tuple[int, bytes]]: triangle count and serialized `TriangleMesh` of every level
+    """
+    with profileSpan("build lods", "mesh", parentStack, body=raw.name):
+        triangleCount = len(raw.indices) // 3
+        with profileSpan("simplify", "mesh"):
+            simplifier = MeshSimplifier(raw.verts, validateIndices(raw.indices, len(raw.verts) // 3))
+            levels = [simplifier.simplify(int(triangleCount * ratio)) for ratio in triangleRatios]
+
+        return [
+            (
+                len(indices) // 3,
+                buildTriangleMesh(RawMesh(raw.name, raw.guid, verts, [], indices, []), quantize=quantize),
+            )
+            for verts, indices in levels
+        ]
+
+
+def buildCollisionHulls(
+    name: str,
+    meshes: Sequence[Sequence[float]],
+    parentStack: tuple[str, ...] | None = None,
+    quantize: bool = False,
+) -> list[tuple[int, bytes]]:
+    """Builds and serializes a convex hull `TriangleMesh` for every body of a part. Safe to call from any thread.
+
+    Args:
+        name (str): name of the part
+        meshes (Sequence[Sequence[float]]): flat xyz vertex positions of every body
+        parentStack (tuple[str, ...] | None): profiling stack of the part the meshes were submitted from
+        quantize (bool): store the hulls quantized, see `buildTriangleMesh`
+
+    Returns:
+        list[tuple[int, bytes]]: index of the body and serialized `TriangleMesh` of every body that encloses a volume
+    """
+    with profileSpan("build collision hulls", "mesh", parentStack, part=name):
+        hulls = []
+        for i, verts in enumerate(meshes):
+            hull = convexHull(verts)
+            if hull is not None:
+                hullVerts, hullIndices = hull
+                hull = RawMesh(name, f"{name}_hull_{i}", hullVerts, [], hullIndices, [])
+                hulls.append((i, buildTriangleMesh(hull, quantize=quantize)))
+
+        return hulls
+
+
+class MeshPipeline:
+    def __init__(
+        self,
+        maxWorkers: int | None = None,
+        maxPending: int = 64,
+        optimizeMeshes: bool = False,
+        quantizeMeshes: bool = False,
+    ):
+        """Creates the worker pool
+
+        Args:
+            maxWorkers (int | None): number of worker threads, 0 to build meshes inline, defaults to `MESH_WORKERS`
+            maxPending (int): maximum number of meshes queued or being built at once
+            optimizeMeshes (bool): weld and reorder every submitted mesh, see `MeshOptimizer`
+            quantizeMeshes (bool): store every built mesh quantized, see `MeshEncoding`
+        """
+        maxWorkers = MESH_WORKERS if maxWorkers is None else maxWorkers
+        self.executor = ThreadPoolExecutor(maxWorkers, "SynthesisMesh") if maxWorkers > 0 else None
+        self.maxPending = maxPending
+        self.optimizeMeshes = optimizeMeshes
+        self.quantizeMeshes = quantizeMeshes
+        self.pending: collections.deque[tuple[Future, Callable[[any], None]]] = collections.deque()
+
+    def submit(self, raw: RawMesh, onComplete: Callable[[bytes], None]) -> None:
+        """Queues a mesh to be built, blocking while the queue is full
+
+        Args:
+            raw (RawMesh): raw arrays pulled from Fusion
+            onComplete (Callable[[bytes], None]): called on the main thread with the serialized `TriangleMesh`
+        """
+        self._submit(onComplete, buildTriangleMesh, raw, currentStack(), self.optimizeMeshes, self.quantizeMeshes)
+
+    def submitLods(
+        self, raw: RawMesh, triangleRatios: Sequence[float], onComplete: Callable[[list[tuple[int, bytes]]], None]
+    ) -> None:
+        """Queues the levels of detail of a mesh to be built, see `buildLodChain`
+
+        Args:
+            raw (RawMesh): full detail mesh
+            triangleRatios (Sequence[float]): fraction of the triangles of the full mesh to keep per level
+            onComplete (Callable[[list[tuple[int, bytes]]], None]): called on the main thread with every level
+        """
+        self._submit(onComplete, buildLodChain, raw, triangleRatios, currentStack(), self.quantizeMeshes)
+
+    def submitHulls(
+        self, name: str, meshes: Sequence[Sequence[float]], onComplete: Callable[[list[tuple[int, bytes]]], None]
+    ) -> None:
+        """Queues the collision hulls of the bodies of a part to be built, see `buildCollisionHulls`
+
+        Args:
+            name (str): name of the part
+            meshes (Sequence[Sequence[float]]): flat xyz vertex positions of every body
+            onComplete (Callable[[list[tuple[int, bytes]]], None]): called on the main thread with every hull
+        """
+        self._submit(onComplete, buildCollisionHulls, name, meshes, currentStack(), self.quantizeMeshes)
+
+    def then(self, callback: Callable[[], None]) -> None:
+        """Runs a callback on the main thread once every mesh submitted before it has been handed back
+
+        Args:
+            callback (Callable[[], None]): function to run
+        """
+        marker = Future()
+        marker.set_result(b"")
+        self.pending.append((marker, lambda _: callback()))
+        self._completeFinished()
+
+    def drain(self) -> None:
+        """Blocks until every queued mesh has been built and handed back"""
+        while self.pending:
+            self._completeOldest()
+
+    def _submit(self, onComplete: Callable[[any], None], function: Callable[..., any], *args: any) -> None:
+        while len(self.pending) >= self.maxPending:
+            self._completeOldest()
+
+        if self.executor is not None:
+            future = self.executor.submit(function, *args)
+        else:
+            # Built right away, but still handed back in order behind anything queued with `then`
+            future = Future()
+            try:
+                future.set_result(function(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.pending.append((future, onComplete))
+        self._completeFinished()
+
+    def _completeFinished(self) -> None:
+        # Hand back whatever has already finished, in order, so results don't pile up
+        while self.pending and self.pending[0][0].done():
+            self._completeOldest()
+
+    def _completeOldest(self) -> None:
+        future, onComplete = self.pending.popleft()
+        try:
+            data = future.result()
+        except Exception:
+            logger.exception("Failed to build mesh")
+            return
+
+        onComplete(data)
+
+    def __enter__(self) -> "MeshPipeline":
+        return self
+
+    def __exit__(self, excType: type, *_: any) -> None:
+        if excType is None:
+            self.drain()
+        else:
+            self.pending.clear()
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,239 @@
+"""Quadric error metric mesh simplification, used to build level of detail meshes.
+
+Implements the edge collapse simplifier from Garland and Heckbert, "Surface Simplification Using Quadric Error
+Metrics". Every vertex accumulates the planes of the triangles around it, and the edge whose collapse adds the
+least squared distance to those planes is collapsed first. Open edges get an extra plane perpendicular to their
+triangle so the outline of a mesh is kept, and collapses that would flip a triangle are skipped.
+
+This module intentionally has no Fusion dependencies so it can be used from worker threads and tools.
+"""
+
+import heapq
+import math
+from array import array
+from typing import Sequence
+
+# Weight of the planes added along open edges, relative to the planes of the triangles
+BOUNDARY_WEIGHT = 1000.0
+
+# Quadrics are stored as the 10 unique values of the symmetric 4x4 matrix
+# [aa, ab, ac, ad, bb, bc, bd, cc, cd, dd] of the plane ax + by + cz + d = 0
+Quadric = list[float]
+
+
+def _planeQuadric(a: float, b: float, c: float, d: float, weight: float) -> Quadric:
+    return [
+        weight * a * a,
+        weight * a * b,
+        weight * a * c,
+        weight * a * d,
+        weight * b * b,
+        weight * b * c,
+        weight * b * d,
+        weight * c * c,
+        weight * c * d,
+        weight * d * d,
+    ]
+
+
+def _addQuadric(into: Quadric, other: Quadric) -> None:
+    for i in range(10):
+        into[i] += other[i]
+
+
+def _quadricError(q: Quadric, x: float, y: float, z: float) -> float:
+    return (
+        q[0] * x * x
+        + 2 * q[1] * x * y
+        + 2 * q[2] * x * z
+        + 2 * q[3] * x
+        + q[4] * y * y
+        + 2 * q[5] * y * z
+        + 2 * q[6] * y
+        + q[7] * z * z
+        + 2 * q[8] * z
+        + q[9]
+    )
+
+
+def _cross(u: Sequence[float], v: Sequence[float]) -> tuple[float, float, float]:
+    return (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+
+
+def _sub(u: Sequence[float], v: Sequence[float]) -> tuple[float, float, float]:
+    return (u[0] - v[0], u[1] - v[1], u[2] - v[2])
+
+
+class MeshSimplifier:
+    def __init__(self, verts: Sequence[float], indices: Sequence[int]):
+        """Prepares a triangle mesh for simplification
+
+        Args:
+            verts (Sequence[float]): flat xyz vertex positions
+            indices (Sequence[int]): triangle indices
+        """
+        self.positions = [[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts) - 2, 3)]
+        self.triangles = [[indices[i], indices[i + 1], indices[i + 2]] for i in range(0, len(indices) - 2, 3)]
+        self.triangleAlive = [True] * len(self.triangles)
+        self.triangleCount = len(self.triangles)
+
+        self.quadrics: list[Quadric] = [[0.0] * 10 for _ in self.positions]
+        self.vertexTriangles: list[set[int]] = [set() for _ in self.positions]
+
+        # Bumped whenever a vertex moves so queued collapses involving it can be recognised as stale
+        self.versions = [0] * len(self.positions)
+
+        edgeUses: dict[tuple[int, int], list[int]] = {}
+        for t, triangle in enumerate(self.triangles):
+            if len(set(triangle)) < 3:
+                self.triangleAlive[t] = False
+                self.triangleCount -= 1
+                continue
+
+            normal, length = self._normal(triangle)
+            if length > 0.0:
+                a, b, c = (n / length for n in normal)
+                d = -(a * self.positions[triangle[0]][0] + b * self.positions[triangle[0]][1])
+                d -= c * self.positions[triangle[0]][2]
+                quadric = _planeQuadric(a, b, c, d, length / 2)
+                for vertex in triangle:
+                    _addQuadric(self.quadrics[vertex], quadric)
+
+            for vertex in triangle:
+                self.vertexTriangles[vertex].add(t)
+
+            for i in range(3):
+                edge = (min(triangle[i], triangle[(i + 1) % 3]), max(triangle[i], triangle[(i + 1) % 3]))
+                edgeUses.setdefault(edge, []).append(t)
+
+        self.heap: list[tuple[float, int, int, int, int, tuple[float, float, float]]] = []
+        for (v1, v2), triangles in edgeUses.items():
+            if len(triangles) == 1:
+                self._addBoundaryQuadric(v1, v2, triangles[0])
+
+        for v1, v2 in edgeUses:
+            self._queueEdge(v1, v2)
+
+    def _normal(self, triangle: Sequence[int]) -> tuple[tuple[float, float, float], float]:
+        p0, p1, p2 = (self.positions[v] for v in triangle)
+        normal = _cross(_sub(p1, p0), _sub(p2, p0))
+        return normal, math.sqrt(normal[0] ** 2 + normal[1] ** 2 + normal[2] ** 2)
+
+    def _addBoundaryQuadric(self, v1: int, v2: int, triangle: int) -> None:
+        normal, length = self._normal(self.triangles[triangle])
+        edge = _sub(self.positions[v2], self.positions[v1])
+        a, b, c = _cross(edge, normal)
+        planeLength = math.sqrt(a * a + b * b + c * c)
+        if planeLength == 0.0 or length == 0.0:
+            return
+
+        a, b, c = a / planeLength, b / planeLength, c / planeLength
+        p = self.positions[v1]
+        d = -(a * p[0] + b * p[1] + c * p[2])
+        quadric = _planeQuadric(a, b, c, d, BOUNDARY_WEIGHT * (edge[0] ** 2 + edge[1] ** 2 + edge[2] ** 2))
+        _addQuadric(self.quadrics[v1], quadric)
+        _addQuadric(self.quadrics[v2], quadric)
+
+    def _optimalPosition(self, q: Quadric, v1: int, v2: int) -> tuple[float, tuple[float, float, float]]:
+        # Solve A x = -b for the position of least error with the adjugate of the symmetric matrix A, falling back
+        # to the ends and the midpoint of the edge when A is singular, for example on flat areas
+        a, b, c, d, e, f = q[0], q[1], q[2], q[4], q[5], q[7]
+        c00, c01, c02 = d * f - e * e, c * e - b * f, b * e - c * d
+        det = a * c00 + b * c01 + c * c02
+        if abs(det) > 1e-12:
+            c11, c12, c22 = a * f - c * c, b * c - a * e, a * d - b * b
+            r0, r1, r2 = -q[3], -q[6], -q[8]
+            position = (
+                (c00 * r0 + c01 * r1 + c02 * r2) / det,
+                (c01 * r0 + c11 * r1 + c12 * r2) / det,
+                (c02 * r0 + c12 * r1 + c22 * r2) / det,
+            )
+            return _quadricError(q, *position), position
+
+        p1, p2 = self.positions[v1], self.positions[v2]
+        candidates = (tuple(p1), tuple(p2), ((p1[0] + p2[0]) / 2, (p1[1] + p2[1]) / 2, (p1[2] + p2[2]) / 2))
+        return min((_quadricError(q, *position), position) for position in candidates)
+
+    def _queueEdge(self, v1: int, v2: int) -> None:
+        q = [x + y for x, y in zip(self.quadrics[v1], self.quadrics[v2])]
+        cost, position = self._optimalPosition(q, v1, v2)
+        heapq.heappush(self.heap, (cost, v1, v2, self.versions[v1], self.versions[v2], position))
+
+    def _flips(self, vertex: int, other: int, position: tuple[float, float, float]) -> bool:
+        """Checks if moving `vertex` to `position` flips any of its triangles that don't also use `other`"""
+        for t in self.vertexTriangles[vertex]:
+            triangle = self.triangles[t]
+            if other in triangle:
+                continue
+
+            before, beforeLength = self._normal(triangle)
+            moved = [position if v == vertex else self.positions[v] for v in triangle]
+            after = _cross(_sub(moved[1], moved[0]), _sub(moved[2], moved[0]))
+            if before[0] * after[0] + before[1] * after[1] + before[2] * after[2] <= 0.0 and beforeLength > 0.0:
+                return True
+
+        return False
+
+    def _collapse(self, v1: int, v2: int, position: tuple[float, float, float]) -> None:
+        self.positions[v1] = list(position)
+        _addQuadric(self.quadrics[v1], self.quadrics[v2])
+        self.versions[v1] += 1
+        self.versions[v2] += 1
+
+        for t in self.vertexTriangles[v2]:
+            triangle = self.triangles[t]
+            if v1 in triangle:
+                self.triangleAlive[t] = False
+                self.triangleCount -= 1
+                for vertex in triangle:
+                    if vertex != v2:
+                        self.vertexTriangles[vertex].discard(t)
+            else:
+                triangle[triangle.index(v2)] = v1
+                self.vertexTriangles[v1].add(t)
+
+        self.vertexTriangles[v2] = set()
+
+        neighbours = {vertex for t in self.vertexTriangles[v1] for vertex in self.triangles[t] if vertex != v1}
+        for neighbour in neighbours:
+            self._queueEdge(min(v1, neighbour), max(v1, neighbour))
+
+    def simplify(self, targetTriangles: int) -> tuple[array, array]:
+        """Collapses edges until at most `targetTriangles` remain or no collapse is left
+
+        Can be called repeatedly with decreasing targets to build a chain of levels.
+
+        Returns:
+            tuple[array, array]: flat xyz vertex positions and triangle indices of the simplified mesh
+        """
+        while self.triangleCount > targetTriangles and self.heap:
+            _, v1, v2, version1, version2, position = heapq.heappop(self.heap)
+            if self.versions[v1] != version1 or self.versions[v2] != version2:
+                continue
+
+            if not self.vertexTriangles[v1] or not self.vertexTriangles[v2]:
+                continue
+
+            if self._flips(v1, v2, position) or self._flips(v2, v1, position):
+                continue
+
+            self._collapse(v1, v2, position)
+
+        return self._compact()
+
+    def _compact(self) -> tuple[array, array]:
+        remap: dict[int, int] = {}
+        verts = array("f")
+        indices = array("i")
+        for t, triangle in enumerate(self.triangles):
+            if not self.triangleAlive[t]:
+                continue
+
+            for vertex in triangle:
+                if vertex not in remap:
+                    remap[vertex] = len(remap)
+                    verts.extend(self.positions[vertex])
+
+                indices.append(remap[vertex])
+
+        return verts, indices
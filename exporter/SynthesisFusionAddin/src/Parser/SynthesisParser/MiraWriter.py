@@ -0,0 +1,111 @@
+"""Streaming writer for mirabuf assemblies.
+
+Part definitions make up nearly all of an exported assembly, so instead of keeping every one of them in memory
+until the end of the export they are serialized as soon as they are finished and spooled to a temporary file.
+When the export is done the remaining assembly is serialized around the spooled definitions and streamed into
+the output file, which may be a gzip file, so peak memory is bounded by the largest single part.
+
+The output is wire compatible with `Assembly.SerializeToString()`. Every part definition is written as one
+`Parts.part_definitions` map entry inside a single `Assembly.data` field since some protobuf runtimes
+(protobuf.js) replace, rather than merge, repeated occurrences of a singular message field. Only the framing of
+`Assembly.data` and `AssemblyData.parts` is written by hand, every other field is serialized by protobuf itself.
+"""
+
+import shutil
+import tempfile
+from typing import BinaryIO
+
+from proto.proto_out import assembly_pb2
+
+from .MeshBuffers import LENGTH_DELIMITED, encodeVarint
+
+# Field numbers of the `mirabuf.Assembly` messages on the path to the part definitions
+ASSEMBLY_DATA_FIELD = 2
+ASSEMBLY_DATA_PARTS_FIELD = 1
+PARTS_PART_DEFINITIONS_FIELD = 2
+MAP_KEY_FIELD = 1
+MAP_VALUE_FIELD = 2
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def encodeLengthDelimited(fieldNumber: int, payload: bytes) -> bytes:
+    return encodeLengthPrefix(fieldNumber, len(payload)) + payload
+
+
+def encodeLengthPrefix(fieldNumber: int, length: int) -> bytes:
+    return encodeVarint((fieldNumber << 3) | LENGTH_DELIMITED) + encodeVarint(length)
+
+
+class MiraWriter:
+    def __init__(self):
+        self.spool = tempfile.TemporaryFile()
+        self.spoolSize = 0
+        self.definitionKeys: list[str] = []
+
+    @property
+    def definitionCount(self) -> int:
+        return len(self.definitionKeys)
+
+    def addPartDefinition(self, key: str, partDefinition: assembly_pb2.PartDefinition) -> None:
+        """Serializes a finished part definition to the spool and frees its contents
+
+        The now empty definition is left in its map so references to it can still be checked, it is removed
+        when the assembly is written.
+
+        Args:
+            key (str): key of the definition in `Parts.part_definitions`
+            partDefinition (assembly_pb2.PartDefinition): finished part definition
+        """
+        entry = encodeLengthDelimited(MAP_KEY_FIELD, key.encode()) + encodeLengthDelimited(
+            MAP_VALUE_FIELD, partDefinition.SerializeToString()
+        )
+        chunk = encodeLengthDelimited(PARTS_PART_DEFINITIONS_FIELD, entry)
+
+        self.spool.write(chunk)
+        self.spoolSize += len(chunk)
+        self.definitionKeys.append(key)
+        partDefinition.Clear()
+
+    def write(self, assembly: assembly_pb2.Assembly, out: BinaryIO) -> None:
+        """Writes the assembly along with every spooled part definition
+
+        Args:
+            assembly (assembly_pb2.Assembly): assembly to write, spooled definitions will be removed from it
+            out (BinaryIO): binary stream to write to, for example an open file or gzip file
+        """
+        data = assembly.data
+        for key in self.definitionKeys:
+            del data.parts.part_definitions[key]
+
+        # Serialize every other field by clearing the ones written here and parsing them back afterwards, which
+        # leaves the assembly as it was without holding a copy of it
+        partsBytes = data.parts.SerializeToString()
+        data.ClearField("parts")
+        dataBytes = data.SerializeToString()
+        assembly.ClearField("data")
+        assemblyBytes = assembly.SerializeToString()
+        assembly.data.ParseFromString(encodeLengthDelimited(ASSEMBLY_DATA_PARTS_FIELD, partsBytes) + dataBytes)
+
+        partsLength = len(partsBytes) + self.spoolSize
+        partsPrefix = encodeLengthPrefix(ASSEMBLY_DATA_PARTS_FIELD, partsLength)
+        dataLength = len(partsPrefix) + partsLength + len(dataBytes)
+
+        out.write(assemblyBytes)
+        out.write(encodeLengthPrefix(ASSEMBLY_DATA_FIELD, dataLength))
+        out.write(partsPrefix)
+        out.write(partsBytes)
+
+        self.spool.seek(0)
+        shutil.copyfileobj(self.spool, out, COPY_BUFFER_SIZE)
+
+        out.write(dataBytes)
+
+    def close(self) -> None:
+        self.spool.close()
+
+    def __enter__(self) -> "MiraWriter":
+        return self
+
+    def __exit__(self, *_: any) -> None:
+        self.close()
@@ -1,9 +1,33 @@
-# This is a module intended to be a formatter for the progress dialog message
-# Mainly to make it more convienent to read and get messages from
-# Need additional info on Joints if possible
+"""Formats the export progress dialog and estimates how long the export has left
+
+Every component, occurrence, material and appearance reports its progress here. Rebuilding the message and pushing it
+to the Fusion progress dialog for every one of them adds up on assemblies with tens of thousands of items, so:
+
+- The dialog is redrawn at most `FRAME_RATE` times a second, updates in between only change the counters
+- `processEvents` only lets Fusion handle its events every `EVENTS_INTERVAL` seconds
+- The cancel button is read at most once a frame
+
+The time left is estimated from how long each kind of item took so far. Components are weighted by how many bodies
+they have, since tessellating the bodies is most of their cost, and every other item counts as one unit.
+"""
+
+import time
+from typing import Callable
 
 import adsk.core
 
+FRAME_RATE = 10
+
+EVENTS_INTERVAL = 0.1
+
+# Resolution of the progress bar, its value is the estimated fraction of the export that is done
+PROGRESS_STEPS = 1000
+
+COMPONENT = "component"
+OCCURRENCE = "occurrence"
+MATERIAL = "material"
+APPEARANCE = "appearance"
+
 
 class PDMessage:
     def __init__(
@@ -14,7 +38,15 @@ class PDMessage:
         materialCount: int,
         appearanceCount: int,
         progressDialog: adsk.core.ProgressDialog,
+        componentBodies: dict[str, int] | None = None,
+        clock: Callable[[], float] = time.perf_counter,
     ):
+        """Formatter for the progress dialog of an export
+
+        Args:
+            componentBodies (dict[str, int] | None): component guid -> number of bodies, used to weight components
+            clock (Callable[[], float]): time in seconds, replaceable for tests
+        """
         self.assemblyName = assemblyName
         self.componentCount = componentCount
         self.occurrenceCount = occurrenceCount
@@ -32,6 +64,30 @@ class PDMessage:
         self.currentValue = 0
 
         self.progressDialog = progressDialog
+        self.componentBodies = componentBodies or {}
+        self.clock = clock
+
+        componentUnits = sum(max(bodies, 1) for bodies in self.componentBodies.values())
+        # kind of item -> units of work in total, units done, and units and seconds measured so far
+        self.totalUnits = {
+            COMPONENT: max(componentUnits, componentCount),
+            OCCURRENCE: occurrenceCount,
+            MATERIAL: materialCount,
+            APPEARANCE: appearanceCount,
+        }
+        self.doneUnits = dict.fromkeys(self.totalUnits, 0)
+        self.measuredUnits = dict.fromkeys(self.totalUnits, 0)
+        self.measuredSeconds = dict.fromkeys(self.totalUnits, 0.0)
+
+        # Item being exported right now, its time is measured once the next item starts or its stage ends
+        self.currentKind: str | None = None
+        self.currentUnits = 0
+        self.currentStart = 0.0
+
+        self.lastFrame = float("-inf")
+        self.lastEvents = float("-inf")
+        self.lastCancelCheck = float("-inf")
+        self.cancelled = False
 
     def _format(self):
         # USE FORMATTING TO CENTER THESE BAD BOIS
@@ -41,48 +97,137 @@ class PDMessage:
         out += f"\t Occurrences: \t[ {self.currentOccCount} / {self.occurrenceCount} ]\n"
         out += f"\t Materials: \t[ {self.currentMatCount} / {self.materialCount} ]\n"
         out += f"\t Appearances: \t[ {self.currentAppCount} / {self.appearanceCount} ]\n"
-        out += f"{self.currentMessage}"
+        out += f"{self.currentMessage}\n"
+        out += _formatTimeLeft(self.secondsLeft())
 
         return out
 
-    def addComponent(self, name=None):
-        self.currentValue += 1
+    def addComponent(self, name=None, guid=None):
         self.currentCompCount += 1
-        self.currentMessage = f"Exporting Component {name}"
-        self.update()
+        self._startItem(COMPONENT, max(self.componentBodies.get(guid, 1), 1), f"Exporting Component {name}")
 
     def addOccurrence(self, name=None):
-        self.currentValue += 1
         self.currentOccCount += 1
-        self.currentMessage = f"Exporting Occurrence {name}"
-        self.update()
+        self._startItem(OCCURRENCE, 1, f"Exporting Occurrence {name}")
 
     def addMaterial(self, name=None):
-        self.currentValue += 1
         self.currentMatCount += 1
-        self.currentMessage = f"Exporting Physical Material {name}"
-        self.update()
+        self._startItem(MATERIAL, 1, f"Exporting Physical Material {name}")
 
     def addAppearance(self, name=None):
-        self.currentValue += 1
         self.currentAppCount += 1
-        self.currentMessage = f"Exporting Appearance Material {name}"
-        self.update()
+        self._startItem(APPEARANCE, 1, f"Exporting Appearance Material {name}")
 
     def addJoint(self, name=None):
         self.currentMessage = f"Connecting Joints {name}"
         self.update()
 
-    def update(self):
+    def finishItem(self) -> None:
+        """Measures the item being exported, called at the end of every stage so the time until the next stage
+        starts, like waiting for the meshes of the last components, isn't counted as part of the item"""
+        if self.currentKind is None:
+            return
+
+        self.measuredUnits[self.currentKind] += self.currentUnits
+        self.measuredSeconds[self.currentKind] += self.clock() - self.currentStart
+        self.currentKind = None
+
+    def _startItem(self, kind: str, units: int, message: str) -> None:
+        self.finishItem()
+
+        now = self.clock()
+        self.currentKind = kind
+        self.currentUnits = units
+        self.currentStart = now
+
+        self.currentValue += 1
+        self.doneUnits[kind] += units
+        self.currentMessage = message
+        self.update()
+
+    def _secondsPerUnit(self) -> dict[str, float] | None:
+        """Measured seconds per unit of every kind, kinds that weren't measured yet use the average of the others"""
+        units = sum(self.measuredUnits.values())
+        if units == 0:
+            return None
+
+        average = sum(self.measuredSeconds.values()) / units
+        return {
+            kind: self.measuredSeconds[kind] / self.measuredUnits[kind] if self.measuredUnits[kind] else average
+            for kind in self.totalUnits
+        }
+
+    def secondsLeft(self) -> float | None:
+        """Estimated time until every item is exported, or None until the first item was measured"""
+        secondsPerUnit = self._secondsPerUnit()
+        if secondsPerUnit is None:
+            return None
+
+        left = sum(
+            max(self.totalUnits[kind] - self.doneUnits[kind], 0) * secondsPerUnit[kind] for kind in self.totalUnits
+        )
+        if self.currentKind is not None:
+            currentSeconds = self.currentUnits * secondsPerUnit[self.currentKind]
+            left += max(currentSeconds - (self.clock() - self.currentStart), 0.0)
+
+        return left
+
+    def _progressValue(self) -> int:
+        # Weight every kind by how long it takes, until something was measured every unit takes as long
+        secondsPerUnit = self._secondsPerUnit() or dict.fromkeys(self.totalUnits, 1.0)
+        total = sum(self.totalUnits[kind] * secondsPerUnit[kind] for kind in self.totalUnits)
+        if total <= 0:
+            return 0
+
+        done = sum(min(self.doneUnits[kind], self.totalUnits[kind]) * secondsPerUnit[kind] for kind in self.totalUnits)
+        return round(PROGRESS_STEPS * done / total)
+
+    def update(self, force: bool = False):
+        """Redraws the dialog, unless it was already redrawn this frame
+
+        Args:
+            force (bool): redraw even if it was, for messages that have to be seen
+        """
+        now = self.clock()
+        if not force and now - self.lastFrame < 1 / FRAME_RATE:
+            return
+
+        self.lastFrame = now
         self.progressDialog.message = self._format()
-        self.progressDialog.progressValue = self.currentValue
+        self.progressDialog.progressValue = self._progressValue()
         self.value = self.currentValue
 
+    def processEvents(self) -> None:
+        """Lets Fusion handle its events, like the cancel button being pressed, at most every `EVENTS_INTERVAL`"""
+        now = self.clock()
+        if now - self.lastEvents >= EVENTS_INTERVAL:
+            self.lastEvents = now
+            adsk.doEvents()
+
     def wasCancelled(self) -> bool:
-        return self.progressDialog.wasCancelled
+        now = self.clock()
+        if now - self.lastCancelCheck >= 1 / FRAME_RATE:
+            self.lastCancelCheck = now
+            self.cancelled = self.progressDialog.wasCancelled
+
+        return self.cancelled
 
     def __str__(self):
         return self._format()
 
     def __repr__(self):
         return self._format()
+
+
+def _formatTimeLeft(seconds: float | None) -> str:
+    if seconds is None:
+        return "Estimating time left..."
+
+    if seconds < 1:
+        return "Less than a second left"
+
+    minutes, seconds = divmod(round(seconds), 60)
+    if minutes == 0:
+        return f"About {seconds} s left"
+
+    return f"About {minutes} min {seconds} s left"
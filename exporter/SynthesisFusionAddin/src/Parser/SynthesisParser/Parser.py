@@ -1,19 +1,30 @@
-import gzip
+import contextlib
+import hashlib
+import json
 import pathlib
+import tempfile
+import time
+from concurrent.futures import Future
+from typing import BinaryIO, ContextManager
 
 import adsk.core
 import adsk.fusion
 from google.protobuf.json_format import MessageToJson
 
-from proto.proto_out import assembly_pb2, types_pb2
+from proto.proto_out import assembly_pb2
 
 from ...APS.APS import getAuth, upload_mirabuf
+from ...BackgroundTasks import runInBackground, showMessage
 from ...general_imports import *
 from ...Logging import getLogger, logFailure, timed
-from ...Types import ExportLocation, ExportMode
+from ...Profiling import Profiler, profileSpan, startProfiling, stopProfiling
+from ...Types import ExportLocation, ExportMode, encodeNestedObjects
 from ...UI.Camera import captureThumbnail, clearIconCache
 from ..ExporterOptions import ExporterOptions
-from . import Components, JointHierarchy, Joints, Materials, PDMessage
+from . import Compression, DesignExport, Materials, PDMessage, SnapshotRecorder
+from .AssemblyIndex import AssemblyIndex
+from .MaterialCache import openMaterialCache
+from .MiraWriter import MiraWriter
 from .Utilities import *
 
 logger = getLogger()
@@ -28,9 +39,26 @@ class Parser:
         """
         self.exporterOptions = options
 
+        # Finishes once the export was written or uploaded in the background
+        self.finishing: Future | None = None
+
+        # Profiles this export only, another export can start profiling before this one finishes in the background
+        self.profiler: Profiler | None = None
+
     @logFailure(messageBox=True)
     @timed
     def export(self) -> None:
+        if self.exporterOptions.profileExport:
+            self.profiler = startProfiling()
+
+        try:
+            return self._export()
+        finally:
+            # Otherwise the background task stops profiling once it's done
+            if self.finishing is None and self.profiler is not None:
+                stopProfiling(self.profiler)
+
+    def _export(self) -> None:
         app = adsk.core.Application.get()
         design: adsk.fusion.Design = app.activeDocument.design
 
@@ -38,6 +66,15 @@ class Parser:
             app.userInterface.messageBox("APS Login Required for Uploading.", "APS Login")
             return
 
+        # The upload target can only be read from Fusion on the main thread
+        uploadTarget = None
+        if self.exporterOptions.exportLocation == ExportLocation.UPLOAD:
+            project = app.data.activeProject
+            if not project.isValid:
+                gm.ui.messageBox("Project is invalid", "")
+                return
+            uploadTarget = (project.id, project.rootFolder.id, self._uploadResumeKey(app.activeDocument))
+
         assembly_out = assembly_pb2.Assembly()
         fill_info(
             assembly_out,
@@ -50,118 +87,141 @@ class Parser:
 
         # Physical Props here when ready
 
+        # Walk the design once up front, every stage below reads from the index instead of the Fusion API
+        with profileSpan("Index design", "stage"):
+            index = AssemblyIndex(design)
+
+        # Only appearances that are actually used are exported
+        with profileSpan("Referenced appearances", "stage"):
+            appearances = Materials._ReferencedAppearances(index)
+
+        if self.exporterOptions.recordSnapshot:
+            with profileSpan("Record snapshot", "stage"):
+                SnapshotRecorder.recordSnapshot(design, index, appearances, self.exporterOptions)
+
         progressDialog = app.userInterface.createProgressDialog()
         progressDialog.cancelButtonText = "Cancel"
         progressDialog.isBackgroundTranslucent = False
         progressDialog.isCancelButtonShown = True
 
-        totalIterations = design.rootComponent.allOccurrences.count + 1
-
         progressDialog.title = "Exporting to Synthesis Format"
         progressDialog.minimumValue = 0
-        progressDialog.maximumValue = totalIterations
-        progressDialog.show("Synthesis Export", "Currently on %v of %m", 0, totalIterations)
+        progressDialog.maximumValue = PDMessage.PROGRESS_STEPS
+        progressDialog.show("Synthesis Export", "Estimating time left...", 0, PDMessage.PROGRESS_STEPS)
 
         # this is the formatter for the progress dialog now
-        self.pdMessage = PDMessage.PDMessage(
-            assembly_out.info.name,
-            design.allComponents.count,
-            design.rootComponent.allOccurrences.count,
-            design.materials.count,
-            design.appearances.count,  # this is very high for some reason
-            progressDialog,
-        )
-
-        Materials._MapAllAppearances(
-            design.appearances,
-            assembly_out.data.materials,
-            self.exporterOptions,
-            self.pdMessage,
-        )
-
-        Materials._MapAllPhysicalMaterials(
-            design.materials,
-            assembly_out.data.materials,
-            self.exporterOptions,
-            self.pdMessage,
-        )
-
-        Components._MapAllComponents(
-            design,
-            self.exporterOptions,
-            self.pdMessage,
-            assembly_out.data.parts,
-            assembly_out.data.materials,
-        )
-
-        rootNode = types_pb2.Node()
-
-        Components._ParseComponentRoot(
-            design.rootComponent,
-            self.pdMessage,
-            self.exporterOptions,
-            assembly_out.data.parts,
-            assembly_out.data.materials.appearances,
-            rootNode,
-        )
+        self.pdMessage = DesignExport.createProgressMessage(assembly_out, design, index, appearances, progressDialog)
+
+        materialCache = openMaterialCache(design.parentDocument) if self.exporterOptions.cacheMaterials else None
+
+        # Finished part definitions are spooled to disk instead of being held until the end of the export
+        miraWriter = MiraWriter()
+
+        try:
+            DesignExport.exportDesign(
+                design,
+                index,
+                assembly_out,
+                appearances,
+                self.exporterOptions,
+                self.pdMessage,
+                miraWriter,
+                materialCache,
+            )
+
+            # These don't have an effect, I forgot how this is suppose to work
+            # progressDialog.message = "Taking Photo for thumbnail..."
+            # progressDialog.title = "Finishing Export"
+            self.pdMessage.currentMessage = "Taking Photo for Thumbnail..."
+            self.pdMessage.update(force=True)
+
+            # default image size
+            imgSize = 250
+
+            # Can only save, cannot get the bytes directly
+            with profileSpan("Thumbnail", "stage"):
+                thumbnailLocation = captureThumbnail(imgSize)
 
-        Components._MapRigidGroups(design.rootComponent, assembly_out.data.joints)
-
-        assembly_out.design_hierarchy.nodes.append(rootNode)
+            binaryImage = None
+            if thumbnailLocation != None:
+                # Load bytes into memory, they're written to the proto in the background
+                with open(thumbnailLocation, "rb") as in_file:
+                    binaryImage = in_file.read()
 
-        # Problem Child
-        Joints.populateJoints(
-            design,
-            assembly_out.data.joints,
-            assembly_out.data.signals,
-            self.pdMessage,
-            self.exporterOptions,
-            assembly_out,
-        )
+                # clear the icon cache - src/resources/Icons
+                clearIconCache()
+        except BaseException:
+            # The background task closes the writer once the assembly is written, which a failed export never gets to
+            miraWriter.close()
+            raise
 
-        # add condition in here for advanced joints maybe idk
-        # should pre-process to find if there are any grounded joints at all
-        # that or add code to existing parser to determine leftovers
+        _ = progressDialog.hide()
 
-        Joints.createJointGraph(
-            self.exporterOptions.joints,
-            self.exporterOptions.wheels,
-            assembly_out.joint_hierarchy,
-            self.pdMessage,
+        # Everything left only works on the assembly, so it runs in the background while the user keeps working
+        self.finishing = runInBackground(
+            f"Exporting {assembly_out.info.name}",
+            lambda: self._finishExport(assembly_out, miraWriter, binaryImage, imgSize, uploadTarget),
         )
 
-        JointHierarchy.BuildJointPartHierarchy(design, assembly_out.data.joints, self.exporterOptions, self.pdMessage)
-
-        # These don't have an effect, I forgot how this is suppose to work
-        # progressDialog.message = "Taking Photo for thumbnail..."
-        # progressDialog.title = "Finishing Export"
-        self.pdMessage.currentMessage = "Taking Photo for Thumbnail..."
-        self.pdMessage.update()
-
-        # default image size
-        imgSize = 250
+    def _uploadResumeKey(self, document: adsk.core.Document) -> str | None:
+        """Identifies what an upload is made from, so an upload that failed is finished by exporting again
 
-        # Can only save, cannot get the bytes directly
-        thumbnailLocation = captureThumbnail(imgSize)
-
-        if thumbnailLocation != None:
-            # Load bytes into memory and write them to proto
-            binaryImage = None
-            with open(thumbnailLocation, "rb") as in_file:
-                binaryImage = in_file.read()
-
-            if binaryImage != None:
-                # change these settings in the captureThumbnail Function
-                assembly_out.thumbnail.width = imgSize
-                assembly_out.thumbnail.height = imgSize
-                assembly_out.thumbnail.transparent = True
-                assembly_out.thumbnail.data = binaryImage
-                assembly_out.thumbnail.extension = "png"
-                # clear the icon cache - src/resources/Icons
-                clearIconCache()
+        Returns:
+            str | None: the saved version of the document and the export options, or None if the document has
+                unsaved changes, since those can't be told apart
+        """
+        if not document.isSaved or document.isModified:
+            return None
+
+        options = json.dumps(encodeNestedObjects(self.exporterOptions), sort_keys=True)
+        return f"{document.dataFile.versionId}/{hashlib.sha256(options.encode()).hexdigest()}"
+
+    def _finishExport(
+        self,
+        assembly_out: assembly_pb2.Assembly,
+        miraWriter: MiraWriter,
+        binaryImage: bytes | None,
+        imgSize: int,
+        uploadTarget: tuple[str, str, str | None] | None,
+    ) -> None:
+        """Serializes, compresses and writes or uploads the assembly, on the background thread
 
-        self.pdMessage.currentMessage = "Compressing File..."
-        self.pdMessage.update()
+        Args:
+            assembly_out (assembly_pb2.Assembly): collected assembly
+            miraWriter (MiraWriter): writer holding the spooled part definitions
+            binaryImage (bytes | None): png thumbnail
+            imgSize (int): width and height of the thumbnail
+            uploadTarget (tuple[str, str, str | None] | None): project and folder id to upload to and the resume key
+                of the upload, if uploading
+        """
+        startTime = time.perf_counter()
+        try:
+            self._writeAssembly(assembly_out, miraWriter, binaryImage, imgSize, uploadTarget)
+        finally:
+            if self.profiler is not None:
+                stopProfiling(self.profiler)
+
+        logger.timing(f"Finishing the export in the background took {time.perf_counter() - startTime:5f}s")
+        if uploadTarget is None:
+            showMessage(f"Exported {assembly_out.info.name} to {self.exporterOptions.fileLocation}", "Synthesis Export")
+
+        self._logAssembly(assembly_out, miraWriter)
+
+    def _writeAssembly(
+        self,
+        assembly_out: assembly_pb2.Assembly,
+        miraWriter: MiraWriter,
+        binaryImage: bytes | None,
+        imgSize: int,
+        uploadTarget: tuple[str, str, str | None] | None,
+    ) -> None:
+        if binaryImage != None:
+            # change these settings in the captureThumbnail Function
+            assembly_out.thumbnail.width = imgSize
+            assembly_out.thumbnail.height = imgSize
+            assembly_out.thumbnail.transparent = True
+            assembly_out.thumbnail.data = binaryImage
+            assembly_out.thumbnail.extension = "png"
 
         ### Print out assembly as JSON
         # miraJson = MessageToJson(assembly_out)
@@ -170,35 +230,43 @@ class Parser:
         # miraJsonFile.close()
 
         # Upload Mirabuf File to APS
-        if self.exporterOptions.exportLocation == ExportLocation.UPLOAD:
+        if uploadTarget is not None:
             logger.debug("Uploading file to APS")
-            project = app.data.activeProject
-            if not project.isValid:
-                gm.ui.messageBox("Project is invalid", "")
-                return False  # add throw later
-            project_id = project.id
-            folder_id = project.rootFolder.id
+            project_id, folder_id, resume_key = uploadTarget
             file_name = f"{self.exporterOptions.fileLocation}.mira"
-            if upload_mirabuf(project_id, folder_id, file_name, assembly_out.SerializeToString()) is None:
-                raise RuntimeError("Could not upload to APS")
+            with miraWriter, tempfile.TemporaryFile() as file:
+                with self._openCompressed(file) as f, profileSpan("Write", "stage"):
+                    miraWriter.write(assembly_out, f)
+
+                file.seek(0)
+                if upload_mirabuf(project_id, folder_id, file_name, file, resume_key) is None:
+                    raise RuntimeError("Could not upload to APS")
         else:
             assert self.exporterOptions.exportLocation == ExportLocation.DOWNLOAD
-            # check if entire path exists and create if not since gzip doesn't do that.
+            # check if entire path exists and create if not since open doesn't do that.
             path = pathlib.Path(self.exporterOptions.fileLocation).parent
             path.mkdir(parents=True, exist_ok=True)
-            if self.exporterOptions.compressOutput:
-                logger.debug("Compressing file")
-                with gzip.open(self.exporterOptions.fileLocation, "wb", 9) as f:
-                    self.pdMessage.currentMessage = "Saving File..."
-                    self.pdMessage.update()
-                    f.write(assembly_out.SerializeToString())
-            else:
-                f = open(self.exporterOptions.fileLocation, "wb")
-                f.write(assembly_out.SerializeToString())
-                f.close()
+            with (
+                miraWriter,
+                open(self.exporterOptions.fileLocation, "wb") as file,
+                self._openCompressed(file) as f,
+                profileSpan("Write", "stage"),
+            ):
+                miraWriter.write(assembly_out, f)
+
+    def _openCompressed(self, file: BinaryIO) -> ContextManager[BinaryIO]:
+        """Wraps the output file in the compression picked in the options, closing the wrapper leaves the file open
+
+        The simulator decompresses downloaded and uploaded files alike, so both are compressed.
+        """
+        if not self.exporterOptions.compressOutput:
+            return contextlib.nullcontext(file)
 
-        _ = progressDialog.hide()
+        codec = self.exporterOptions.compressionCodec
+        logger.debug(f"Compressing file with {codec.name} level {self.exporterOptions.compressionLevel}")
+        return Compression.openCompressed(file, codec, self.exporterOptions.compressionLevel)
 
+    def _logAssembly(self, assembly_out: assembly_pb2.Assembly, miraWriter: MiraWriter) -> None:
         # Transition: AARD-1735
         # Create debug log joint hierarchy graph
         # Should consider adding a toggle for performance reasons
@@ -238,7 +306,7 @@ class Parser:
         debug_output = (
             f"Appearances: {len(assembly_out.data.materials.appearances)}\n"
             f"Materials: {len(assembly_out.data.materials.physicalMaterials)}\n"
-            f"Part-Definitions: {len(part_defs)}\n"
+            f"Part-Definitions: {len(part_defs) + miraWriter.definitionCount}\n"
             f"Parts: {len(parts)}\n"
             f"Signals: {len(signals)}\n"
             f"Joints: {len(joints)}\n"
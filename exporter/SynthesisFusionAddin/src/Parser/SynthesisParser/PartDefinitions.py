@@ -0,0 +1,179 @@
+"""Finishing of part definitions once the meshes of all of their bodies have been built
+
+Components with identical geometry, physical properties and appearances are merged into a single part
+definition, and finished definitions are handed to the `MiraWriter` when one is supplied.
+
+When levels of detail are enabled every body of a kept definition also gets a chain of simplified meshes. Mirabuf
+has no field for them so they are stored in `Parts.user_data`, under `lod/{part definition}/{body index}`, as JSON:
+
+    {"levels": [{"screenSize": 0.25, "triangles": 1200, "mesh": "<base64 serialized TriangleMesh>"}, ...]}
+
+A level should be drawn while the body covers less than `screenSize` of the screen height, and the full detail
+mesh of the body otherwise.
+
+When collision hulls are enabled every kept definition used by at least one occurrence with a collider also gets
+a convex hull per body, so the simulator doesn't have to build colliders from the render meshes when loading. They
+are stored under `collision/{part definition}`, as JSON:
+
+    {"hulls": [{"body": 0, "mesh": "<base64 serialized TriangleMesh>"}, ...]}
+
+Bodies that are flat, and so can't be represented by a convex hull, are left out.
+
+This module intentionally has no Fusion dependencies so it can also be used by `HeadlessExport`.
+"""
+
+import base64
+import hashlib
+import json
+from array import array
+from typing import Iterable, Protocol
+
+from proto.proto_out import assembly_pb2
+
+from .MeshEncoding import meshArrays
+from .MeshPipeline import MeshPipeline, RawMesh
+from .MiraWriter import MiraWriter
+
+# (fraction of the triangles of the full detail mesh to keep, screen size below which the level is used)
+LOD_LEVELS = ((0.5, 0.3), (0.2, 0.1), (0.05, 0.03))
+
+# Bodies with fewer triangles than this are cheap enough to always draw at full detail
+LOD_MIN_TRIANGLES = 256
+
+LOD_USER_DATA_PREFIX = "lod/"
+COLLISION_USER_DATA_PREFIX = "collision/"
+
+
+class ColliderOccurrence(Protocol):
+    componentGuid: str
+    isLightBulbOn: bool
+    skipCollider: bool
+
+
+def collidingComponents(occurrences: Iterable[ColliderOccurrence], rootComponent: str) -> set[str]:
+    """Gets the guids of every component used by a visible occurrence that isn't marked as `skip_collider`
+
+    Args:
+        occurrences (Iterable[ColliderOccurrence]): every occurrence in the design
+        rootComponent (str): guid of the root component, which always has a collider
+    """
+    components = {rootComponent}
+    for occurrence in occurrences:
+        if occurrence.isLightBulbOn and not occurrence.skipCollider:
+            components.add(occurrence.componentGuid)
+
+    return components
+
+
+def hashPartDefinition(partDefinition: assembly_pb2.PartDefinition) -> bytes:
+    """Hashes everything that makes up a part definition besides its name and guid"""
+    hasher = hashlib.sha1()
+    hasher.update(partDefinition.physical_data.SerializeToString())
+    hasher.update(b"\x01" if partDefinition.dynamic else b"\x00")
+    for body in partDefinition.bodies:
+        hasher.update(body.appearance_override.encode())
+        if body.triangle_mesh.WhichOneof("mesh_type") == "bmesh":
+            hasher.update(body.triangle_mesh.bmesh.data)
+        else:
+            hasher.update(body.triangle_mesh.mesh.SerializeToString())
+
+    return hasher.digest()
+
+
+class PartDefinitionFinalizer:
+    def __init__(
+        self,
+        partsData: assembly_pb2.Parts,
+        deduplicate: bool,
+        writer: MiraWriter | None = None,
+        meshPipeline: MeshPipeline | None = None,
+        lods: bool = False,
+        colliderComponents: set[str] | None = None,
+    ):
+        """Creates a finalizer for the part definitions of an assembly
+
+        Args:
+            partsData (assembly_pb2.Parts): parts the definitions are added to
+            deduplicate (bool): merge definitions with identical contents
+            writer (MiraWriter | None): if supplied, finished part definitions are streamed to it instead of kept
+            meshPipeline (MeshPipeline | None): pipeline levels of detail and collision hulls are built on
+            lods (bool): build levels of detail for every kept body
+            colliderComponents (set[str] | None): if supplied, collision hulls are built for these components
+        """
+        self.partsData = partsData
+        self.deduplicate = deduplicate
+        self.writer = writer
+        self.meshPipeline = meshPipeline
+        self.lods = lods and meshPipeline is not None
+        self.colliderComponents = colliderComponents if meshPipeline is not None else None
+
+        # guids of the part definitions collision hulls have been built for
+        self.hullDefinitions: set[str] = set()
+
+        # geometry hash -> guid of the first part definition with that hash
+        self.uniqueDefinitions: dict[bytes, str] = {}
+
+        # component guid -> guid of the identical part definition it was merged into
+        self.partAliases: dict[str, str] = {}
+
+    def finalize(self, comp_ref: str) -> None:
+        partDefinition = self.partsData.part_definitions[comp_ref]
+
+        if self.deduplicate:
+            definitionHash = hashPartDefinition(partDefinition)
+            if definitionHash in self.uniqueDefinitions:
+                keptRef = self.uniqueDefinitions[definitionHash]
+                self.partAliases[comp_ref] = keptRef
+
+                # The kept definition may only be used by occurrences without colliders, its meshes are identical
+                if self._needsHulls(comp_ref) and keptRef not in self.hullDefinitions:
+                    self._submitHulls(keptRef, partDefinition)
+
+                del self.partsData.part_definitions[comp_ref]
+                return
+
+            self.uniqueDefinitions[definitionHash] = comp_ref
+
+        # Read the meshes out before the writer frees them
+        if self.lods:
+            for i, body in enumerate(partDefinition.bodies):
+                self._submitLods(f"{LOD_USER_DATA_PREFIX}{comp_ref}/{i}", body)
+
+        if self._needsHulls(comp_ref):
+            self._submitHulls(comp_ref, partDefinition)
+
+        if self.writer is not None:
+            self.writer.addPartDefinition(comp_ref, partDefinition)
+
+    def _submitLods(self, key: str, body: assembly_pb2.Body) -> None:
+        verts, _, indices, _ = meshArrays(body.triangle_mesh)
+        if len(indices) // 3 < LOD_MIN_TRIANGLES:
+            return
+
+        raw = RawMesh(body.info.name, body.info.GUID, array("f", verts), [], array("i", indices), [])
+
+        def onComplete(levels: list[tuple[int, bytes]]) -> None:
+            entries = [
+                {"screenSize": screenSize, "triangles": triangles, "mesh": base64.b64encode(data).decode()}
+                for (_, screenSize), (triangles, data) in zip(LOD_LEVELS, levels)
+            ]
+
+            self.partsData.user_data.data[key] = json.dumps({"levels": entries})
+
+        self.meshPipeline.submitLods(raw, [ratio for ratio, _ in LOD_LEVELS], onComplete)
+
+    def _needsHulls(self, comp_ref: str) -> bool:
+        return self.colliderComponents is not None and comp_ref in self.colliderComponents
+
+    def _submitHulls(self, definitionRef: str, partDefinition: assembly_pb2.PartDefinition) -> None:
+        self.hullDefinitions.add(definitionRef)
+        meshes = [array("f", meshArrays(body.triangle_mesh)[0]) for body in partDefinition.bodies]
+
+        def onComplete(hulls: list[tuple[int, bytes]]) -> None:
+            entries = [{"body": body, "mesh": base64.b64encode(data).decode()} for body, data in hulls]
+
+            self.partsData.user_data.data[f"{COLLISION_USER_DATA_PREFIX}{definitionRef}"] = json.dumps(
+                {"hulls": entries}
+            )
+
+        self.meshPipeline.submitHulls(partDefinition.info.name, meshes, onComplete)
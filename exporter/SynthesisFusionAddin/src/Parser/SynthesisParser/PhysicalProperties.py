@@ -16,7 +16,9 @@
 
 """
 
+import hashlib
 import logging
+import os
 import traceback
 from typing import Union
 
@@ -24,8 +26,127 @@ import adsk
 
 from proto.proto_out import types_pb2
 
-from ...general_imports import INTERNAL_ID
+from ...general_imports import INTERNAL_ID, my_addin_path
 from ...Logging import logFailure
+from ...Types import PhysicalDepth
+from ..ExporterOptions import ExporterOptions
+from .DiskCache import DiskCache
+
+# Bump whenever the format of the cached data changes to invalidate old caches.
+CACHE_VERSION = 1
+CACHE_DIRECTORY = os.path.abspath(os.path.join(my_addin_path, "..", "cache", "physical"))
+MAX_ENTRIES = 16384
+
+
+class PhysicalPropertiesCache(DiskCache):
+    """Physical properties of components and bodies, keyed by entity, revision and calculation accuracy
+
+    Calculating them at a high accuracy takes seconds for larger parts, so unchanged parts are only calculated once.
+    The revision of a component covers every component under it, see `_Revision`.
+    """
+
+    def __init__(self, directory: str = CACHE_DIRECTORY, maxEntries: int = MAX_ENTRIES):
+        super().__init__(os.path.join(directory, "physical.cache"), CACHE_VERSION, maxEntries, "Physical cache")
+
+
+def GetComponentPhysicalProperties(
+    component: adsk.fusion.Component,
+    compRef: str,
+    bodies: list[adsk.fusion.BRepBody | adsk.fusion.MeshBody],
+    physicalProperties: types_pb2.PhysicalProperties,
+    options: ExporterOptions,
+    cache: PhysicalPropertiesCache | None = None,
+) -> None:
+    """Populates the physical properties of a part definition as far as `ExporterOptions.physicalDepth` asks for
+
+    - NoPhysical: left empty
+    - Body: combined from the properties of every visible BRep body
+    - SurfaceOccurrence: the properties of the component, only if it has visible bodies
+    - AllOccurrence: the properties of the component, for every component
+
+    Args:
+        component (adsk.fusion.Component): component of the part definition
+        compRef (str): guid of the component
+        bodies (list[adsk.fusion.BRepBody | adsk.fusion.MeshBody]): visible bodies of the component
+        physicalProperties (types_pb2.PhysicalProperties): properties to populate
+        options (ExporterOptions): calculation depth and accuracy
+        cache (PhysicalPropertiesCache | None): cache to reuse properties of unchanged components and bodies from
+    """
+    depth = options.physicalDepth
+    level = options.physicalCalculationLevel
+    if depth == PhysicalDepth.NoPhysical:
+        return
+
+    if depth == PhysicalDepth.Body:
+        bodyProperties = []
+        for body in bodies:
+            # Mesh bodies have no physical properties
+            if isinstance(body, adsk.fusion.BRepBody):
+                properties = types_pb2.PhysicalProperties()
+                _CachedPhysicalProperties(body, body.entityToken, properties, level, cache)
+                bodyProperties.append(properties)
+
+        CombinePhysicalProperties(bodyProperties, physicalProperties)
+        return
+
+    if depth == PhysicalDepth.SurfaceOccurrence and not bodies:
+        return
+
+    _CachedPhysicalProperties(component, compRef, physicalProperties, level, cache)
+
+
+def _Revision(fusionObject: adsk.fusion.BRepBody | adsk.fusion.Component) -> str:
+    """Identifies the revision of everything the physical properties of a body or component are calculated from
+
+    The properties of a component include the bodies of its nested occurrences, but its own revision id only
+    changes when the component itself is modified, not when a component under it is.
+    """
+    if not isinstance(fusionObject, adsk.fusion.Component):
+        return fusionObject.revisionId
+
+    revision = hashlib.sha256(fusionObject.revisionId.encode())
+    for occurrence in fusionObject.allOccurrences:
+        revision.update(f"\n{occurrence.component.revisionId}:{occurrence.transform.asArray()}".encode())
+
+    return revision.hexdigest()
+
+
+def _CachedPhysicalProperties(
+    fusionObject: adsk.fusion.BRepBody | adsk.fusion.Component,
+    token: str,
+    physicalProperties: types_pb2.PhysicalProperties,
+    level: int,
+    cache: PhysicalPropertiesCache | None,
+) -> None:
+    key = None
+    if cache is not None:
+        key = f"{token}_{_Revision(fusionObject)}_{int(level)}"
+        data = cache.get(key)
+        if data is not None:
+            physicalProperties.ParseFromString(data)
+            return
+
+    if GetPhysicalProperties(fusionObject, physicalProperties, level) and key is not None:
+        cache.put(key, physicalProperties.SerializeToString())
+
+
+def CombinePhysicalProperties(
+    parts: list[types_pb2.PhysicalProperties], physicalProperties: types_pb2.PhysicalProperties
+) -> None:
+    """Combines the properties of several bodies into the properties of them all, with the mass weighted center"""
+    mass = sum(part.mass for part in parts)
+    volume = sum(part.volume for part in parts)
+
+    physicalProperties.mass = mass
+    physicalProperties.volume = volume
+    physicalProperties.area = sum(part.area for part in parts)
+    physicalProperties.density = mass / volume if volume > 0 else 0.0
+
+    if mass > 0:
+        com = physicalProperties.com
+        com.x = sum(part.com.x * part.mass for part in parts) / mass
+        com.y = sum(part.com.y * part.mass for part in parts) / mass
+        com.z = sum(part.com.z * part.mass for part in parts) / mass
 
 
 @logFailure
@@ -40,6 +161,9 @@ def GetPhysicalProperties(
         fusionObject (Union[adsk.fusion.BRepBody, adsk.fusion.Occurrence, adsk.fusion.Component]): The base fusion object
         physicalProperties (any): Unity Joint object for now
         level (int): Level of accurracy
+
+    Returns:
+        bool: True once the properties were read, failures are logged and return None
     """
     physical = fusionObject.getPhysicalProperties(level)
 
@@ -55,3 +179,5 @@ def GetPhysicalProperties(
         _com.x = com.x
         _com.y = com.y
         _com.z = com.z
+
+    return True
@@ -1,51 +1,68 @@
-""" Module to define static methods to extract rigidGroup information from a given occurrence or component
+"""Merges every rigid relation in the design into the minimal set of RigidGroups
 
-    NOT CURRENTLY IN USE BECAUSE OF BUG
+Fusion has two ways of rigidly connecting occurrences, rigid groups and rigid (as built) joints. Exporting each
+of them as its own `RigidGroup` produced hundreds of small overlapping groups the simulator had to merge again
+when loading the assembly. Instead the connected components of all rigid relations are found with a union-find
+and one `RigidGroup` is written per component.
 
- - Will directly add it to the given Assembly Message
+Hidden occurrences are left out, the same as when parsing the occurrences themselves.
 
- Takes:
-    - Occurrence
-    - Component
-
- Returns:
-    - Success
+This module only reads from the `AssemblyIndex`, so it has no Fusion dependencies.
 """
 
-from typing import *
+from typing import TYPE_CHECKING
 
-import adsk.core
-import adsk.fusion
+from proto.proto_out import joint_pb2
 
-from proto.proto_out import assembly_pb2
+from ...Logging import getLogger, logFailure
+from .JointGraph import UnionFind
 
-from ...Logging import logFailure
+if TYPE_CHECKING:
+    from .AssemblyIndex import AssemblyIndex
 
+logger = getLogger()
 
-@logFailure
-def ExportRigidGroups(
-    fus_occ: Union[adsk.fusion.Occurrence, adsk.fusion.Component],
-    hel_occ: assembly_pb2.Occurrence,
-) -> None:
-    """Takes a Fusion and Protobuf Occurrence and will assign Rigidbody data per the occurrence if any exist and are not surpressed.
 
-    - Also is supplied by the root component for ease
-    - Appears to have a bug, logged already
+@logFailure
+def ExportRigidGroups(joints: joint_pb2.Joints, index: "AssemblyIndex") -> None:
+    """Adds one RigidGroup per cluster of rigidly connected, visible occurrences
 
     Args:
-        fus_occ (adsk.fusion.Occurrence): Fusion Occurrence Reference
-        hel_occ (Assembly_pb2.Occurrence): Protobuf Hellion Occurrence Reference
+        joints (joint_pb2.Joints): joints message the rigid groups are added to
+        index (AssemblyIndex): index of the design
     """
-    groups = fus_occ.rigidGroups
+    clusters = UnionFind()
+    relationCount = 0
+
+    for group in index.rigidGroups:
+        tokens = []
+        for token in group:
+            entry = index.occurrences.get(token)
+            if entry is not None and entry.isLightBulbOn:
+                tokens.append(entry.token)
+
+        for token in tokens[1:]:
+            clusters.union(tokens[0], token)
+            relationCount += 1
+
+    for joint in index.joints:
+        if joint.isSuppressed or joint.jointType != 0:
+            continue
+
+        occurrenceOne = index.occurrences.get(joint.occurrenceOne)
+        occurrenceTwo = index.occurrences.get(joint.occurrenceTwo)
+        if occurrenceOne and occurrenceTwo and occurrenceOne.isLightBulbOn and occurrenceTwo.isLightBulbOn:
+            clusters.union(occurrenceOne.token, occurrenceTwo.token)
+            relationCount += 1
 
-    if groups is None:
-        return
+    groupCount = 0
+    for tokens in clusters.groups().values():
+        if len(tokens) < 2:
+            continue
 
-    _rigidGroups = hel_occ.rigidgroups
+        mira_group = joints.rigid_groups.add()
+        mira_group.name = f"group_{index.occurrences[tokens[0]].name}"
+        mira_group.occurrences.extend(index.occurrences[token].guid for token in tokens)
+        groupCount += 1
 
-    for group in groups:
-        if not group.isSuppressed and group.isValid:
-            _group = _rigidGroups.add()
-            _group.name = group.name
-            for occurrence in group.occurrences:
-                _group.occurrences.extend(occurrence.fullPathName)
+    logger.debug(f"Merged {relationCount} rigid relations into {groupCount} rigid groups")
@@ -0,0 +1,305 @@
+"""Recorded snapshot of everything the export reads from a design
+
+A snapshot is captured once inside of Fusion by `SnapshotRecorder` and can then be replayed through
+`HeadlessExport` on any machine, which makes it possible to measure and optimize the export without a running
+Fusion session. It holds the values the export reads through the Fusion API, `SnapshotAdsk` serves them back to
+the same `Components`, `Materials` and `Joints` functions the add-in runs.
+
+Snapshots are zip archives containing:
+
+- `snapshot.json`, the options of the export and the components, occurrences, joints, rigid groups, appearances
+  and physical materials of the design
+- `meshes/{n}`, the raw arrays of body `n` as little endian float32 verts, normals and uvs followed by int32 indices
+
+This module intentionally has no Fusion dependencies.
+"""
+
+import json
+import sys
+import zipfile
+from array import array
+from dataclasses import asdict, dataclass, field
+
+SNAPSHOT_VERSION = 2
+
+SNAPSHOT_JSON = "snapshot.json"
+
+
+@dataclass
+class SnapshotPhysicalProperties:
+    density: float
+    mass: float
+    volume: float
+    area: float
+    centerOfMass: list[float]
+
+
+@dataclass
+class SnapshotProperty:
+    id: str
+    name: str
+
+    # colors as [red, green, blue, opacity], values of any other type aren't recorded
+    value: bool | int | float | str | list[int] | None
+
+
+@dataclass
+class SnapshotMaterial:
+    """An appearance or physical material with the properties the export reads from it"""
+
+    id: str
+    name: str
+    properties: list[SnapshotProperty] = field(default_factory=list)
+
+
+@dataclass
+class SnapshotBody:
+    token: str
+    name: str
+    isBRep: bool
+
+    # id of the appearance
+    appearance: str | None
+    verts: array
+    normals: array
+    indices: array
+    uv: array
+
+    # only recorded when the properties of every body are exported, see `PhysicalDepth.Body`
+    physicalProperties: SnapshotPhysicalProperties | None = None
+
+
+@dataclass
+class SnapshotComponent:
+    token: str
+    id: str
+    name: str
+
+    # id of the physical material
+    material: str | None = None
+
+    # visible bodies only
+    bodies: list[SnapshotBody] = field(default_factory=list)
+    physicalProperties: SnapshotPhysicalProperties | None = None
+
+
+@dataclass
+class SnapshotOccurrence:
+    token: str
+
+    # `guid_component` of the component it is an occurrence of
+    componentGuid: str
+    name: str
+    isLightBulbOn: bool
+    isGrounded: bool
+
+    # local transform as a row major 4x4 matrix, see `adsk.core.Matrix3D.asArray`
+    transform: list[float]
+    children: list[str] = field(default_factory=list)
+
+    # id of the appearance override
+    appearance: str | None = None
+    collisionOff: bool = False
+
+
+@dataclass
+class SnapshotJoint:
+    token: str
+    name: str
+    isAsBuilt: bool
+    isSuppressed: bool
+    occurrenceOne: str | None
+    occurrenceTwo: str | None
+    jointType: int
+
+    # as found by `Joints._jointOrigin`
+    origin: list[float] | None = None
+
+    # joint motion properties read by `Joints.fillRevoluteJointMotion` and `Joints.fillSliderJointMotion`, objects
+    # like vectors and limits as dicts of their properties
+    motion: dict[str, any] = field(default_factory=dict)
+
+
+@dataclass
+class Snapshot:
+    documentName: str
+
+    # component guid of the root component
+    rootComponent: str
+
+    # `ExporterOptions` of the export, as encoded by `Types.encodeNestedObjects`
+    options: dict[str, any] = field(default_factory=dict)
+
+    # component guid -> component
+    components: dict[str, SnapshotComponent] = field(default_factory=dict)
+
+    # occurrence token -> occurrence
+    occurrences: dict[str, SnapshotOccurrence] = field(default_factory=dict)
+    rootOccurrences: list[str] = field(default_factory=list)
+    joints: list[SnapshotJoint] = field(default_factory=list)
+
+    # occurrence tokens of every rigid group that isn't suppressed
+    rigidGroups: list[list[str]] = field(default_factory=list)
+
+    # id -> appearance referenced by a body or occurrence
+    appearances: dict[str, SnapshotMaterial] = field(default_factory=dict)
+
+    # id -> physical material of the design
+    materials: dict[str, SnapshotMaterial] = field(default_factory=dict)
+
+
+def _littleEndian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def _fromLittleEndian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values
+
+
+def _readPhysicalProperties(data: dict | None) -> SnapshotPhysicalProperties | None:
+    return SnapshotPhysicalProperties(**data) if data is not None else None
+
+
+def _readMaterial(data: dict) -> SnapshotMaterial:
+    return SnapshotMaterial(data["id"], data["name"], [SnapshotProperty(**prop) for prop in data["properties"]])
+
+
+def writeSnapshot(snapshot: Snapshot, path: str) -> None:
+    """Writes a snapshot to a zip archive
+
+    Args:
+        snapshot (Snapshot): snapshot to write
+        path (str): path of the archive, overwritten if it exists
+    """
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        components = []
+        meshCount = 0
+        for guid, component in snapshot.components.items():
+            bodies = []
+            for body in component.bodies:
+                arrays = (
+                    array("f", body.verts),
+                    array("f", body.normals),
+                    array("f", body.uv),
+                    array("i", body.indices),
+                )
+                archive.writestr(f"meshes/{meshCount}", b"".join(_littleEndian(values) for values in arrays))
+                bodies.append(
+                    {
+                        "token": body.token,
+                        "name": body.name,
+                        "isBRep": body.isBRep,
+                        "appearance": body.appearance,
+                        "physicalProperties": (
+                            asdict(body.physicalProperties) if body.physicalProperties is not None else None
+                        ),
+                        "mesh": meshCount,
+                        "lengths": [len(values) for values in arrays],
+                    }
+                )
+                meshCount += 1
+
+            components.append(
+                {
+                    "guid": guid,
+                    "token": component.token,
+                    "id": component.id,
+                    "name": component.name,
+                    "material": component.material,
+                    "physicalProperties": (
+                        asdict(component.physicalProperties) if component.physicalProperties is not None else None
+                    ),
+                    "bodies": bodies,
+                }
+            )
+
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "documentName": snapshot.documentName,
+            "rootComponent": snapshot.rootComponent,
+            "options": snapshot.options,
+            "components": components,
+            "occurrences": [asdict(occurrence) for occurrence in snapshot.occurrences.values()],
+            "rootOccurrences": snapshot.rootOccurrences,
+            "joints": [asdict(joint) for joint in snapshot.joints],
+            "rigidGroups": snapshot.rigidGroups,
+            "appearances": [asdict(appearance) for appearance in snapshot.appearances.values()],
+            "materials": [asdict(material) for material in snapshot.materials.values()],
+        }
+
+        archive.writestr(SNAPSHOT_JSON, json.dumps(data))
+
+
+def readSnapshot(path: str) -> Snapshot:
+    """Reads a snapshot written by `writeSnapshot`
+
+    Args:
+        path (str): path of the archive
+
+    Raises:
+        ValueError: if the snapshot was written by a different version of the exporter
+    """
+    with zipfile.ZipFile(path, "r") as archive:
+        data = json.loads(archive.read(SNAPSHOT_JSON))
+        if data["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {data['version']}, expected {SNAPSHOT_VERSION}")
+
+        snapshot = Snapshot(
+            data["documentName"],
+            data["rootComponent"],
+            data["options"],
+            rootOccurrences=data["rootOccurrences"],
+            joints=[SnapshotJoint(**joint) for joint in data["joints"]],
+            rigidGroups=data["rigidGroups"],
+        )
+
+        for occurrence in data["occurrences"]:
+            snapshot.occurrences[occurrence["token"]] = SnapshotOccurrence(**occurrence)
+
+        for appearance in data["appearances"]:
+            snapshot.appearances[appearance["id"]] = _readMaterial(appearance)
+
+        for material in data["materials"]:
+            snapshot.materials[material["id"]] = _readMaterial(material)
+
+        for component in data["components"]:
+            bodies = []
+            for body in component["bodies"]:
+                mesh = archive.read(f"meshes/{body['mesh']}")
+                vertsLength, normalsLength, uvLength, indicesLength = body["lengths"]
+                offsets = [0, vertsLength, vertsLength + normalsLength, vertsLength + normalsLength + uvLength]
+                offsets = [offset * 4 for offset in offsets] + [(offsets[3] + indicesLength) * 4]
+
+                bodies.append(
+                    SnapshotBody(
+                        body["token"],
+                        body["name"],
+                        body["isBRep"],
+                        body["appearance"],
+                        _fromLittleEndian("f", mesh[offsets[0] : offsets[1]]),
+                        _fromLittleEndian("f", mesh[offsets[1] : offsets[2]]),
+                        _fromLittleEndian("i", mesh[offsets[3] : offsets[4]]),
+                        _fromLittleEndian("f", mesh[offsets[2] : offsets[3]]),
+                        _readPhysicalProperties(body["physicalProperties"]),
+                    )
+                )
+
+            snapshot.components[component["guid"]] = SnapshotComponent(
+                component["token"],
+                component["id"],
+                component["name"],
+                component["material"],
+                bodies,
+                _readPhysicalProperties(component["physicalProperties"]),
+            )
+
+    return snapshot
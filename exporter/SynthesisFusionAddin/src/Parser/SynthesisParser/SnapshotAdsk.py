@@ -0,0 +1,443 @@
+"""Stand in for the Fusion API that serves a recorded `Snapshot`
+
+`HeadlessExport` runs the same `Components`, `Materials`, `Joints` and `JointHierarchy` functions as the add-in.
+They import `adsk.core` and `adsk.fusion` and read the design through them, so outside of Fusion `install`
+registers stand in modules under those names and `buildDesign` wraps a snapshot in objects with the properties the
+export reads from the real design.
+
+Only what the export reads is implemented. Classes the export only uses in annotations are created on first use.
+
+This module intentionally has no Fusion dependencies.
+"""
+
+import sys
+import time
+import types
+
+from .Snapshot import (
+    Snapshot,
+    SnapshotBody,
+    SnapshotComponent,
+    SnapshotJoint,
+    SnapshotMaterial,
+    SnapshotOccurrence,
+    SnapshotPhysicalProperties,
+    SnapshotProperty,
+)
+
+# Snapshots hold a single revision of the design, the caches keyed by revision are disabled for them anyway
+SNAPSHOT_REVISION = "snapshot"
+
+# Time Fusion would spend tessellating every body, spent outside of the interpreter for benchmarks to set
+TESSELLATION_SECONDS = 0.0
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name: str) -> type:
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        stub = type(name, (Base,), {"__module__": self.__name__})
+        setattr(self, name, stub)
+        return stub
+
+
+class Base:
+    pass
+
+
+class Values(Base):
+    """Object with the given properties, nested dicts become objects as well"""
+
+    def __init__(self, **values: any):
+        for name, value in values.items():
+            setattr(self, name, Values(**value) if isinstance(value, dict) else value)
+
+
+class Collection(Base):
+    def __init__(self, items: list):
+        self._items = list(items)
+
+    @property
+    def count(self) -> int:
+        return len(self._items)
+
+    def item(self, index: int) -> any:
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index: int) -> any:
+        return self._items[index]
+
+
+# ______________________________ adsk.core ___________________________________
+
+
+class Application(Base):
+    @staticmethod
+    def get() -> None:
+        # There is no running Fusion, the same as while it is starting
+        return None
+
+
+class Point3D(Base):
+    def __init__(self, x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @staticmethod
+    def create(x: float = 0.0, y: float = 0.0, z: float = 0.0) -> "Point3D":
+        return Point3D(x, y, z)
+
+    def asVector(self) -> "Vector3D":
+        return Vector3D(self.x, self.y, self.z)
+
+
+class Vector3D(Point3D):
+    @staticmethod
+    def create(x: float = 0.0, y: float = 0.0, z: float = 0.0) -> "Vector3D":
+        return Vector3D(x, y, z)
+
+
+class Matrix3D(Base):
+    def __init__(self, values: list[float]):
+        self._values = list(values)
+
+    def asArray(self) -> list[float]:
+        return list(self._values)
+
+    def transformBy(self, matrix: "Matrix3D") -> bool:
+        """Applies `matrix` after this matrix, the same as Fusion"""
+        a, b = matrix._values, self._values
+        self._values = [
+            sum(a[row * 4 + k] * b[k * 4 + column] for k in range(4)) for row in range(4) for column in range(4)
+        ]
+        return True
+
+
+class Color(Base):
+    def __init__(self, red: int, green: int, blue: int, opacity: int):
+        self.red = red
+        self.green = green
+        self.blue = blue
+        self.opacity = opacity
+
+
+class Property(Base):
+    def __init__(self, record: SnapshotProperty):
+        self.id = record.id
+        self.name = record.name
+        self._value = record.value
+
+    @property
+    def value(self) -> any:
+        # Fusion returns a new color every time, the export changes the opacity of the ones it reads
+        return Color(*self._value) if isinstance(self._value, list) else self._value
+
+
+class Properties(Collection):
+    def __init__(self, records: list[SnapshotProperty]):
+        super().__init__(Property(record) for record in records)
+        self._byId = {prop.id: prop for prop in self._items}
+
+    def itemById(self, id: str) -> Property | None:
+        return self._byId.get(id)
+
+
+class Appearance(Base):
+    def __init__(self, record: SnapshotMaterial):
+        self.id = record.id
+        self.name = record.name
+        self.appearanceProperties = Properties(record.properties)
+
+
+class ProgressDialog(Base):
+    def __init__(self):
+        self.message = ""
+        self.progressValue = 0
+        self.wasCancelled = False
+
+
+# ______________________________ adsk.fusion ___________________________________
+
+
+class CalculationAccuracy:
+    LowCalculationAccuracy = 0
+    MediumCalculationAccuracy = 1
+    HighCalculationAccuracy = 2
+    VeryHighCalculationAccuracy = 3
+
+
+class TriangleMeshQualityOptions:
+    LowQualityTriangleMesh = 8
+    NormalQualityTriangleMesh = 11
+    HighQualityTriangleMesh = 13
+    VeryHighQualityTriangleMesh = 15
+
+
+class JointDirections:
+    XAxisJointDirection = 0
+    YAxisJointDirection = 1
+    ZAxisJointDirection = 2
+    CustomJointDirection = 3
+
+
+class Material(Base):
+    def __init__(self, record: SnapshotMaterial):
+        self.id = record.id
+        self.name = record.name
+        self.materialProperties = Properties(record.properties)
+
+
+class PhysicalProperties(Base):
+    def __init__(self, record: SnapshotPhysicalProperties | None):
+        if record is None:
+            record = SnapshotPhysicalProperties(0.0, 0.0, 0.0, 0.0, [0.0, 0.0, 0.0])
+
+        self.density = record.density
+        self.mass = record.mass
+        self.volume = record.volume
+        self.area = record.area
+        self.centerOfMass = Point3D(*record.centerOfMass)
+
+
+class TriangleMesh(Base):
+    def __init__(self, record: SnapshotBody):
+        self.nodeCoordinatesAsFloat = record.verts
+        self.normalVectorsAsFloat = record.normals
+        self.nodeIndices = record.indices
+        self.textureCoordinatesAsFloat = record.uv
+
+
+class MeshCalculator(Base):
+    def __init__(self, mesh: TriangleMesh):
+        self._mesh = mesh
+        self.quality = None
+
+    def setQuality(self, quality: int) -> None:
+        # The snapshot holds the meshes at the quality of the recorded export
+        self.quality = quality
+
+    def calculate(self) -> TriangleMesh:
+        if TESSELLATION_SECONDS > 0.0:
+            time.sleep(TESSELLATION_SECONDS)
+
+        return self._mesh
+
+
+class _Body(Base):
+    def __init__(self, record: SnapshotBody, appearance: Appearance | None):
+        self.entityToken = record.token
+        self.name = record.name
+        self.appearance = appearance
+        self.isLightBulbOn = True
+        self.revisionId = SNAPSHOT_REVISION
+
+
+class BRepBody(_Body):
+    def __init__(self, record: SnapshotBody, appearance: Appearance | None):
+        super().__init__(record, appearance)
+        mesh = TriangleMesh(record)
+        self.meshManager = Values(createMeshCalculator=lambda: MeshCalculator(mesh))
+        self._physicalProperties = record.physicalProperties
+
+    def getPhysicalProperties(self, accuracy: int = CalculationAccuracy.LowCalculationAccuracy) -> PhysicalProperties:
+        return PhysicalProperties(self._physicalProperties)
+
+
+class MeshBody(_Body):
+    def __init__(self, record: SnapshotBody, appearance: Appearance | None):
+        super().__init__(record, appearance)
+        self.displayMesh = TriangleMesh(record)
+
+
+class Component(Base):
+    def __init__(self, record: SnapshotComponent, appearances: dict[str, Appearance], material: Material | None):
+        self.entityToken = record.token
+        self.id = record.id
+        self.name = record.name
+        self.material = material
+        self.revisionId = SNAPSHOT_REVISION
+        self.bRepBodies = Collection(
+            BRepBody(body, appearances.get(body.appearance)) for body in record.bodies if body.isBRep
+        )
+        self.meshBodies = Collection(
+            MeshBody(body, appearances.get(body.appearance)) for body in record.bodies if not body.isBRep
+        )
+        self._physicalProperties = record.physicalProperties
+
+        # Only filled in for the root component
+        self.occurrences = Collection([])
+        self.allOccurrences = Collection([])
+        self.allJoints = Collection([])
+        self.allAsBuiltJoints = Collection([])
+        self.allRigidGroups = Collection([])
+
+    def getPhysicalProperties(self, accuracy: int = CalculationAccuracy.LowCalculationAccuracy) -> PhysicalProperties:
+        return PhysicalProperties(self._physicalProperties)
+
+
+class Attributes(Base):
+    def __init__(self, names: set[tuple[str, str]]):
+        self._names = names
+
+    def itemByName(self, groupName: str, name: str) -> Values | None:
+        return Values(groupName=groupName, name=name) if (groupName, name) in self._names else None
+
+
+class Occurrence(Base):
+    def __init__(self, record: SnapshotOccurrence, component: Component, appearance: Appearance | None):
+        self.entityToken = record.token
+        self.name = record.name
+        self.component = component
+        self.isLightBulbOn = record.isLightBulbOn
+        self.isGrounded = record.isGrounded
+        self.appearance = appearance
+        self.attributes = Attributes({("synthesis", "collision_off")} if record.collisionOff else set())
+        self.childOccurrences = Collection([])
+        self._transform = record.transform
+
+    @property
+    def transform(self) -> Matrix3D:
+        # Fusion returns a new matrix every time, the export transforms the ones it reads in place
+        return Matrix3D(self._transform)
+
+
+class JointGeometry(Base):
+    objectType = "adsk::fusion::JointGeometry"
+
+    def __init__(self, origin: list[float]):
+        # Neither an edge nor a face, so `Joints._jointOrigin` reads the recorded origin
+        self.entityOne = Values(objectType="adsk::fusion::BRepVertex")
+        self.origin = Point3D(*origin)
+
+
+class JointOrigin(Base):
+    objectType = "adsk::fusion::JointOrigin"
+
+
+class Joint(Base):
+    def __init__(self, record: SnapshotJoint, occurrences: dict[str, Occurrence]):
+        self.entityToken = record.token
+        self.name = record.name
+        self.isSuppressed = record.isSuppressed
+        self.occurrenceOne = occurrences.get(record.occurrenceOne)
+        self.occurrenceTwo = occurrences.get(record.occurrenceTwo)
+        self.jointMotion = Values(jointType=record.jointType, **record.motion)
+
+        geometry = JointGeometry(record.origin) if record.origin is not None else None
+        if record.isAsBuilt:
+            self.objectType = "adsk::fusion::AsBuiltJoint"
+            self.geometry = geometry
+        else:
+            # Without a joint geometry `Joints._jointOrigin` falls back to the second one, which finds no origin
+            self.objectType = "adsk::fusion::Joint"
+            self.geometryOrOriginOne = geometry if geometry is not None else JointOrigin()
+            self.geometryOrOriginTwo = None
+
+
+class RigidGroup(Base):
+    def __init__(self, occurrences: list[Occurrence]):
+        self.isSuppressed = False
+        self.occurrences = Collection(occurrences)
+
+
+class Design(Base):
+    def __init__(self, snapshot: Snapshot):
+        appearances = {id: Appearance(record) for id, record in snapshot.appearances.items()}
+        materials = {id: Material(record) for id, record in snapshot.materials.items()}
+
+        components: dict[str, Component] = {}
+        for guid, record in snapshot.components.items():
+            material = None
+            if record.material is not None:
+                material = materials.get(record.material) or Material(SnapshotMaterial(record.material, ""))
+
+            components[guid] = Component(record, appearances, material)
+
+        occurrences = {
+            token: Occurrence(record, components[record.componentGuid], appearances.get(record.appearance))
+            for token, record in snapshot.occurrences.items()
+        }
+        for token, record in snapshot.occurrences.items():
+            occurrences[token].childOccurrences = Collection(occurrences[child] for child in record.children)
+
+        joints = [Joint(record, occurrences) for record in snapshot.joints if not record.isAsBuilt]
+        asBuiltJoints = [Joint(record, occurrences) for record in snapshot.joints if record.isAsBuilt]
+
+        self.rootComponent = components[snapshot.rootComponent]
+        self.rootComponent.occurrences = Collection(occurrences[token] for token in snapshot.rootOccurrences)
+        self.rootComponent.allOccurrences = Collection(occurrences.values())
+        self.rootComponent.allJoints = Collection(joints)
+        self.rootComponent.allAsBuiltJoints = Collection(asBuiltJoints)
+        self.rootComponent.allRigidGroups = Collection(
+            RigidGroup([occurrences[token] for token in group]) for group in snapshot.rigidGroups
+        )
+
+        self.allComponents = Collection(components.values())
+        self.materials = Collection(materials.values())
+        # Snapshots aren't a saved version of anything, so their materials are never cached
+        self.parentDocument = Values(name=snapshot.documentName, isSaved=False, isModified=False, dataFile=None)
+
+
+_adsk = _StubModule("adsk")
+_core = _StubModule("adsk.core")
+_fusion = _StubModule("adsk.fusion")
+
+_CORE_CLASSES = (Application, Base, Point3D, Vector3D, Matrix3D, Color, Property, Appearance, ProgressDialog)
+_FUSION_CLASSES = (
+    CalculationAccuracy,
+    TriangleMeshQualityOptions,
+    JointDirections,
+    Material,
+    PhysicalProperties,
+    TriangleMesh,
+    MeshCalculator,
+    BRepBody,
+    MeshBody,
+    Component,
+    Occurrence,
+    JointGeometry,
+    JointOrigin,
+    Joint,
+    RigidGroup,
+    Design,
+)
+
+
+def install() -> None:
+    """Registers the stand in `adsk`, `adsk.core` and `adsk.fusion` modules, call before importing the export
+
+    Raises:
+        RuntimeError: if the real Fusion API was already imported
+    """
+    if sys.modules.get("adsk") is _adsk:
+        return
+
+    if "adsk" in sys.modules:
+        raise RuntimeError("The Fusion API is already imported, snapshots can only be exported outside of Fusion")
+
+    for cls in _CORE_CLASSES:
+        setattr(_core, cls.__name__, cls)
+
+    for cls in _FUSION_CLASSES:
+        setattr(_fusion, cls.__name__, cls)
+
+    _adsk.core = _core
+    _adsk.fusion = _fusion
+    _adsk.doEvents = lambda: None
+
+    sys.modules["adsk"] = _adsk
+    sys.modules["adsk.core"] = _core
+    sys.modules["adsk.fusion"] = _fusion
+
+
+def buildDesign(snapshot: Snapshot) -> Design:
+    """Wraps a snapshot in a stand in `adsk.fusion.Design`"""
+    return Design(snapshot)
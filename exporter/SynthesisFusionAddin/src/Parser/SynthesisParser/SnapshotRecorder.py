@@ -0,0 +1,217 @@
+"""Records a `Snapshot` of the design being exported, see `Snapshot` for the format"""
+
+import os
+from array import array
+from datetime import datetime
+
+import adsk.core
+import adsk.fusion
+
+from ...Logging import getLogFileFolder, getLogger, logFailure, timed
+from ...strings import INTERNAL_ID
+from ...Types import PhysicalDepth, encodeNestedObjects
+from ..ExporterOptions import ExporterOptions
+from .AssemblyIndex import AssemblyIndex
+from .Components import _ReadBRepMesh, _ReadMeshBody
+from .Joints import _jointOrigin
+from .Snapshot import (
+    Snapshot,
+    SnapshotBody,
+    SnapshotComponent,
+    SnapshotJoint,
+    SnapshotMaterial,
+    SnapshotOccurrence,
+    SnapshotPhysicalProperties,
+    SnapshotProperty,
+    writeSnapshot,
+)
+from .Utilities import guid_component
+
+logger = getLogger()
+
+# Appearance properties read by `Materials.getMaterialAppearance`, besides any property named "Color"
+APPEARANCE_PROPERTIES = (
+    "interior_model",
+    "opaque_albedo",
+    "metal_f0",
+    "layered_diffuse",
+    "transparent_color",
+    "transparent_distance",
+)
+
+# Material properties read by `Materials.getPhysicalMaterialData`
+MATERIAL_PROPERTIES = (
+    "structural_Young_modulus",
+    "structural_Poisson_ratio",
+    "structural_Shear_modulus",
+    "structural_Density",
+    "structural_Damping_coefficient",
+    "structural_Minimum_yield_stress",
+    "structural_Minimum_tensile_strength",
+)
+
+# Joint motion properties read by `Joints.fillRevoluteJointMotion` and `Joints.fillSliderJointMotion`
+JOINT_MOTION_PROPERTIES = {
+    1: ("rotationValue", "rotationLimits", "rotationAxisVector", "rotationAxis"),
+    2: ("slideDirectionVector", "slideDirection", "slideLimits", "slideValue"),
+}
+
+
+@logFailure
+@timed
+def recordSnapshot(
+    design: adsk.fusion.Design,
+    index: AssemblyIndex,
+    appearances: dict[str, adsk.core.Appearance],
+    options: ExporterOptions,
+) -> None:
+    """Records a snapshot of the design and writes it next to the log file
+
+    Meshes are calculated with the visual quality of the export and physical properties with its accuracy and depth.
+
+    Args:
+        design (adsk.fusion.Design): design being exported
+        index (AssemblyIndex): index of the design
+        appearances (dict[str, adsk.core.Appearance]): appearances referenced by the design
+        options (ExporterOptions): options of the export
+    """
+    snapshot = Snapshot(
+        design.parentDocument.name,
+        guid_component(design.rootComponent),
+        encodeNestedObjects(options),
+        rootOccurrences=list(index.rootOccurrences),
+        rigidGroups=[list(group) for group in index.rigidGroups],
+    )
+
+    for appearance in appearances.values():
+        properties = appearance.appearanceProperties
+        records = [properties.itemById(id) for id in APPEARANCE_PROPERTIES]
+        records += [prop for prop in properties if prop.name == "Color" and prop.id not in APPEARANCE_PROPERTIES]
+        snapshot.appearances[appearance.id] = _recordMaterial(appearance, records)
+
+    for material in design.materials:
+        properties = material.materialProperties
+        records = [properties.itemById(id) for id in MATERIAL_PROPERTIES]
+        snapshot.materials[material.id] = _recordMaterial(material, records)
+
+    level = options.physicalCalculationLevel
+    for comp_ref, component in index.components.items():
+        snapshotComponent = SnapshotComponent(
+            component.entityToken,
+            component.id,
+            component.name,
+            component.material.id if component.material else None,
+        )
+        if options.physicalDepth in (PhysicalDepth.SurfaceOccurrence, PhysicalDepth.AllOccurrence):
+            snapshotComponent.physicalProperties = _recordPhysicalProperties(component.getPhysicalProperties(level))
+
+        bodies = [(body, _ReadBRepMesh(body, options)) for body in component.bRepBodies if body.isLightBulbOn]
+        bodies += [(body, _ReadMeshBody(body)) for body in component.meshBodies if body.isLightBulbOn]
+        for body, raw in bodies:
+            isBRep = isinstance(body, adsk.fusion.BRepBody)
+            snapshotBody = SnapshotBody(
+                raw.guid,
+                raw.name,
+                isBRep,
+                body.appearance.id if body.appearance else None,
+                array("f", raw.verts),
+                array("f", raw.normals),
+                array("i", raw.indices),
+                array("f", raw.uv),
+            )
+            if isBRep and options.physicalDepth == PhysicalDepth.Body:
+                snapshotBody.physicalProperties = _recordPhysicalProperties(body.getPhysicalProperties(level))
+
+            snapshotComponent.bodies.append(snapshotBody)
+
+        snapshot.components[comp_ref] = snapshotComponent
+
+    for token, entry in index.occurrences.items():
+        try:
+            appearance = entry.occurrence.appearance
+            appearanceId = appearance.id if appearance else None
+        except:
+            # Same as `Components._OccurrenceAppearance`
+            appearanceId = None
+
+        snapshot.occurrences[token] = SnapshotOccurrence(
+            token,
+            entry.componentGuid,
+            entry.name,
+            entry.isLightBulbOn,
+            entry.isGrounded,
+            list(entry.occurrence.transform.asArray()),
+            list(entry.children),
+            appearanceId,
+            entry.skipCollider,
+        )
+
+    for entry in index.joints:
+        joint = entry.joint
+        origin = None
+        motion = {}
+        # Only revolute and slider joints are exported, see `Joints.populateJoints`
+        if entry.jointType in JOINT_MOTION_PROPERTIES:
+            point = _jointOrigin(joint)
+            origin = [point.x, point.y, point.z] if point else None
+            motion = {
+                name: _recordValue(getattr(joint.jointMotion, name))
+                for name in JOINT_MOTION_PROPERTIES[entry.jointType]
+            }
+
+        snapshot.joints.append(
+            SnapshotJoint(
+                entry.token,
+                entry.name,
+                joint.objectType == "adsk::fusion::AsBuiltJoint",
+                entry.isSuppressed,
+                entry.occurrenceOne,
+                entry.occurrenceTwo,
+                entry.jointType,
+                origin,
+                motion,
+            )
+        )
+
+    path = os.path.join(
+        getLogFileFolder(), f"{INTERNAL_ID}-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}-snapshot.zip"
+    )
+    writeSnapshot(snapshot, path)
+    logger.info(f"Wrote snapshot of {len(snapshot.occurrences)} occurrences to '{path}'")
+
+
+def _recordMaterial(
+    material: adsk.core.Appearance | adsk.core.Material, properties: list[adsk.core.Property | None]
+) -> SnapshotMaterial:
+    record = SnapshotMaterial(material.id, material.name)
+    for prop in properties:
+        if prop is None:
+            continue
+
+        value = prop.value
+        if hasattr(value, "red"):
+            value = [value.red, value.green, value.blue, value.opacity]
+        elif not isinstance(value, (bool, int, float, str)):
+            value = None
+
+        record.properties.append(SnapshotProperty(prop.id, prop.name, value))
+
+    return record
+
+
+def _recordPhysicalProperties(physical: adsk.fusion.PhysicalProperties) -> SnapshotPhysicalProperties:
+    com = physical.centerOfMass
+    return SnapshotPhysicalProperties(
+        physical.density, physical.mass, physical.volume, physical.area, [com.x, com.y, com.z]
+    )
+
+
+def _recordValue(value: any) -> any:
+    """Records vectors and limits as dicts of the properties the export reads from them"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if hasattr(value, "minimumValue"):
+        return {"minimumValue": value.minimumValue, "maximumValue": value.maximumValue}
+
+    return {"x": value.x, "y": value.y, "z": value.z}
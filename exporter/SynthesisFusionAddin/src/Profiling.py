@@ -0,0 +1,176 @@
+"""Opt in, hierarchical profiling of an export
+
+While a `Profiler` is active every `profileSpan` records a span of time along with the spans it is nested in,
+for example stage -> component -> body -> mesh calculation. When profiling stops the spans are written next to
+the log file in two formats:
+
+- `*.trace.json`, Chrome trace events, open with `chrome://tracing` or https://ui.perfetto.dev
+- `*.folded`, folded stacks of self time in microseconds, for flamegraph.pl or https://www.speedscope.app
+
+When no profiler is active `profileSpan` does nothing, so the spans can be left in place.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator
+
+from .Logging import MAX_LOG_FILES_TO_KEEP, getLogFileFolder, getLogger
+from .strings import INTERNAL_ID
+
+logger = getLogger()
+
+PROFILE_EXTENSIONS = (".trace.json", ".folded")
+
+# The profiler of the export in progress, if profiling is enabled
+_activeProfiler: "Profiler | None" = None
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    stack: tuple[str, ...]
+    threadId: int
+    nestedOnThread: bool
+    start: float
+    duration: float
+    args: dict[str, str]
+
+
+class Profiler:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def currentStack(self) -> tuple[str, ...]:
+        return getattr(self._local, "stack", ())
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, parentStack: tuple[str, ...] | None = None, **args: str) -> Iterator[None]:
+        """Records the time spent inside of the with block
+
+        Args:
+            name (str): name shown in the trace, for example the component name
+            category (str): kind of work being done, for example "component" or "mesh"
+            parentStack (tuple[str, ...] | None): stack to nest under instead of the current thread's,
+                used to attribute work handed off to worker threads
+        """
+        outerStack = self.currentStack()
+        stack = (parentStack if parentStack is not None else outerStack) + (name,)
+        self._local.stack = stack
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self._local.stack = outerStack
+            with self._lock:
+                self.spans.append(
+                    Span(
+                        name,
+                        category,
+                        stack,
+                        threading.get_ident(),
+                        parentStack is None and len(outerStack) > 0,
+                        start - self.origin,
+                        duration,
+                        args,
+                    )
+                )
+
+    def writeChromeTrace(self, path: str) -> None:
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round(span.start * 1e6, 3),
+                "dur": round(span.duration * 1e6, 3),
+                "pid": pid,
+                "tid": span.threadId,
+                "args": span.args,
+            }
+            for span in self.spans
+        ]
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def writeFoldedStacks(self, path: str) -> None:
+        # Self time of a span is its duration minus the time of the spans directly nested inside of it on the same
+        # thread, work handed off to other threads runs in parallel so it isn't subtracted
+        selfTimes: dict[tuple[str, ...], float] = {}
+        for span in self.spans:
+            selfTimes[span.stack] = selfTimes.get(span.stack, 0.0) + span.duration
+            if span.nestedOnThread:
+                parent = span.stack[:-1]
+                selfTimes[parent] = selfTimes.get(parent, 0.0) - span.duration
+
+        with open(path, "w") as f:
+            for stack, seconds in selfTimes.items():
+                microseconds = round(seconds * 1e6)
+                if microseconds > 0:
+                    names = ";".join(name.replace(";", ",").replace(" ", "_") for name in stack)
+                    f.write(f"{names} {microseconds}\n")
+
+
+def startProfiling() -> Profiler:
+    global _activeProfiler
+    _activeProfiler = Profiler()
+    return _activeProfiler
+
+
+def stopProfiling(profiler: Profiler | None = None) -> None:
+    """Stops a profiler and writes its results next to the log file
+
+    Args:
+        profiler (Profiler | None): profiler to stop, the active one if None. If another profiler was started since,
+            that one stays active.
+    """
+    global _activeProfiler
+    if profiler is None:
+        profiler = _activeProfiler
+
+    if profiler is _activeProfiler:
+        _activeProfiler = None
+
+    if profiler is None:
+        return
+
+    logFileFolder = getLogFileFolder()
+    profiles = sorted(file for file in os.listdir(logFileFolder) if file.endswith(PROFILE_EXTENSIONS))
+    for file in profiles[: max(0, len(profiles) - MAX_LOG_FILES_TO_KEEP * len(PROFILE_EXTENSIONS))]:
+        os.remove(os.path.join(logFileFolder, file))
+
+    basePath = os.path.join(logFileFolder, f"{INTERNAL_ID}-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}-profile")
+    profiler.writeChromeTrace(f"{basePath}.trace.json")
+    profiler.writeFoldedStacks(f"{basePath}.folded")
+    logger.info(f"Wrote export profile with {len(profiler.spans)} spans to '{basePath}'")
+
+
+def currentStack() -> tuple[str, ...] | None:
+    """Gets the stack of spans on the calling thread, or None when not profiling"""
+    return _activeProfiler.currentStack() if _activeProfiler is not None else None
+
+
+@contextlib.contextmanager
+def profileSpan(
+    name: str, category: str = "export", parentStack: tuple[str, ...] | None = None, **args: str
+) -> Iterator[None]:
+    """Records a span if profiling is enabled, see `Profiler.span`"""
+    profiler = _activeProfiler
+    if profiler is None:
+        yield
+        return
+
+    with profiler.span(name, category, parentStack, **args):
+        yield
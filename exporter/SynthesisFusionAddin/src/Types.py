@@ -13,6 +13,7 @@ SignalType = Enum("SignalType", ["PWM", "CAN", "PASSIVE"])
 ExportMode = Enum("ExportMode", ["ROBOT", "FIELD"])  # Dynamic / Static export
 PreferredUnits = Enum("PreferredUnits", ["METRIC", "IMPERIAL"])
 ExportLocation = Enum("ExportLocation", ["UPLOAD", "DOWNLOAD"])
+CompressionCodec = Enum("CompressionCodec", ["GZIP", "ZLIB", "DEFLATE", "ZSTD", "LZ4"])
 
 
 @dataclass
@@ -96,6 +97,8 @@ def encodeNestedObjects(obj: any) -> any:
         return obj.value
     elif hasattr(obj, "__dict__"):
         return {key: encodeNestedObjects(value) for key, value in obj.__dict__.items()}
+    elif isinstance(obj, list):
+        return [encodeNestedObjects(value) for value in obj]
     else:
         assert isinstance(obj, PRIMITIVES)
         return obj
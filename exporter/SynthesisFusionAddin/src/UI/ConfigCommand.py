@@ -13,10 +13,17 @@ from ..APS.APS import getAuth, getUserInfo, refreshAuthToken
 from ..general_imports import *
 from ..Logging import getLogger, logFailure
 from ..Parser.ExporterOptions import ExporterOptions
+from ..Parser.SynthesisParser import Compression
 from ..Parser.SynthesisParser.Parser import Parser
 from ..Parser.SynthesisParser.Utilities import guid_occurrence
-from ..Types import ExportLocation, ExportMode, Gamepiece, PreferredUnits
-from . import CustomGraphics, FileDialogConfig, Helper, IconPaths
+from ..Types import (
+    CompressionCodec,
+    ExportLocation,
+    ExportMode,
+    Gamepiece,
+    PreferredUnits,
+)
+from . import CustomGraphics, FileDialogConfig, Helper, IconPaths, MassService
 from .Configuration.SerialCommand import SerialCommand
 
 # Transition: AARD-1685
@@ -87,36 +94,6 @@ class JointMotions(Enum):
     BALL = 6
 
 
-class FullMassCalculation:
-    def __init__(self):
-        self.totalMass = 0.0
-        self.bRepMassInRoot()
-        self.traverseOccurrenceHierarchy()
-
-    @logFailure(messageBox=True)
-    def bRepMassInRoot(self):
-        for body in gm.app.activeDocument.design.rootComponent.bRepBodies:
-            if not body.isLightBulbOn:
-                continue
-            physical = body.getPhysicalProperties(adsk.fusion.CalculationAccuracy.LowCalculationAccuracy)
-            self.totalMass += physical.mass
-
-    @logFailure(messageBox=True)
-    def traverseOccurrenceHierarchy(self):
-        for occ in gm.app.activeDocument.design.rootComponent.allOccurrences:
-            if not occ.isLightBulbOn:
-                continue
-
-            for body in occ.component.bRepBodies:
-                if not body.isLightBulbOn:
-                    continue
-                physical = body.getPhysicalProperties(adsk.fusion.CalculationAccuracy.LowCalculationAccuracy)
-                self.totalMass += physical.mass
-
-    def getTotalMass(self):
-        return self.totalMass
-
-
 class ConfigureCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
     """### Start the Command Input Object and define all of the input groups to create our ParserOptions object.
 
@@ -255,6 +232,9 @@ class ConfigureCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
         weightTableInput.addCommandInput(weight_input, 0, 2)  # add command inputs to table
         weightTableInput.addCommandInput(weight_unit, 0, 3)  # add command inputs to table
 
+        # Measure the design while the dialog is open so calculating the weight is instant
+        MassService.massService.requestTotalMass()
+
         global jointConfigTab
         jointConfigTab = JointConfigTab(args)
 
@@ -435,6 +415,29 @@ class ConfigureCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             enabled=True,
         )
 
+        compressionCodec = exporter_settings.addDropDownCommandInput(
+            "compression_codec", "Compression", dropDownStyle=adsk.core.DropDownStyles.TextListDropDownStyle
+        )
+        # The simulator has no zstd or lz4 decoder, so those are left for `tools/benchmarkCompression.py`
+        for codec in Compression.DEFLATE_CODECS:
+            compressionCodec.listItems.add(codec.name, codec == exporterOptions.compressionCodec)
+
+        if compressionCodec.selectedItem is None:
+            compressionCodec.listItems.item(0).isSelected = True
+
+        compressionCodec.tooltip = "Codec used to compress the output file."
+        compressionCodec.tooltipDescription = (
+            "<hr>GZIP, ZLIB and DEFLATE all make files the simulator opens, GZIP is the most widely supported.<br>"
+        )
+
+        compressionLevel = exporter_settings.addIntegerSpinnerCommandInput(
+            "compression_level", "Compression Level", 0, 9, 1, min(exporterOptions.compressionLevel, 9)
+        )
+        compressionLevel.tooltip = "Higher levels make smaller files but take longer to export."
+        compressionLevel.tooltipDescription = (
+            "<hr>Level 0 stores the file uncompressed and level 9 compresses it the most.<br>"
+        )
+
         self.createBooleanInput(
             "export_as_part",
             "Export As Part",
@@ -444,6 +447,66 @@ class ConfigureCommandCreatedHandler(adsk.core.CommandCreatedEventHandler):
             enabled=True,
         )
 
+        self.createBooleanInput(
+            "optimize_meshes",
+            "Optimize Meshes",
+            exporter_settings,
+            checked=exporterOptions.optimizeMeshes,
+            tooltip="Weld duplicate vertices and reorder triangles for faster drawing.",
+            tooltipadvanced="<hr>Reduces the file size but increases the export time, the shape of the meshes is unchanged.<br>",
+            enabled=True,
+        )
+
+        self.createBooleanInput(
+            "quantize_meshes",
+            "Quantize Meshes",
+            exporter_settings,
+            checked=exporterOptions.quantizeMeshes,
+            tooltip="Store meshes with 16 bit precision to make the file several times smaller.",
+            tooltipadvanced="<hr>Positions are stored relative to the bounding box of each body.<br>",
+            enabled=True,
+        )
+
+        self.createBooleanInput(
+            "export_lods",
+            "Export LODs",
+            exporter_settings,
+            checked=exporterOptions.exportLods,
+            tooltip="Export simplified versions of every body for drawing it far away.",
+            tooltipadvanced="<hr>Increases the export time and file size, the full detail meshes are unchanged.<br>",
+            enabled=True,
+        )
+
+        self.createBooleanInput(
+            "export_colliders",
+            "Export Collision Hulls",
+            exporter_settings,
+            checked=exporterOptions.exportColliders,
+            tooltip="Export a convex hull of every body to use as its collider.",
+            tooltipadvanced="<hr>Speeds up loading the robot in Synthesis, hulls are not built for parts with collision turned off.<br>",
+            enabled=True,
+        )
+
+        self.createBooleanInput(
+            "profile_export",
+            "Profile Export",
+            exporter_settings,
+            checked=exporterOptions.profileExport,
+            tooltip="Record how long each part of the export takes.",
+            tooltipadvanced="<hr>Writes a Chrome trace and a folded stack file for flame graphs next to the log file.<br>",
+            enabled=True,
+        )
+
+        self.createBooleanInput(
+            "record_snapshot",
+            "Record Snapshot",
+            exporter_settings,
+            checked=exporterOptions.recordSnapshot,
+            tooltip="Record a snapshot of the design for exporting outside of Fusion.",
+            tooltipadvanced="<hr>Writes the snapshot next to the log file, see tools/exportSnapshot.py.<br>",
+            enabled=True,
+        )
+
         # ~~~~~~~~~~~~~~~~ PHYSICS SETTINGS ~~~~~~~~~~~~~~~~
         """
         Physics settings group command
@@ -865,6 +928,19 @@ class ConfigureCommandExecuteHandler(adsk.core.CommandEventHandler):
             .children.itemById("compress")
         ).value
 
+        compressionCodec = CompressionCodec[
+            eventArgs.command.commandInputs.itemById("advanced_settings")
+            .children.itemById("exporter_settings")
+            .children.itemById("compression_codec")
+            .selectedItem.name
+        ]
+
+        compressionLevel = (
+            eventArgs.command.commandInputs.itemById("advanced_settings")
+            .children.itemById("exporter_settings")
+            .children.itemById("compression_level")
+        ).value
+
         selectedJoints, selectedWheels = jointConfigTab.getSelectedJointsAndWheels()
 
         export_as_part_boolean = (
@@ -873,6 +949,42 @@ class ConfigureCommandExecuteHandler(adsk.core.CommandEventHandler):
             .children.itemById("export_as_part")
         ).value
 
+        optimize_meshes_boolean = (
+            eventArgs.command.commandInputs.itemById("advanced_settings")
+            .children.itemById("exporter_settings")
+            .children.itemById("optimize_meshes")
+        ).value
+
+        quantize_meshes_boolean = (
+            eventArgs.command.commandInputs.itemById("advanced_settings")
+            .children.itemById("exporter_settings")
+            .children.itemById("quantize_meshes")
+        ).value
+
+        export_lods_boolean = (
+            eventArgs.command.commandInputs.itemById("advanced_settings")
+            .children.itemById("exporter_settings")
+            .children.itemById("export_lods")
+        ).value
+
+        export_colliders_boolean = (
+            eventArgs.command.commandInputs.itemById("advanced_settings")
+            .children.itemById("exporter_settings")
+            .children.itemById("export_colliders")
+        ).value
+
+        profile_export_boolean = (
+            eventArgs.command.commandInputs.itemById("advanced_settings")
+            .children.itemById("exporter_settings")
+            .children.itemById("profile_export")
+        ).value
+
+        record_snapshot_boolean = (
+            eventArgs.command.commandInputs.itemById("advanced_settings")
+            .children.itemById("exporter_settings")
+            .children.itemById("record_snapshot")
+        ).value
+
         frictionOverrideSlider = (
             eventArgs.command.commandInputs.itemById("advanced_settings")
             .children.itemById("physics_settings")
@@ -895,7 +1007,15 @@ class ConfigureCommandExecuteHandler(adsk.core.CommandEventHandler):
             exportMode=_mode,
             exportLocation=_location,
             compressOutput=compress,
+            compressionCodec=compressionCodec,
+            compressionLevel=compressionLevel,
             exportAsPart=export_as_part_boolean,
+            optimizeMeshes=optimize_meshes_boolean,
+            quantizeMeshes=quantize_meshes_boolean,
+            exportLods=export_lods_boolean,
+            exportColliders=export_colliders_boolean,
+            profileExport=profile_export_boolean,
+            recordSnapshot=record_snapshot_boolean,
             frictionOverride=frictionOverride,
             frictionOverrideCoeff=frictionOverrideCoeff,
         )
@@ -1211,32 +1331,35 @@ class ConfigureCommandInputChanged(adsk.core.InputChangedEventHandler):
         gm.ui.activeSelections.clear()
 
     @logFailure
-    def weight(self, isLbs=True):  # maybe add a progress dialog??
-        """### Get the total design weight using the predetermined units.
+    def weight(self):
+        """### Starts calculating the total design weight, the weight input is filled in once it's known.
 
-        Args:
-            isLbs (bool, optional): Is selected mass unit pounds? Defaults to True.
-
-        Returns:
-            value (float): weight value in specified unit
+        The weight name shows a placeholder and the calculate button is disabled while calculating, see `MassService`.
         """
-        if gm.app.activeDocument.design:
-            massCalculation = FullMassCalculation()
-            totalMass = massCalculation.getTotalMass()
+        if not gm.app.activeDocument.design:
+            return
 
-            value = float
+        weightName = INPUTS_ROOT.itemById("weight_name")
+        autoCalcWeight = INPUTS_ROOT.itemById("auto_calc_weight")
+        weightInput = INPUTS_ROOT.itemById("weight_input")
+        weightName.value = "Calculating…"
+        autoCalcWeight.isEnabled = False
 
-            self.allWeights[0] = round(totalMass * 2.2046226218, 2)
+        @logFailure
+        def setWeight(totalMass: float | None) -> None:
+            if not weightInput.isValid:  # the dialog was closed
+                return
 
-            self.allWeights[1] = round(totalMass, 2)
+            weightName.value = "Weight"
+            autoCalcWeight.isEnabled = True
+            if totalMass is None:
+                return
 
-            if isLbs:
-                value = self.allWeights[0]
-            else:
-                value = self.allWeights[1]
+            self.allWeights[0] = round(totalMass * 2.2046226218, 2)
+            self.allWeights[1] = round(totalMass, 2)
+            weightInput.value = self.allWeights[0] if self.isLbs else self.allWeights[1]
 
-            value = round(value, 2)  # round weight to 2 decimals places
-            return value
+        MassService.massService.requestTotalMass(setWeight)
 
     @logFailure(messageBox=True)
     def notify(self, args):
@@ -1374,23 +1497,8 @@ class ConfigureCommandInputChanged(adsk.core.InputChangedEventHandler):
             button = adsk.core.BoolValueCommandInput.cast(cmdInput)
 
             if button.value == True:  # CALCULATE button pressed
-                if self.allWeights.count(None) == 2:  # if button is pressed for the first time
-                    if self.isLbs:  # if pounds unit selected
-                        self.allWeights[0] = self.weight()
-                        weight_input.value = self.allWeights[0]
-                    else:  # if kg unit selected
-                        self.allWeights[1] = self.weight(False)
-                        weight_input.value = self.allWeights[1]
-                else:  # if a mass value has already been configured
-                    if (
-                        weight_input.value != self.allWeights[0]
-                        or weight_input.value != self.allWeights[1]
-                        or not weight_input.isValidExpression
-                    ):
-                        if self.isLbs:
-                            weight_input.value = self.allWeights[0]
-                        else:
-                            weight_input.value = self.allWeights[1]
+                # Only bodies that changed since the last calculation are measured again
+                self.weight()
 
         elif cmdInput.id == "auto_calc_weight_f":
             button = adsk.core.BoolValueCommandInput.cast(cmdInput)
@@ -1438,6 +1546,7 @@ class MyCommandDestroyHandler(adsk.core.CommandEventHandler):
     def notify(self, args):
         onSelect = gm.handlers[3]
 
+        MassService.massService.cancel()
         jointConfigTab.reset()
         GamepieceListGlobal.clear()
         onSelect.allWheelPreselections.clear()
@@ -0,0 +1,144 @@
+"""Incremental calculation of the total mass of the design for the configuration dialog
+
+The dialog used to measure every visible body of every visible occurrence whenever the weight was calculated, which
+stalls Fusion for seconds on big robots. Instead:
+
+- Every component is measured once and multiplied by how many visible occurrences of it there are
+- Body masses are kept between calculations by entity token and revision id, so only bodies that changed since
+  the last calculation are measured again
+- The calculation runs on the main thread in small steps, see `BackgroundTasks.deferToMainThread`, so the dialog
+  stays responsive while it runs
+
+Masses are in kilograms, like `getPhysicalProperties` returns them.
+"""
+
+import traceback
+from typing import Callable, Generator
+
+import adsk.fusion
+
+from ..BackgroundTasks import deferToMainThread, showMessage
+from ..general_imports import gm
+from ..Logging import getLogger
+from ..Parser.SynthesisParser.Utilities import guid_component
+
+logger = getLogger()
+
+# Bodies measured before handing the main thread back to the UI
+BODIES_PER_STEP = 4
+
+# Components whose bodies are all cached that are checked before handing the main thread back to the UI
+COMPONENTS_PER_STEP = 64
+
+MassCallback = Callable[[float | None], None]
+
+
+class MassService:
+    def __init__(self):
+        # (body entity token, body revision id) -> mass in kg
+        self.bodyMasses: dict[tuple[str, str], float] = {}
+        self.callbacks: list[MassCallback] = []
+
+        # Increased whenever a calculation starts or is canceled, steps of older calculations stop themselves
+        self.generation = 0
+        self.running = False
+
+    def requestTotalMass(self, callback: MassCallback | None = None) -> None:
+        """Starts calculating the total mass of the active design, unless a calculation is already running
+
+        Args:
+            callback (MassCallback | None): called with the total mass in kg once it is known, or with None if the
+                calculation failed or was canceled. Without one the calculation only fills the cache.
+        """
+        if callback is not None:
+            self.callbacks.append(callback)
+
+        if self.running:
+            return
+
+        self.running = True
+        self.generation += 1
+        self._step(self._calculate(), self.generation)
+
+    def cancel(self) -> None:
+        """Stops the running calculation, called when the dialog closes"""
+        self.generation += 1
+        self._finish(None)
+
+    def _step(self, calculation: Generator[None, None, float], generation: int) -> None:
+        if generation != self.generation:
+            return
+
+        try:
+            next(calculation)
+        except StopIteration as done:
+            self._finish(done.value)
+            return
+        except BaseException:
+            logger.error(f"Mass calculation failed:\n{traceback.format_exc()}")
+            showMessage(f"Mass calculation failed:\n{traceback.format_exc(limit=-3)}", "Synthesis: Error")
+            self._finish(None)
+            return
+
+        deferToMainThread(lambda: self._step(calculation, generation))
+
+    def _finish(self, totalMass: float | None) -> None:
+        self.running = False
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(totalMass)
+
+    def _calculate(self) -> Generator[None, None, float]:
+        """Measures the design, yielding whenever the UI should get a chance to run
+
+        Returns:
+            float: total mass of the visible bodies of the root component and every visible occurrence in kg
+        """
+        design = gm.app.activeDocument.design
+        if not design:
+            return 0.0
+
+        rootComponent = design.rootComponent
+        components = {guid_component(rootComponent): rootComponent}
+        counts = {guid_component(rootComponent): 1}
+        for occurrence in rootComponent.allOccurrences:
+            if not occurrence.isLightBulbOn:
+                continue
+
+            guid = guid_component(occurrence.component)
+            components.setdefault(guid, occurrence.component)
+            counts[guid] = counts.get(guid, 0) + 1
+
+        bodyMasses: dict[tuple[str, str], float] = {}
+        totalMass = 0.0
+        measured = checked = 0
+        for guid, component in components.items():
+            componentMass = 0.0
+            for body in component.bRepBodies:
+                if not body.isLightBulbOn:
+                    continue
+
+                key = (body.entityToken, body.revisionId)
+                mass = self.bodyMasses.get(key)
+                if mass is None:
+                    physical = body.getPhysicalProperties(adsk.fusion.CalculationAccuracy.LowCalculationAccuracy)
+                    mass = physical.mass
+                    measured += 1
+
+                bodyMasses[key] = mass
+                componentMass += mass
+
+            totalMass += componentMass * counts[guid]
+            checked += 1
+            if measured >= BODIES_PER_STEP or checked >= COMPONENTS_PER_STEP:
+                # Keep what was measured so far in case this calculation is canceled
+                self.bodyMasses.update(bodyMasses)
+                measured = checked = 0
+                yield
+
+        # Drop bodies which were deleted or changed since
+        self.bodyMasses = bodyMasses
+        return totalMass
+
+
+massService = MassService()
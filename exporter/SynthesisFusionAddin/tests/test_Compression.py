@@ -0,0 +1,87 @@
+"""Checks that the block compressor writes streams the standard library can read.
+
+Usage: python -m unittest discover tests
+"""
+
+import gzip
+import io
+import os
+import random
+import sys
+import unittest
+import zlib
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.Parser.SynthesisParser.Compression import BLOCK_SIZE, BlockDeflateWriter  # isort:skip
+from src.Types import CompressionCodec  # isort:skip
+
+LEVELS = (0, 1, 9)
+
+
+def buildPayload(size: int) -> bytes:
+    """Repeated records with random fields, so blocks have matches reaching back into the block before them"""
+    generator = random.Random(size)
+    records = bytearray()
+    while len(records) < size:
+        records += b"part_definition %d: " % generator.randrange(64) + generator.randbytes(generator.randrange(48))
+
+    return bytes(records[:size])
+
+
+def stdlibDecompress(data: bytes, codec: CompressionCodec) -> bytes:
+    if codec == CompressionCodec.GZIP:
+        return gzip.decompress(data)
+
+    if codec == CompressionCodec.ZLIB:
+        return zlib.decompress(data)
+
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+    data = inflater.decompress(data) + inflater.flush()
+    assert inflater.eof, "the raw deflate stream isn't finished"
+    return data
+
+
+class BlockDeflateWriterTest(unittest.TestCase):
+    def roundTrip(self, payload: bytes, codec: CompressionCodec, level: int, threads: int) -> None:
+        out = io.BytesIO()
+        with BlockDeflateWriter(out, codec, level, threads) as writer:
+            # Uneven writes so blocks are cut in the middle of them
+            for start in range(0, len(payload), 100_003):
+                writer.write(payload[start : start + 100_003])
+
+        self.assertEqual(stdlibDecompress(out.getvalue(), codec), payload)
+
+    def test_every_codec_and_level(self) -> None:
+        payload = buildPayload(BLOCK_SIZE // 4)
+        for codec in (CompressionCodec.GZIP, CompressionCodec.ZLIB, CompressionCodec.DEFLATE):
+            for level in LEVELS:
+                with self.subTest(codec=codec.name, level=level):
+                    self.roundTrip(payload, codec, level, threads=1)
+
+    def test_multiple_blocks(self) -> None:
+        payload = buildPayload(BLOCK_SIZE * 3 + 12_345)
+        for codec in (CompressionCodec.GZIP, CompressionCodec.ZLIB, CompressionCodec.DEFLATE):
+            for level in LEVELS:
+                with self.subTest(codec=codec.name, level=level):
+                    self.roundTrip(payload, codec, level, threads=4)
+
+    def test_blocks_reach_back_into_the_previous_block(self) -> None:
+        payload = buildPayload(BLOCK_SIZE * 2)
+        out = io.BytesIO()
+        with BlockDeflateWriter(out, CompressionCodec.DEFLATE, 9, threads=4) as writer:
+            writer.write(payload)
+
+        single = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        singleSize = len(single.compress(payload) + single.flush())
+        self.assertLess(len(out.getvalue()), singleSize * 1.01)
+
+    def test_empty_payload(self) -> None:
+        for codec in (CompressionCodec.GZIP, CompressionCodec.ZLIB, CompressionCodec.DEFLATE):
+            with self.subTest(codec=codec.name):
+                self.roundTrip(b"", codec, 9, threads=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
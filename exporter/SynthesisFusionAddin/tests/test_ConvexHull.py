@@ -0,0 +1,87 @@
+"""Checks the collision hulls computed by `convexHull`.
+
+Usage: python -m unittest discover tests
+"""
+
+import math
+import os
+import random
+import sys
+import unittest
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.Parser.SynthesisParser.ConvexHull import convexHull  # isort:skip
+
+EPSILON = 1e-5
+
+
+def flatten(points: list[tuple[float, float, float]]) -> list[float]:
+    return [x for point in points for x in point]
+
+
+def sphere(count: int) -> list[tuple[float, float, float]]:
+    """Evenly spread points on the unit sphere"""
+    points = []
+    for i in range(count):
+        z = 1.0 - 2.0 * (i + 0.5) / count
+        radius = math.sqrt(1.0 - z * z)
+        angle = i * math.pi * (3.0 - math.sqrt(5.0))
+        points.append((radius * math.cos(angle), radius * math.sin(angle), z))
+
+    return points
+
+
+class ConvexHullTest(unittest.TestCase):
+    def assertConvex(self, verts, indices, inputPoints: list[tuple[float, float, float]] | None = None) -> None:
+        """Every face faces away from the center and has every point of the hull behind it"""
+        points = list(zip(verts[0::3], verts[1::3], verts[2::3]))
+        center = [sum(point[axis] for point in points) / len(points) for axis in range(3)]
+        for i in range(0, len(indices), 3):
+            a, b, c = (points[index] for index in indices[i : i + 3])
+            u = [b[axis] - a[axis] for axis in range(3)]
+            v = [c[axis] - a[axis] for axis in range(3)]
+            normal = (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+            offset = sum(normal[axis] * a[axis] for axis in range(3))
+
+            self.assertGreater(offset - sum(normal[axis] * center[axis] for axis in range(3)), 0.0)
+            for point in inputPoints or points:
+                self.assertLessEqual(sum(normal[axis] * point[axis] for axis in range(3)) - offset, EPSILON)
+
+    def test_cube_with_interior_points(self) -> None:
+        generator = random.Random(1)
+        corners = [(x, y, z) for x in (0.0, 2.0) for y in (0.0, 2.0) for z in (0.0, 2.0)]
+        interior = [tuple(generator.uniform(0.1, 1.9) for _ in range(3)) for _ in range(200)]
+        points = interior[:100] + corners + interior[100:]
+
+        verts, indices = convexHull(flatten(points))
+
+        self.assertEqual(sorted(zip(verts[0::3], verts[1::3], verts[2::3])), sorted(corners))
+        self.assertEqual(len(indices), 12 * 3)
+        self.assertConvex(verts, indices, points)
+
+    def test_coplanar_points_have_no_hull(self) -> None:
+        generator = random.Random(2)
+        points = [(generator.uniform(-1.0, 1.0), generator.uniform(-1.0, 1.0), 0.5) for _ in range(50)]
+        self.assertIsNone(convexHull(flatten(points)))
+
+        # Collinear and too few points neither
+        self.assertIsNone(convexHull(flatten([(i, 2.0 * i, 3.0 * i) for i in range(10)])))
+        self.assertIsNone(convexHull(flatten([(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)])))
+
+    def test_respects_max_vertices(self) -> None:
+        points = sphere(500)
+
+        verts, indices = convexHull(flatten(points))
+        self.assertLessEqual(len(verts) // 3, 128)
+        self.assertConvex(verts, indices)
+
+        verts, indices = convexHull(flatten(points), maxVertices=32)
+        self.assertLessEqual(len(verts) // 3, 32)
+        self.assertGreaterEqual(len(verts) // 3, 4)
+        self.assertConvex(verts, indices)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Checks that a `Snapshot` replayed through `HeadlessExport` runs the export stages of the add-in.
+
+Requires the generated protobuf files in `proto/proto_out`.
+
+Usage: python -m unittest discover tests
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from array import array
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+sys.path.insert(1, os.path.join(ROOT_EXPORTER_DIR, "proto", "proto_out"))
+
+from src.Parser.SynthesisParser import SnapshotAdsk  # isort:skip
+
+SnapshotAdsk.install()
+
+from proto.proto_out import assembly_pb2, joint_pb2  # isort:skip
+from src.Parser.ExporterOptions import ExporterOptions  # isort:skip
+from src.Parser.SynthesisParser.HeadlessExport import HeadlessExport  # isort:skip
+from src.Parser.SynthesisParser.Snapshot import (  # isort:skip
+    Snapshot,
+    SnapshotBody,
+    SnapshotComponent,
+    SnapshotJoint,
+    SnapshotMaterial,
+    SnapshotOccurrence,
+    SnapshotPhysicalProperties,
+    SnapshotProperty,
+    readSnapshot,
+    writeSnapshot,
+)
+from src.Parser.SynthesisParser.SnapshotRecorder import MATERIAL_PROPERTIES  # isort:skip
+from src.Types import Joint, JointParentType, SignalType, encodeNestedObjects  # isort:skip
+
+
+def translation(x: float, y: float, z: float) -> list[float]:
+    return [1.0, 0.0, 0.0, x, 0.0, 1.0, 0.0, y, 0.0, 0.0, 1.0, z, 0.0, 0.0, 0.0, 1.0]
+
+
+def buildSnapshot() -> Snapshot:
+    """Arm occurrence with a nested wrist, connected by a revolute joint around z"""
+    options = ExporterOptions(joints=[Joint("wrist", JointParentType.ROOT, SignalType.PWM, 1.0, 1.0)], wheels=[])
+    snapshot = Snapshot("Robot", "root_0", encodeNestedObjects(options))
+    snapshot.components["root_0"] = SnapshotComponent("root", "0", "Root")
+
+    triangle = SnapshotBody(
+        "body",
+        "Body",
+        True,
+        "red",
+        array("f", [0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0]),
+        array("f"),
+        array("i", [0, 1, 2]),
+        array("f"),
+    )
+    physical = SnapshotPhysicalProperties(2.7, 1.5, 0.5, 3.0, [0.0, 0.0, 0.0])
+    snapshot.components["arm_1"] = SnapshotComponent("arm", "1", "Arm", "aluminum", [triangle], physical)
+
+    snapshot.occurrences["arm"] = SnapshotOccurrence("arm", "arm_1", "Arm:1", True, True, translation(1, 2, 3))
+    snapshot.occurrences["wrist"] = SnapshotOccurrence("wrist", "arm_1", "Arm:2", True, False, translation(1, 2, 3))
+    snapshot.occurrences["arm"].children.append("wrist")
+    snapshot.rootOccurrences.append("arm")
+
+    snapshot.appearances["red"] = SnapshotMaterial(
+        "red",
+        "Red",
+        [SnapshotProperty("interior_model", "Model", 0), SnapshotProperty("opaque_albedo", "Color", [255, 0, 0, 255])],
+    )
+    snapshot.materials["aluminum"] = SnapshotMaterial(
+        "aluminum", "Aluminum", [SnapshotProperty(id, id, 1.0) for id in MATERIAL_PROPERTIES]
+    )
+
+    motion = {
+        "rotationValue": 0.5,
+        "rotationLimits": {"minimumValue": 0.0, "maximumValue": 1.0},
+        "rotationAxisVector": {"x": 0.0, "y": 0.0, "z": 1.0},
+        "rotationAxis": 2,
+    }
+    snapshot.joints.append(SnapshotJoint("wrist", "Wrist", False, False, "arm", "wrist", 1, [1.0, 2.0, 3.0], motion))
+    return snapshot
+
+
+class HeadlessExportTest(unittest.TestCase):
+    def export(self, snapshot: Snapshot) -> tuple[assembly_pb2.Assembly, bytes]:
+        out = io.BytesIO()
+        assembly = HeadlessExport(snapshot).export(out)
+        return assembly, out.getvalue()
+
+    def test_exports_the_snapshot(self) -> None:
+        assembly, data = self.export(buildSnapshot())
+        written = assembly_pb2.Assembly()
+        written.ParseFromString(data)
+
+        self.assertEqual(written.info.GUID, "Robot")
+        self.assertIn("arm_1", written.data.parts.part_definitions)
+
+        wrist = written.data.parts.part_instances["wrist_arm_1"]
+        self.assertEqual(list(wrist.global_transform.spatial_matrix), translation(2, 4, 6))
+
+        body = written.data.parts.part_definitions["arm_1"].bodies[0]
+        red = assembly.data.materials.appearances[body.appearance_override]
+        self.assertEqual((red.albedo.R, red.albedo.G, red.albedo.B), (255, 0, 0))
+        self.assertIn(wrist.physical_material, assembly.data.materials.physicalMaterials)
+
+        joint = assembly.data.joints.joint_definitions["wrist"]
+        self.assertEqual(joint.joint_motion_type, joint_pb2.JointMotion.REVOLUTE)
+        self.assertEqual((joint.origin.x, joint.origin.y, joint.origin.z), (1.0, 2.0, 3.0))
+        self.assertEqual(joint.rotational.rotational_freedom.axis.z, 1.0)
+        self.assertEqual(joint.rotational.rotational_freedom.limits.upper, 1.0)
+
+    def test_snapshot_round_trip(self) -> None:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "snapshot.zip")
+            writeSnapshot(buildSnapshot(), path)
+            snapshot = readSnapshot(path)
+
+        self.assertEqual(snapshot, buildSnapshot())
+        # Materials and the grounded joint get a new GUID every export, so only the parts and wrist are compared
+        replayed, recorded = self.export(snapshot)[0], self.export(buildSnapshot())[0]
+        self.assertEqual(replayed.data.parts.part_instances, recorded.data.parts.part_instances)
+        self.assertEqual(
+            replayed.data.joints.joint_definitions["wrist"], recorded.data.joints.joint_definitions["wrist"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+"""Checks the axes found by `JointGraph` and the clusters written by `RigidGroup`.
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+from dataclasses import dataclass, field
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+sys.path.insert(1, os.path.join(ROOT_EXPORTER_DIR, "proto", "proto_out"))
+
+from src.Parser.SynthesisParser import SnapshotAdsk  # isort:skip
+
+SnapshotAdsk.install()
+
+from proto.proto_out import joint_pb2  # isort:skip
+from src.Parser.SynthesisParser import RigidGroup  # isort:skip
+from src.Parser.SynthesisParser.AssemblyIndex import AssemblyIndex  # isort:skip
+from src.Parser.SynthesisParser.JointGraph import GROUND, JointGraph  # isort:skip
+from src.Parser.SynthesisParser.JointGraph import OccurrenceRelationship as Relationship  # isort:skip
+from src.Parser.SynthesisParser.Snapshot import (  # isort:skip
+    Snapshot,
+    SnapshotComponent,
+    SnapshotJoint,
+    SnapshotOccurrence,
+)
+
+RIGID = 0
+REVOLUTE = 1
+IDENTITY = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+
+
+@dataclass
+class Occurrence:
+    isGrounded: bool = False
+    children: list[str] = field(default_factory=list)
+
+
+@dataclass
+class Joint:
+    jointType: int
+    occurrenceOne: str | None
+    occurrenceTwo: str | None
+
+
+def tree(graph: JointGraph, key: str) -> set[tuple[str, Relationship | None]]:
+    return {(token, relationship) for _, token, relationship in graph.trees[key]}
+
+
+class JointGraphTest(unittest.TestCase):
+    def test_rigid_cluster_moves_with_the_ground(self) -> None:
+        occurrences = {
+            "base": Occurrence(True, ["frame"]),
+            "frame": Occurrence(),
+            "bracket": Occurrence(),
+            "arm": Occurrence(),
+        }
+        joints = [Joint(RIGID, "frame", "bracket"), Joint(REVOLUTE, "arm", "bracket")]
+        graph = JointGraph(occurrences, joints, "base")
+
+        self.assertEqual(
+            tree(graph, GROUND),
+            {
+                ("base", None),
+                ("frame", Relationship.TRANSFORM),
+                ("bracket", Relationship.CONNECTION),
+                ("arm", Relationship.NEXT),
+            },
+        )
+        self.assertEqual(tree(graph, "arm"), {("arm", None)})
+        self.assertEqual(graph.links, [(GROUND, "arm")])
+
+    def test_nested_axes_are_linked_to_their_parent_axis(self) -> None:
+        occurrences = {
+            "base": Occurrence(True),
+            "arm": Occurrence(children=["hand"]),
+            "hand": Occurrence(),
+            "wrist": Occurrence(children=["finger"]),
+            "finger": Occurrence(),
+        }
+        joints = [Joint(REVOLUTE, "arm", "base"), Joint(REVOLUTE, "wrist", "hand")]
+        graph = JointGraph(occurrences, joints, "base")
+
+        self.assertEqual(
+            tree(graph, "arm"), {("arm", None), ("hand", Relationship.TRANSFORM), ("wrist", Relationship.NEXT)}
+        )
+        self.assertEqual(tree(graph, "wrist"), {("wrist", None), ("finger", Relationship.TRANSFORM)})
+        self.assertEqual(graph.links, [(GROUND, "arm"), ("arm", "wrist")])
+
+        # Parents always come before their children
+        for entries in graph.trees.values():
+            for position, (parent, _, _) in enumerate(entries):
+                self.assertLess(parent, position)
+
+    def test_axis_rooted_at_a_grounded_occurrence_is_not_an_axis(self) -> None:
+        occurrences = {"base": Occurrence(True, ["frame"]), "frame": Occurrence()}
+        graph = JointGraph(occurrences, [Joint(REVOLUTE, "base", "frame")], "base")
+
+        self.assertNotIn("base", graph.trees)
+        self.assertEqual(graph.links, [])
+        self.assertIn(("frame", Relationship.TRANSFORM), tree(graph, GROUND))
+
+    def test_grounded_occurrences_stop_an_axis(self) -> None:
+        occurrences = {"base": Occurrence(True), "arm": Occurrence(children=["base"])}
+        graph = JointGraph(occurrences, [Joint(REVOLUTE, "arm", "base")], "base")
+
+        self.assertEqual(tree(graph, "arm"), {("arm", None)})
+
+    def test_cycles_are_visited_once(self) -> None:
+        occurrences = {token: Occurrence(token == "base") for token in ["base", "a", "b", "x", "y", "z"]}
+        joints = [
+            Joint(REVOLUTE, "a", "base"),
+            Joint(REVOLUTE, "b", "a"),
+            Joint(REVOLUTE, "a", "b"),
+            Joint(RIGID, "b", "x"),
+            Joint(RIGID, "x", "y"),
+            Joint(RIGID, "y", "z"),
+            Joint(RIGID, "z", "x"),
+        ]
+        graph = JointGraph(occurrences, joints, "base")
+
+        self.assertEqual(graph.links, [(GROUND, "a"), ("a", "b")])
+        tokens = [token for _, token, _ in graph.trees["b"]]
+        self.assertEqual(sorted(tokens), ["a", "b", "x", "y", "z"])
+        self.assertEqual(
+            tree(graph, "b") - {("a", Relationship.NEXT), ("b", None)},
+            {
+                ("x", Relationship.CONNECTION),
+                ("y", Relationship.CONNECTION),
+                ("z", Relationship.CONNECTION),
+            },
+        )
+
+
+def buildSnapshot(hidden: set[str]) -> Snapshot:
+    """Occurrences a to f of one component, without any joints or rigid groups"""
+    snapshot = Snapshot("Robot", "root_0")
+    snapshot.components["root_0"] = SnapshotComponent("root", "0", "Root")
+    snapshot.components["part_1"] = SnapshotComponent("part", "1", "Part")
+    for token in "abcdef":
+        snapshot.occurrences[token] = SnapshotOccurrence(token, "part_1", token, token not in hidden, False, IDENTITY)
+        snapshot.rootOccurrences.append(token)
+
+    return snapshot
+
+
+def exportGroups(snapshot: Snapshot) -> list[list[str]]:
+    design = SnapshotAdsk.buildDesign(snapshot)
+    joints = joint_pb2.Joints()
+    RigidGroup.ExportRigidGroups(joints, AssemblyIndex(design))
+    return sorted(sorted(group.occurrences) for group in joints.rigid_groups)
+
+
+def rigidJoint(one: str, two: str, isAsBuilt: bool = False, isSuppressed: bool = False) -> SnapshotJoint:
+    return SnapshotJoint(f"{one}{two}", f"{one}{two}", isAsBuilt, isSuppressed, one, two, RIGID)
+
+
+class RigidGroupTest(unittest.TestCase):
+    def test_one_group_per_cluster(self) -> None:
+        snapshot = buildSnapshot(set())
+        snapshot.rigidGroups = [["a", "b"], ["b", "c"]]
+        snapshot.joints = [
+            rigidJoint("c", "a"),
+            rigidJoint("d", "e", isAsBuilt=True),
+            rigidJoint("e", "f", isSuppressed=True),
+            SnapshotJoint("af", "af", False, False, "a", "f", REVOLUTE),
+        ]
+
+        self.assertEqual(exportGroups(snapshot), [["a_part_1", "b_part_1", "c_part_1"], ["d_part_1", "e_part_1"]])
+
+    def test_hidden_occurrences_are_excluded(self) -> None:
+        snapshot = buildSnapshot({"b", "e"})
+        snapshot.rigidGroups = [["a", "b", "c"], ["d", "e"]]
+        snapshot.joints = [rigidJoint("e", "f")]
+
+        self.assertEqual(exportGroups(snapshot), [["a_part_1", "c_part_1"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Checks that `MaterialCache` reuses materials of a saved design and converts edited ones again.
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+sys.path.insert(1, os.path.join(ROOT_EXPORTER_DIR, "proto", "proto_out"))
+
+from src.Parser.SynthesisParser import SnapshotAdsk  # isort:skip
+
+SnapshotAdsk.install()
+
+from proto.proto_out import material_pb2  # isort:skip
+from src.Parser.ExporterOptions import ExporterOptions  # isort:skip
+from src.Parser.SynthesisParser import Materials  # isort:skip
+from src.Parser.SynthesisParser.MaterialCache import openMaterialCache  # isort:skip
+from src.Parser.SynthesisParser.PDMessage import PDMessage  # isort:skip
+from src.Parser.SynthesisParser.Snapshot import SnapshotMaterial, SnapshotProperty  # isort:skip
+from src.Parser.SynthesisParser.SnapshotRecorder import MATERIAL_PROPERTIES  # isort:skip
+
+# Edited in the design, the copy keeps the id and name of the library material
+MATERIAL_ID = "PrismMaterial-002"
+MATERIAL_NAME = "Aluminum"
+
+
+def buildMaterial(density: float) -> SnapshotAdsk.Material:
+    properties = [
+        SnapshotProperty(id, id, density if id == "structural_Density" else 1.0) for id in MATERIAL_PROPERTIES
+    ]
+    return SnapshotAdsk.Material(SnapshotMaterial(MATERIAL_ID, MATERIAL_NAME, properties))
+
+
+def buildDocument(versionId: str, isModified: bool = False) -> SnapshotAdsk.Values:
+    return SnapshotAdsk.Values(isSaved=True, isModified=isModified, dataFile=SnapshotAdsk.Values(versionId=versionId))
+
+
+class MaterialCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.options = ExporterOptions()
+
+    def export(self, document: SnapshotAdsk.Values, material: SnapshotAdsk.Material) -> tuple[float, int]:
+        """Exports a single material the way the parser does
+
+        Returns:
+            tuple[float, int]: exported density and the number of entries served from the cache
+        """
+        cache = openMaterialCache(document, self.directory.name)
+        materials = material_pb2.Materials()
+        progress = PDMessage("Robot", 0, 0, 0, 1, SnapshotAdsk.ProgressDialog())
+        Materials._MapAllPhysicalMaterials([material], materials, self.options, progress, cache)
+        if cache is None:
+            return materials.physicalMaterials[MATERIAL_ID].mechanical.density, 0
+
+        cache.flush()
+        return materials.physicalMaterials[MATERIAL_ID].mechanical.density, cache.hits
+
+    def test_saved_version_is_served_from_the_cache(self) -> None:
+        self.assertEqual(self.export(buildDocument("v1"), buildMaterial(2.5)), (2.5, 0))
+
+        # The values aren't read again, so a stale value would be exported if the key missed an edit
+        self.assertEqual(self.export(buildDocument("v1"), buildMaterial(1.0)), (2.5, 1))
+
+    def test_edited_design_copy_is_not_served_from_the_cache(self) -> None:
+        self.export(buildDocument("v1"), buildMaterial(2.5))
+
+        # Edited but not saved yet
+        self.assertEqual(self.export(buildDocument("v1", isModified=True), buildMaterial(3.25)), (3.25, 0))
+
+        # Saved as a new version
+        self.assertEqual(self.export(buildDocument("v2"), buildMaterial(3.25)), (3.25, 0))
+
+        # The original version still has its own entry
+        self.assertEqual(self.export(buildDocument("v1"), buildMaterial(2.5)), (2.5, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Checks that meshes encoded by `encodeBinaryMesh` decode back to the original within the quantization error.
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.Parser.SynthesisParser.MeshEncoding import (  # isort:skip
+    QUANTIZED_MAX,
+    decodeBinaryMesh,
+    encodeBinaryMesh,
+)
+
+# Flat square at z = 0.5, the quad indices run backwards and the last triangle jumps far back
+VERTS = [0.0, 0.0, 0.5, 2.0, 0.0, 0.5, 2.0, 1.0, 0.5, 0.0, 1.0, 0.5, 1.0, 0.5, 0.5]
+NORMALS = [0.0, 0.0, 1.0, 0.0, 0.0, 1.0, 0.6, 0.0, 0.8, 0.0, -0.6, -0.8, -0.36, 0.48, -0.8]
+UV = [0.0, 0.0, 1.0, 0.0, 1.0, 1.0, 0.0, 1.0, 0.5, 0.5]
+INDICES = [4, 3, 2, 4, 1, 0, 0, 2, 1, 3, 0, 4]
+
+
+class MeshEncodingTest(unittest.TestCase):
+    def assertClose(self, actual, expected, tolerance: float) -> None:
+        self.assertEqual(len(actual), len(expected))
+        for a, e in zip(actual, expected):
+            self.assertAlmostEqual(a, e, delta=tolerance)
+
+    def test_round_trip(self) -> None:
+        verts, normals, indices, uv = decodeBinaryMesh(encodeBinaryMesh(VERTS, NORMALS, INDICES, UV))
+
+        self.assertClose(verts, VERTS, 2.0 / QUANTIZED_MAX)
+        self.assertEqual(verts[2::3].tolist(), [0.5] * 5)
+        self.assertClose(normals, NORMALS, 1e-3)
+        self.assertClose(uv, UV, 1.0 / QUANTIZED_MAX)
+        self.assertEqual(indices.tolist(), INDICES)
+
+    def test_without_normals_and_uv(self) -> None:
+        # Normals and uvs that don't have one value per vertex are left out
+        verts, normals, indices, uv = decodeBinaryMesh(encodeBinaryMesh(VERTS, NORMALS[:6], INDICES, []))
+
+        self.assertClose(verts, VERTS, 2.0 / QUANTIZED_MAX)
+        self.assertEqual(len(normals), 0)
+        self.assertEqual(len(uv), 0)
+        self.assertEqual(indices.tolist(), INDICES)
+
+    def test_large_index_deltas(self) -> None:
+        # Deltas that take several varint bytes, in both directions
+        indices = [0, 70000, 1, 300, 299, 0, 2**31 - 1, 0, 5]
+
+        self.assertEqual(decodeBinaryMesh(encodeBinaryMesh(VERTS, [], indices, []))[2].tolist(), indices)
+
+
+if __name__ == "__main__":
+    unittest.main()
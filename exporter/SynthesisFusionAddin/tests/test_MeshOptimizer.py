@@ -0,0 +1,128 @@
+"""Checks the welding and reordering of tessellated meshes by `optimizeMesh`.
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.Parser.SynthesisParser.MeshOptimizer import optimizeMesh  # isort:skip
+
+UP = (0.0, 0.0, 1.0)
+SIDE = (0.0, -1.0, 0.0)
+
+
+class Mesh:
+    """Builds a mesh face by face, the way Fusion tessellates it with separate vertices for every face"""
+
+    def __init__(self) -> None:
+        self.verts: list[float] = []
+        self.normals: list[float] = []
+        self.indices: list[int] = []
+
+    def addFace(self, corners: list[tuple[float, float, float]], normal: tuple[float, float, float]) -> None:
+        """Adds a quad as two triangles"""
+        first = len(self.verts) // 3
+        for corner in corners:
+            self.verts.extend(corner)
+            self.normals.extend(normal)
+
+        self.indices.extend((first, first + 1, first + 2, first, first + 2, first + 3))
+
+    def addTriangle(self, corners: list[tuple[float, float, float]], normal: tuple[float, float, float]) -> None:
+        first = len(self.verts) // 3
+        for corner in corners:
+            self.verts.extend(corner)
+            self.normals.extend(normal)
+
+        self.indices.extend((first, first + 1, first + 2))
+
+    def optimize(self) -> tuple:
+        return optimizeMesh(self.verts, self.normals, self.indices, [])
+
+
+def triangles(verts, normals, indices) -> list[tuple]:
+    """Gets every triangle as the positions and normals of its corners, rotated to start at the lowest corner so
+    the winding is kept but the starting corner doesn't matter"""
+    corners = [
+        (tuple(round(x, 5) for x in verts[i * 3 : i * 3 + 3]), tuple(round(x, 5) for x in normals[i * 3 : i * 3 + 3]))
+        for i in indices
+    ]
+
+    result = []
+    for i in range(0, len(corners), 3):
+        triangle = corners[i : i + 3]
+        start = triangle.index(min(triangle))
+        result.append(tuple(triangle[start:] + triangle[:start]))
+
+    return sorted(result)
+
+
+class MeshOptimizerTest(unittest.TestCase):
+    def test_seam_duplicates_are_welded(self) -> None:
+        mesh = Mesh()
+        mesh.addFace([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], UP)
+        mesh.addFace([(1, 0, 0), (2, 0, 0), (2, 1, 0), (1, 1, 0)], UP)
+
+        verts, normals, indices, uv, stats = mesh.optimize()
+
+        self.assertEqual((stats.verticesBefore, stats.verticesAfter), (8, 6))
+        self.assertEqual(len(verts), 6 * 3)
+        self.assertEqual(len(normals), 6 * 3)
+        self.assertEqual(len(uv), 0)
+        self.assertEqual(sorted(set(indices)), list(range(6)))
+
+    def test_hard_edges_stay_split(self) -> None:
+        mesh = Mesh()
+        mesh.addFace([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], UP)
+        mesh.addFace([(0, 0, -1), (1, 0, -1), (1, 0, 0), (0, 0, 0)], SIDE)
+
+        verts, normals, indices, _, stats = mesh.optimize()
+
+        # The shared edge has a different normal on each side
+        self.assertEqual(stats.verticesAfter, 8)
+        edge = [i for i in range(len(verts) // 3) if verts[i * 3 + 1] == 0.0 and verts[i * 3 + 2] == 0.0]
+        self.assertEqual(sorted(tuple(normals[i * 3 : i * 3 + 3]) for i in edge), [SIDE, SIDE, UP, UP])
+
+    def test_degenerate_triangles_are_dropped(self) -> None:
+        mesh = Mesh()
+        mesh.addFace([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], UP)
+
+        # Collapsed onto the seam once welded, and without any area
+        mesh.addTriangle([(1, 0, 0), (1, 1, 0), (1, 0, 0)], UP)
+        mesh.addTriangle([(0, 0, 0), (0.5, 0.5, 0), (1, 1, 0)], UP)
+
+        verts, normals, indices, _, stats = mesh.optimize()
+
+        self.assertEqual((stats.indicesBefore, stats.indicesAfter), (12, 6))
+        self.assertEqual(
+            triangles(verts, normals, indices),
+            triangles(mesh.verts, mesh.normals, mesh.indices[:6]),
+        )
+
+    def test_output_is_a_permutation_of_the_kept_triangles(self) -> None:
+        mesh = Mesh()
+
+        # A grid of faces, each with its own copy of the shared corners
+        for x in range(8):
+            for y in range(8):
+                mesh.addFace([(x, y, 0), (x + 1, y, 0), (x + 1, y + 1, 0), (x, y + 1, 0)], UP)
+
+        verts, normals, indices, _, stats = mesh.optimize()
+
+        self.assertEqual(stats.verticesAfter, 9 * 9)
+        self.assertEqual(triangles(verts, normals, indices), triangles(mesh.verts, mesh.normals, mesh.indices))
+
+        # Vertices are numbered in the order the triangles first use them
+        seen = -1
+        for index in indices:
+            self.assertLessEqual(index, seen + 1)
+            seen = max(seen, index)
+
+
+if __name__ == "__main__":
+    unittest.main()
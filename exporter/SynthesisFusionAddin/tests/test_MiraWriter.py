@@ -0,0 +1,98 @@
+"""Checks that `MiraWriter` output parses to the same assembly as `Assembly.SerializeToString()`.
+
+Requires the generated protobuf files in `proto/proto_out`.
+
+Usage: python -m unittest discover tests
+"""
+
+import io
+import os
+import sys
+import unittest
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+sys.path.insert(1, os.path.join(ROOT_EXPORTER_DIR, "proto", "proto_out"))
+
+from proto.proto_out import assembly_pb2  # isort:skip
+from src.Parser.SynthesisParser.MiraWriter import MiraWriter  # isort:skip
+
+
+def buildAssembly(definitionCount: int) -> assembly_pb2.Assembly:
+    """Assembly with every kind of field set, strings, floats, doubles, negative ints, repeated fields and maps"""
+    assembly = assembly_pb2.Assembly()
+    assembly.info.GUID = "assembly"
+    assembly.info.name = "Test Assembly"
+    assembly.info.version = 5
+    assembly.dynamic = True
+    assembly.physical_data.mass = 12.5
+    assembly.physical_data.com.x = -0.25
+    assembly.transform.spatial_matrix.extend([1.0, 0.0, 0.0, -4.5] * 4)
+    assembly.thumbnail.width = -1
+    assembly.thumbnail.extension = "png"
+    assembly.thumbnail.data = bytes(range(256))
+    assembly.design_hierarchy.nodes.add(value="root").children.add(value="child")
+
+    data = assembly.data
+    data.parts.info.name = "parts"
+    data.parts.user_data.data["key"] = "value"
+    data.materials.appearances["default"].info.name = "default"
+    data.joints.info.name = "joints"
+
+    for i in range(definitionCount):
+        definition = data.parts.part_definitions[f"definition{i}"]
+        definition.info.GUID = f"definition{i}"
+        definition.physical_data.density = 2.7
+        definition.friction_override = -0.5
+        body = definition.bodies.add()
+        body.part = f"definition{i}"
+        body.triangle_mesh.mesh.verts.extend([float(i), 1.0, -2.0])
+        body.triangle_mesh.mesh.indices.extend([0, 1, 2])
+
+        instance = data.parts.part_instances[f"instance{i}"]
+        instance.part_definition_reference = f"definition{i}"
+        instance.joints.extend(["a", "b"])
+
+    return assembly
+
+
+def writeAssembly(assembly: assembly_pb2.Assembly, spooled: list[str]) -> bytes:
+    out = io.BytesIO()
+    with MiraWriter() as writer:
+        for key in spooled:
+            writer.addPartDefinition(key, assembly.data.parts.part_definitions[key])
+
+        writer.write(assembly, out)
+
+    return out.getvalue()
+
+
+class MiraWriterTest(unittest.TestCase):
+    def testMatchesSerializeToString(self):
+        expected = assembly_pb2.Assembly()
+        expected.ParseFromString(buildAssembly(4).SerializeToString())
+
+        written = assembly_pb2.Assembly()
+        written.ParseFromString(writeAssembly(buildAssembly(4), ["definition0", "definition2"]))
+
+        self.assertEqual(written, expected)
+
+    def testWithoutSpooledDefinitions(self):
+        expected = buildAssembly(2)
+
+        written = assembly_pb2.Assembly()
+        written.ParseFromString(writeAssembly(buildAssembly(2), []))
+
+        self.assertEqual(written, expected)
+
+    def testLeavesAssemblyWithoutSpooledDefinitions(self):
+        assembly = buildAssembly(3)
+        writeAssembly(assembly, ["definition1"])
+
+        expected = buildAssembly(3)
+        del expected.data.parts.part_definitions["definition1"]
+        self.assertEqual(assembly, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Checks that an interrupted `MultipartUpload` is resumed by the next upload with the same resume key.
+
+Requires `requests`. The APS endpoints are replaced by an in memory session, see `tools/apsUploadStandIn.py` for a
+check against a local server.
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import unittest
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.APS import MultipartUpload  # isort:skip
+
+PART_SIZE = 1024
+PART_COUNT = 12
+OBJECT_ID = "urn:adsk.objects:os.object:bucket/robot.mira"
+
+
+class Response:
+    def __init__(self, status: int, body: dict | None = None):
+        self.status_code = status
+        self.ok = status < 400
+        self.body = body or {}
+        self.text = str(self.body)
+
+    def json(self) -> dict:
+        return self.body
+
+
+class Session:
+    """Serves `signeds3upload` and the signed part urls, failing every part once `offlineAfter` parts were sent"""
+
+    def __init__(self):
+        self.parts: dict[int, bytes] = {}
+        self.objects: dict[str, bytes] = {}
+        self.partUploads = 0
+        self.offlineAfter: int | None = None
+        self.lock = threading.Lock()
+
+    def get(self, url: str, params: dict, **_: any) -> Response:
+        first = params["firstPart"]
+        urls = [f"part/{part}" for part in range(first, first + params["parts"])]
+        return Response(200, {"uploadKey": "upload", "urls": urls, "uploadExpiration": "2100-01-01T00:00:00Z"})
+
+    def put(self, url: str, data: bytes, **_: any) -> Response:
+        with self.lock:
+            if self.offlineAfter is not None and self.partUploads >= self.offlineAfter:
+                return Response(503)
+
+            self.parts[int(url.split("/")[1])] = data
+            self.partUploads += 1
+
+        return Response(200)
+
+    def post(self, url: str, json: dict, **_: any) -> Response:
+        if sorted(self.parts) != list(range(1, PART_COUNT + 1)):
+            return Response(400, {"reason": "Missing parts"})
+
+        self.objects[OBJECT_ID] = b"".join(self.parts[part] for part in sorted(self.parts))
+        return Response(200)
+
+
+class MultipartUploadTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.retryDelay, MultipartUpload.RETRY_DELAY = MultipartUpload.RETRY_DELAY, 0.0
+        self.stateDirectory = tempfile.TemporaryDirectory()
+        self.session = Session()
+
+    def tearDown(self) -> None:
+        MultipartUpload.RETRY_DELAY = self.retryDelay
+        self.stateDirectory.cleanup()
+
+    def upload(self, payload: bytes, resumeKey: str | None) -> MultipartUpload.MultipartUpload:
+        return MultipartUpload.MultipartUpload(
+            "token",
+            payload,
+            "project/folder/robot.mira",
+            self.stateDirectory.name,
+            partSize=PART_SIZE,
+            maxWorkers=2,
+            session=self.session,
+            resumeKey=resumeKey,
+        )
+
+    def test_resumes_the_kept_file(self) -> None:
+        first = random.randbytes(PART_COUNT * PART_SIZE)
+        self.session.offlineAfter = PART_COUNT // 2
+        with self.assertRaises(MultipartUpload.UploadError):
+            self.upload(first, "version 1").run(lambda: OBJECT_ID)
+
+        sentBeforeFailure = self.session.partUploads
+        self.assertGreater(sentBeforeFailure, 0)
+        self.assertLess(sentBeforeFailure, PART_COUNT)
+
+        # Exporting again makes different bytes from the same inputs, the first file is finished instead
+        self.session.offlineAfter = None
+        objectId = self.upload(random.randbytes(PART_COUNT * PART_SIZE), "version 1").run(lambda: "not resumed")
+
+        self.assertEqual(objectId, OBJECT_ID)
+        self.assertEqual(self.session.objects[OBJECT_ID], first)
+        self.assertEqual(self.session.partUploads, PART_COUNT)
+        self.assertEqual(os.listdir(self.stateDirectory.name), [])
+
+    def test_other_resume_key_starts_over(self) -> None:
+        self.session.offlineAfter = PART_COUNT // 2
+        with self.assertRaises(MultipartUpload.UploadError):
+            self.upload(random.randbytes(PART_COUNT * PART_SIZE), "version 1").run(lambda: OBJECT_ID)
+
+        self.session.offlineAfter = None
+        self.session.parts.clear()
+        second = random.randbytes(PART_COUNT * PART_SIZE)
+        self.upload(second, "version 2").run(lambda: OBJECT_ID)
+
+        self.assertEqual(self.session.objects[OBJECT_ID], second)
+
+    def test_nothing_is_kept_without_a_resume_key(self) -> None:
+        self.session.offlineAfter = PART_COUNT // 2
+        with self.assertRaises(MultipartUpload.UploadError):
+            self.upload(random.randbytes(PART_COUNT * PART_SIZE), None).run(lambda: OBJECT_ID)
+
+        self.assertFalse(os.path.exists(self.stateDirectory.name) and os.listdir(self.stateDirectory.name))
+
+
+if __name__ == "__main__":
+    unittest.main()
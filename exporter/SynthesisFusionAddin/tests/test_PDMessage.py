@@ -0,0 +1,52 @@
+"""Checks the time left estimated by `PDMessage`.
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+sys.path.insert(1, os.path.join(ROOT_EXPORTER_DIR, "proto", "proto_out"))
+
+from src.Parser.SynthesisParser import SnapshotAdsk  # isort:skip
+
+SnapshotAdsk.install()
+
+from src.Parser.SynthesisParser.PDMessage import PDMessage  # isort:skip
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class PDMessageTest(unittest.TestCase):
+    def test_gaps_after_a_stage_are_not_measured(self) -> None:
+        clock = Clock()
+        message = PDMessage("Robot", 3, 2, 0, 0, SnapshotAdsk.ProgressDialog(), {"a": 2, "b": 1, "c": 1}, clock)
+
+        message.addComponent("A", "a")
+        clock.now += 2.0
+        message.addComponent("B", "b")
+        clock.now += 1.0
+        message.addComponent("C", "c")
+        clock.now += 1.0
+        message.finishItem()
+
+        # Waiting for the meshes of the last components
+        clock.now += 10.0
+        message.addOccurrence("A:1")
+
+        # Occurrences weren't measured yet so they take as long as a component body
+        self.assertAlmostEqual(message.secondsLeft(), 2.0)
+        self.assertEqual(message.measuredSeconds["component"], 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Checks that cached physical properties of a component are recalculated when a component under it changes.
+
+Usage: python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+sys.path.insert(1, os.path.join(ROOT_EXPORTER_DIR, "proto", "proto_out"))
+
+from src.Parser.SynthesisParser import SnapshotAdsk  # isort:skip
+
+SnapshotAdsk.install()
+
+from proto.proto_out import types_pb2  # isort:skip
+from src.Parser.ExporterOptions import ExporterOptions  # isort:skip
+from src.Parser.SynthesisParser.PhysicalProperties import (  # isort:skip
+    GetComponentPhysicalProperties,
+    PhysicalPropertiesCache,
+)
+from src.Parser.SynthesisParser.Snapshot import SnapshotComponent, SnapshotPhysicalProperties  # isort:skip
+
+IDENTITY = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+
+
+def buildComponent(token: str, mass: float) -> SnapshotAdsk.Component:
+    physical = SnapshotPhysicalProperties(1.0, mass, mass, 1.0, [0.0, 0.0, 0.0])
+    return SnapshotAdsk.Component(SnapshotComponent(token, token, token, physicalProperties=physical), {}, None)
+
+
+class PhysicalPropertiesCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = PhysicalPropertiesCache(directory.name)
+
+        # An assembly with a subassembly, edits to the subassembly don't change the revision of the assembly
+        self.child = buildComponent("child", 1.0)
+        self.parent = buildComponent("parent", 3.0)
+        self.occurrence = SnapshotAdsk.Values(component=self.child, transform=SnapshotAdsk.Matrix3D(IDENTITY))
+        self.parent.allOccurrences = SnapshotAdsk.Collection([self.occurrence])
+
+    def mass(self, parentMass: float) -> float:
+        """Calculates the properties of the parent, as calculated by Fusion they would be `parentMass`"""
+        self.parent._physicalProperties.mass = parentMass
+        physicalProperties = types_pb2.PhysicalProperties()
+        GetComponentPhysicalProperties(self.parent, "parent", [], physicalProperties, ExporterOptions(), self.cache)
+        return physicalProperties.mass
+
+    def test_unchanged_assembly_is_served_from_the_cache(self) -> None:
+        self.assertEqual(self.mass(3.0), 3.0)
+        self.assertEqual(self.mass(5.0), 3.0)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_edited_subassembly_is_recalculated(self) -> None:
+        self.assertEqual(self.mass(3.0), 3.0)
+
+        self.child.revisionId = "edited"
+        self.assertEqual(self.mass(5.0), 5.0)
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_moved_subassembly_is_recalculated(self) -> None:
+        self.assertEqual(self.mass(3.0), 3.0)
+
+        self.occurrence.transform = SnapshotAdsk.Matrix3D(IDENTITY[:3] + [2.0] + IDENTITY[4:])
+        self.assertEqual(self.mass(5.0), 5.0)
+        self.assertEqual(self.cache.hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+"""Local stand-in for the APS endpoints used by `MultipartUpload`, and a check of uploads against it.
+
+Serves `signeds3upload` and the signed part urls on localhost, failing a share of part uploads at random. The check
+uploads a random file, interrupts the first attempt part way through, resumes it with different bytes under the
+same resume key, like exporting again, and verifies the object the stand-in assembled matches the first file and
+that finished parts weren't uploaded again.
+
+Requires `requests`.
+
+Usage: python tools/apsUploadStandIn.py [size MB] [failure rate] [serve]
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.APS import APSClient, MultipartUpload  # isort:skip
+
+SIGNED_URL_PATH = re.compile(r"^/oss/v2/buckets/([^/]+)/objects/([^/]+)/signeds3upload$")
+PART_PATH = re.compile(r"^/s3/([^/]+)/(\d+)$")
+
+
+class StandIn:
+    def __init__(self, failureRate: float = 0.0):
+        self.failureRate = failureRate
+
+        # upload key -> part number -> contents
+        self.uploads: dict[str, dict[int, bytes]] = {}
+
+        # "bucket/object" -> contents of completed uploads
+        self.objects: dict[str, bytes] = {}
+
+        self.partUploads = 0
+
+        # once this many parts were uploaded every further part fails, as if the connection was lost
+        self.offlineAfter: int | None = None
+        self.lock = threading.Lock()
+
+    def serve(self) -> ThreadingHTTPServer:
+        standIn = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *_: any) -> None:
+                pass
+
+            def reply(self, status: int, body: dict | None = None) -> None:
+                data = json.dumps(body or {}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                if not SIGNED_URL_PATH.match(url.path):
+                    return self.reply(404)
+
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                uploadKey = query.get("uploadKey") or uuid.uuid4().hex
+                with standIn.lock:
+                    standIn.uploads.setdefault(uploadKey, {})
+
+                firstPart, parts = int(query.get("firstPart", 1)), int(query.get("parts", 1))
+                host = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+                urls = [f"{host}/s3/{uploadKey}/{part}" for part in range(firstPart, firstPart + parts)]
+                self.reply(200, {"uploadKey": uploadKey, "urls": urls, "uploadExpiration": "2100-01-01T00:00:00Z"})
+
+            def do_PUT(self) -> None:
+                match = PART_PATH.match(self.path)
+                data = self.rfile.read(int(self.headers["Content-Length"]))
+                if match is None or match.group(1) not in standIn.uploads:
+                    return self.reply(404)
+
+                with standIn.lock:
+                    offline = standIn.offlineAfter is not None and standIn.partUploads >= standIn.offlineAfter
+                    if offline or random.random() < standIn.failureRate:
+                        return self.reply(503)
+
+                    standIn.uploads[match.group(1)][int(match.group(2))] = data
+                    standIn.partUploads += 1
+
+                self.reply(200)
+
+            def do_POST(self) -> None:
+                match = SIGNED_URL_PATH.match(self.path)
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                parts = standIn.uploads.pop(body.get("uploadKey"), None)
+                if match is None or parts is None:
+                    return self.reply(400, {"reason": "Unknown upload key"})
+
+                if sorted(parts) != list(range(1, len(parts) + 1)):
+                    return self.reply(400, {"reason": "Missing parts"})
+
+                standIn.objects[f"{match.group(1)}/{match.group(2)}"] = b"".join(parts[p] for p in sorted(parts))
+                self.reply(200, {"objectKey": match.group(2)})
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def check(sizeMB: float, failureRate: float) -> bool:
+    standIn = StandIn(failureRate)
+    server = standIn.serve()
+    baseUrl = f"http://127.0.0.1:{server.server_address[1]}"
+
+    payload = random.randbytes(int(sizeMB * 1024 * 1024))
+    partSize = max(1, len(payload) // 40)
+    partCount = -(-len(payload) // partSize)
+    objectId = "urn:adsk.objects:os.object:standin/robot.mira"
+
+    # Upload to a file like the exporter does
+    with tempfile.TemporaryDirectory() as stateDirectory, tempfile.TemporaryFile() as f:
+        f.write(payload)
+
+        standIn.offlineAfter = partCount // 2
+        MultipartUpload.RETRY_DELAY = 0.01
+        session = APSClient.APSClient().session
+        upload = MultipartUpload.MultipartUpload(
+            "token", f, "standin", stateDirectory, baseUrl, partSize, session=session, resumeKey="check"
+        )
+        try:
+            upload.run(lambda: objectId)
+            print("First attempt wasn't interrupted")
+            return False
+        except MultipartUpload.UploadError as e:
+            print(f"First attempt failed as expected: {e}")
+
+        firstAttemptParts = standIn.partUploads
+        standIn.offlineAfter = None
+
+        def report(uploaded: int, total: int) -> None:
+            print(f"\r{uploaded / total:6.1%}", end="")
+
+        # Exporting again makes different bytes, the kept copy of the first attempt is finished instead
+        resumed = MultipartUpload.MultipartUpload(
+            "token",
+            random.randbytes(len(payload)),
+            "standin",
+            stateDirectory,
+            baseUrl,
+            partSize,
+            session=session,
+            resumeKey="check",
+        )
+        resumed.onProgress = report
+        resumed.run(lambda: "urn:adsk.objects:os.object:standin/not-resumed.mira")
+        print()
+
+        leftover = os.listdir(stateDirectory)
+
+    server.shutdown()
+
+    stored = standIn.objects.get("standin/robot.mira")
+    results = {
+        "object matches payload": stored == payload,
+        "resumed only missing parts": standIn.partUploads == partCount,
+        "saved progress removed": not leftover,
+    }
+
+    print(f"{firstAttemptParts} of {partCount} parts uploaded before the interruption")
+    for name, passed in results.items():
+        print(f"{name}: {'ok' if passed else 'FAILED'}")
+
+    return all(results.values())
+
+
+def main(args: list[str] = sys.argv[1:]) -> None:
+    sizeMB = float(args[0]) if len(args) > 0 else 4.0
+    failureRate = float(args[1]) if len(args) > 1 else 0.1
+
+    if len(args) > 2 and args[2] == "serve":
+        server = StandIn(failureRate).serve()
+        print(f"Serving on http://127.0.0.1:{server.server_address[1]}, press enter to stop")
+        input()
+        server.shutdown()
+        return
+
+    if not check(sizeMB, failureRate):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
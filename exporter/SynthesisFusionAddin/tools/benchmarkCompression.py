@@ -0,0 +1,110 @@
+"""Benchmark of the codecs and levels the exporter can compress mirabuf files with.
+
+Compresses a sample assembly with every available codec at a few levels, on one thread and on all cores, and
+reports compress time, decompress time and ratio, along with `gzip.compress` at level 9 as the single threaded
+reference. The sample is an exported `.mira` file, or a synthetic assembly from `tools/benchmarkExport.py` exported
+with `HeadlessExport` if a component count is given instead.
+
+Requires the generated protobuf files in `proto/proto_out`, zstd and lz4 are only benchmarked if `zstandard` or
+`lz4` is installed.
+
+Usage: python tools/benchmarkCompression.py [mira file | component count] [threads]
+"""
+
+import gzip
+import io
+import os
+import sys
+import time
+from typing import Callable
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.Parser.SynthesisParser import Compression  # isort:skip
+from src.Types import CompressionCodec  # isort:skip
+
+# Levels benchmarked per codec, besides the default level
+LEVELS = {
+    CompressionCodec.GZIP: (1, 6, 9),
+    CompressionCodec.ZLIB: (6,),
+    CompressionCodec.DEFLATE: (6,),
+    CompressionCodec.ZSTD: (3, 9, 19),
+    CompressionCodec.LZ4: (0, 9),
+}
+
+RUNS = 3
+
+
+def loadSample(source: str) -> bytes:
+    if os.path.isfile(source):
+        with open(source, "rb") as f:
+            data = f.read()
+
+        return gzip.decompress(data) if data[:2] == b"\x1f\x8b" else data
+
+    from benchmarkExport import Case, buildSnapshot
+
+    from src.Parser.SynthesisParser.HeadlessExport import HeadlessExport
+
+    out = io.BytesIO()
+    HeadlessExport(buildSnapshot(Case("sample", int(source)))).export(out)
+    return out.getvalue()
+
+
+def fastest(run: Callable[[], bytes]) -> tuple[float, bytes]:
+    seconds, result = float("inf"), b""
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = run()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    return seconds, result
+
+
+def compress(data: bytes, codec: CompressionCodec, level: int, threads: int) -> bytes:
+    out = io.BytesIO()
+    with Compression.openCompressed(out, codec, level, threads) as f:
+        f.write(data)
+
+    return out.getvalue()
+
+
+def main(args: list[str] = sys.argv[1:]) -> None:
+    sample = loadSample(args[0] if len(args) > 0 else "1000")
+    threads = int(args[1]) if len(args) > 1 else Compression.defaultThreads()
+    print(f"Sample: {len(sample) / 1e6:.2f} MB, {threads} threads\n")
+    print(f"{'codec':<22}{'compress':>11}{'MB/s':>9}{'decompress':>12}{'ratio':>8}{'size':>11}")
+
+    def report(name: str, seconds: float, compressed: bytes, decompressSeconds: float) -> None:
+        print(
+            f"{name:<22}{seconds:10.3f}s{len(sample) / 1e6 / seconds:9.1f}{decompressSeconds:11.3f}s"
+            f"{len(sample) / len(compressed):8.2f}{len(compressed) / 1e6:8.2f} MB"
+        )
+
+    seconds, compressed = fastest(lambda: gzip.compress(sample, 9))
+    report("gzip.compress 9", seconds, compressed, fastest(lambda: gzip.decompress(compressed))[0])
+
+    failed = False
+    for codec in Compression.availableCodecs():
+        levels = sorted(set(LEVELS[codec]) | {Compression.clampLevel(codec, None)})
+        for level in levels:
+            for threadCount in sorted({1, threads}):
+                seconds, compressed = fastest(lambda: compress(sample, codec, level, threadCount))
+                decompressSeconds, decompressed = fastest(lambda: Compression.decompress(compressed, codec))
+                if decompressed != sample:
+                    failed = True
+                    print(f"{codec.name} {level} didn't decompress to the sample")
+
+                report(f"{codec.name.lower()} {level} x{threadCount}", seconds, compressed, decompressSeconds)
+
+    unavailable = [codec.name.lower() for codec in CompressionCodec if codec not in Compression.availableCodecs()]
+    if unavailable:
+        print(f"\nNot installed: {', '.join(unavailable)}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Benchmark suite for the export, run against synthetic assemblies of scalable size.
+
+Each case generates a synthetic `Snapshot` and exports it with `HeadlessExport` in its own process, so peak RSS
+is measured per case. `HeadlessExport` runs the export stages of the add-in, so every case measures the real
+`Materials`, `Components`, `Joints` and `JointHierarchy` code.
+
+Throughput, peak RSS and output size are compared against the baseline checked in next to this file, so
+regressions in the export stages show up over time. Times depend on the machine, run with `update` on the
+reference machine to refresh the baseline whenever a change to the export is expected to move the numbers.
+
+`workers` compares the mesh pipeline with each of `WORKER_COUNTS` worker threads against building the meshes inline.
+Building a mesh holds the GIL, so the workers can only overlap the time Fusion spends tessellating a body, which the
+stand in Fusion API simulates by sleeping outside of the interpreter for each of `TESSELLATION_MS`.
+
+Requires the generated protobuf files in `proto/proto_out`.
+
+Usage: python tools/benchmarkExport.py [max component count] [baseline json] [update]
+       python tools/benchmarkExport.py workers
+"""
+
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+from array import array
+from dataclasses import asdict, dataclass
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.Parser.SynthesisParser import SnapshotAdsk  # isort:skip
+
+SnapshotAdsk.install()
+
+from src.Parser.ExporterOptions import ExporterOptions  # isort:skip
+from src.Parser.SynthesisParser import MeshPipeline  # isort:skip
+from src.Parser.SynthesisParser.HeadlessExport import HeadlessExport  # isort:skip
+from src.Parser.SynthesisParser.Snapshot import (  # isort:skip
+    Snapshot,
+    SnapshotBody,
+    SnapshotComponent,
+    SnapshotJoint,
+    SnapshotMaterial,
+    SnapshotOccurrence,
+    SnapshotPhysicalProperties,
+    SnapshotProperty,
+)
+from src.Parser.SynthesisParser.SnapshotRecorder import MATERIAL_PROPERTIES  # isort:skip
+from src.Types import Joint, JointParentType, SignalType, encodeNestedObjects  # isort:skip
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "benchmarkExportBaseline.json")
+
+# A case is reported as a regression once it is this much slower or larger than the baseline
+REGRESSION_THRESHOLD = 1.2
+
+# Differences in time smaller than this are noise, no matter the ratio
+MIN_REGRESSION_SECONDS = 0.1
+
+# Every case is exported this many times and the fastest run is kept, to keep small cases from being noisy
+RUNS_PER_CASE = 3
+
+# Mesh workers compared by `workers`, 0 builds the meshes inline
+WORKER_COUNTS = (0, 1, 4)
+
+# Time Fusion is assumed to spend tessellating every body in `workers`
+TESSELLATION_MS = (0, 5, 20)
+
+
+@dataclass
+class Case:
+    name: str
+    components: int
+    depth: int = 3
+    bodiesPerComponent: int = 2
+    trianglesPerBody: int = 500
+    joints: int = 20
+    appearances: int = 20
+
+
+@dataclass
+class Result:
+    seconds: float
+    stageTimes: dict[str, float]
+    partsPerSecond: float
+    trianglesPerSecond: float
+    peakRssMB: float | None
+    outputBytes: int
+
+
+def cases(maxComponents: int) -> list[Case]:
+    suite = [Case(f"components {count}", count) for count in (10, 100, 1000, 10000) if count <= maxComponents]
+    suite += [
+        Case("depth 8", 100, depth=8),
+        Case("bodies 10", 100, bodiesPerComponent=10),
+        Case("triangles 20k", 50, trianglesPerBody=20000),
+        Case("joints 500", 500, joints=500),
+        # Enough bodies that most of the appearances are referenced, only those are exported
+        Case("appearances 2k", 100, bodiesPerComponent=20, trianglesPerBody=50, appearances=2000),
+    ]
+    return suite
+
+
+def gridMesh(triangleCount: int, seed: int) -> tuple[array, array, array]:
+    """Builds a bumpy grid with roughly `triangleCount` triangles, no normals so they are computed on export."""
+    side = max(1, int(math.sqrt(triangleCount / 2)))
+    rng = random.Random(seed)
+
+    verts = array("f")
+    for x in range(side + 1):
+        for y in range(side + 1):
+            verts.extend((x, y, rng.random()))
+
+    indices = array("i")
+    for x in range(side):
+        for y in range(side):
+            a = x * (side + 1) + y
+            b = a + side + 1
+            indices.extend((a, b, a + 1, a + 1, b, b + 1))
+
+    return verts, indices, array("f")
+
+
+def buildSnapshot(case: Case) -> Snapshot:
+    """Builds a synthetic robot: every component is used by a few occurrences nested `depth` levels deep.
+
+    Every fifth component reuses the geometry of another so part definition merging has work to do.
+    """
+    rng = random.Random(0)
+
+    appearanceIds = [f"appearance_{i}" for i in range(case.appearances)]
+    jointTypes = [0 if j % 3 == 0 else rng.choice((1, 2)) for j in range(case.joints)]
+    options = ExporterOptions(
+        joints=[
+            Joint(f"joint{j}", JointParentType.ROOT, SignalType.PWM, 1.0, 1.0)
+            for j, jointType in enumerate(jointTypes)
+            if jointType != 0
+        ],
+        wheels=[],
+    )
+
+    snapshot = Snapshot(case.name, "root_root", encodeNestedObjects(options))
+    snapshot.components["root_root"] = SnapshotComponent("root", "root", "Root")
+
+    for id in appearanceIds:
+        color = [rng.randrange(256) for _ in range(3)] + [255]
+        snapshot.appearances[id] = SnapshotMaterial(
+            id, id, [SnapshotProperty("interior_model", "Model", 0), SnapshotProperty("opaque_albedo", "Color", color)]
+        )
+
+    snapshot.materials["aluminum"] = SnapshotMaterial(
+        "aluminum", "Aluminum", [SnapshotProperty(id, id, 1.0) for id in MATERIAL_PROPERTIES]
+    )
+
+    for c in range(case.components):
+        seed = rng.randrange(c) if c % 5 == 4 else c
+        physical = SnapshotPhysicalProperties(1.0, seed, seed, seed, [0.0, 0.0, 0.0])
+        component = SnapshotComponent(f"comp{c}", str(c), f"Component {c}", "aluminum", [], physical)
+        for b in range(case.bodiesPerComponent):
+            verts, indices, uv = gridMesh(case.trianglesPerBody, seed * 100 + b)
+            appearance = (
+                appearanceIds[(seed * case.bodiesPerComponent + b) % len(appearanceIds)] if appearanceIds else None
+            )
+            component.bodies.append(
+                SnapshotBody(f"comp{c}_body{b}", f"Body {b}", True, appearance, verts, array("f"), indices, uv)
+            )
+        snapshot.components[f"{component.token}_{component.id}"] = component
+
+    componentGuids = list(snapshot.components)[1:]
+    occurrenceCount = case.components * 2
+    parents: list[str | None] = [None]
+    occurrenceParents: dict[str, str | None] = {}
+    for i in range(occurrenceCount):
+        parent = rng.choice(parents)
+        token = f"occ{i}"
+        transform = [1.0, 0.0, 0.0, rng.random(), 0.0, 1.0, 0.0, rng.random(), 0.0, 0.0, 1.0, rng.random(), 0, 0, 0, 1]
+        componentGuid = componentGuids[i % len(componentGuids)]
+        snapshot.occurrences[token] = SnapshotOccurrence(token, componentGuid, token, True, i == 0, transform)
+        occurrenceParents[token] = parent
+
+        if parent is None:
+            snapshot.rootOccurrences.append(token)
+        else:
+            snapshot.occurrences[parent].children.append(token)
+
+        depth = 0
+        ancestor = parent
+        while ancestor is not None:
+            ancestor = occurrenceParents[ancestor]
+            depth += 1
+        if depth < case.depth:
+            parents.append(token)
+
+    tokens = list(snapshot.occurrences)
+    for j, jointType in enumerate(jointTypes):
+        one, two = rng.sample(tokens, 2)
+        origin = [rng.random(), rng.random(), rng.random()]
+        snapshot.joints.append(
+            SnapshotJoint(f"joint{j}", f"Joint {j}", False, False, one, two, jointType, origin, jointMotion(jointType))
+        )
+
+    for _ in range(case.joints // 10):
+        snapshot.rigidGroups.append(rng.sample(tokens, 3))
+
+    return snapshot
+
+
+def jointMotion(jointType: int) -> dict[str, any]:
+    """Motion of a revolute joint around or a slider joint along the z axis, as recorded by `SnapshotRecorder`"""
+    limits = {"minimumValue": 0.0, "maximumValue": 1.0}
+    axis = {"x": 0.0, "y": 0.0, "z": 1.0}
+    if jointType == 1:
+        return {"rotationValue": 0.0, "rotationLimits": limits, "rotationAxisVector": axis, "rotationAxis": 2}
+    elif jointType == 2:
+        return {"slideDirectionVector": axis, "slideDirection": 2, "slideLimits": limits, "slideValue": 0.0}
+
+    return {}
+
+
+def peakRssMB() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes everywhere else
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def runCase(case: Case) -> Result:
+    snapshot = buildSnapshot(case)
+    triangleCount = sum(len(body.indices) // 3 for c in snapshot.components.values() for body in c.bodies)
+
+    export = HeadlessExport(snapshot)
+    seconds, stageTimes = math.inf, {}
+    for _ in range(RUNS_PER_CASE):
+        out = io.BytesIO()
+        start = time.perf_counter()
+        export.export(out)
+        elapsed = time.perf_counter() - start
+        if elapsed < seconds:
+            seconds, stageTimes = elapsed, export.stageTimes
+
+    componentSeconds = stageTimes["Components"]
+    return Result(
+        seconds,
+        stageTimes,
+        len(snapshot.components) / componentSeconds,
+        triangleCount / componentSeconds,
+        peakRssMB(),
+        out.tell(),
+    )
+
+
+def runWorkerCase(case: Case, workers: int, tessellationMs: float) -> float:
+    """Exports a case with the given number of mesh workers, returns the seconds spent on the components"""
+    MeshPipeline.MESH_WORKERS = workers
+    SnapshotAdsk.TESSELLATION_SECONDS = tessellationMs / 1000
+    return runCase(case).stageTimes["Components"]
+
+
+def benchmarkWorkers() -> None:
+    case = Case("triangles 20k", 50, trianglesPerBody=20000)
+    bodies = case.components * case.bodiesPerComponent
+    print(f"{case.name}, {bodies} bodies, seconds spent on the components")
+    print(f"{'tessellation':<14}" + "".join(f"{f'{workers} workers':>12}" for workers in WORKER_COUNTS))
+    for tessellationMs in TESSELLATION_MS:
+        line = f"{f'{tessellationMs} ms/body':<14}"
+        for workers in WORKER_COUNTS:
+            with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+                seconds = pool.apply(runWorkerCase, (case, workers, tessellationMs))
+
+            line += f"{seconds:11.3f}s"
+
+        print(line)
+
+
+def compare(result: Result, baseline: dict) -> list[str]:
+    regressions = []
+    if result.seconds > baseline["seconds"] * REGRESSION_THRESHOLD + MIN_REGRESSION_SECONDS:
+        regressions.append(f"time {result.seconds / baseline['seconds']:.2f}x")
+
+    for metric, value, previous in (
+        ("peak RSS", result.peakRssMB, baseline["peakRssMB"]),
+        ("output size", result.outputBytes, baseline["outputBytes"]),
+    ):
+        if value is not None and previous and value > previous * REGRESSION_THRESHOLD:
+            regressions.append(f"{metric} {value / previous:.2f}x")
+
+    return regressions
+
+
+def main(args: list[str] = sys.argv[1:]) -> None:
+    if args and args[0] == "workers":
+        benchmarkWorkers()
+        return
+
+    maxComponents = int(args[0]) if len(args) > 0 else 1000
+    baselinePath = args[1] if len(args) > 1 else DEFAULT_BASELINE
+    update = len(args) > 2 and args[2] == "update"
+
+    baseline = {}
+    if os.path.exists(baselinePath):
+        with open(baselinePath, "r") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressed = False
+    print(f"{'case':<18}{'time':>10}{'parts/s':>10}{'tris/s':>12}{'peak RSS':>11}{'output':>11}")
+    for case in cases(maxComponents):
+        # A fresh process per case so peak RSS isn't carried over from the previous case
+        with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+            result = pool.apply(runCase, (case,))
+
+        results[case.name] = asdict(result)
+        rss = f"{result.peakRssMB:8.1f} MB" if result.peakRssMB is not None else f"{'n/a':>11}"
+        line = (
+            f"{case.name:<18}{result.seconds:9.3f}s{result.partsPerSecond:10.0f}{result.trianglesPerSecond:12.0f}"
+            f"{rss}{result.outputBytes / 1e6:8.2f} MB"
+        )
+
+        if case.name in baseline:
+            regressions = compare(result, baseline[case.name])
+            if regressions:
+                regressed = True
+                line += f"  REGRESSION: {', '.join(regressions)}"
+            else:
+                line += f"  ({result.seconds / baseline[case.name]['seconds']:.2f}x baseline time)"
+
+        print(line)
+
+    if update or not baseline:
+        with open(baselinePath, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"\nWrote baseline to '{baselinePath}'")
+
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Benchmark for building the joint hierarchy of a large synthetic assembly.
+
+Compares the flat `JointGraph` used by `JointHierarchy.JointParser` against the recursive traversal it replaced,
+which is reproduced here on the same stub data.
+
+Usage: python tools/benchmarkJointGraph.py [occurrence count] [joint count] [rigid chain length]
+"""
+
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.Parser.SynthesisParser.JointGraph import GROUND  # isort:skip
+from src.Parser.SynthesisParser.JointGraph import JointGraph, OccurrenceRelationship  # isort:skip
+
+
+@dataclass
+class StubOccurrence:
+    isGrounded: bool = False
+    children: list[str] = field(default_factory=list)
+
+
+@dataclass
+class StubJoint:
+    jointType: int
+    occurrenceOne: str
+    occurrenceTwo: str
+
+
+def buildAssembly(
+    occurrenceCount: int, jointCount: int, chainLength: int
+) -> tuple[dict[str, StubOccurrence], list[StubJoint]]:
+    """Builds a robot like assembly: a grounded frame plus one subassembly per dynamic joint.
+
+    Most joints drive a subassembly from a part of an earlier one, forming long kinematic chains. Every tenth
+    joint closes a linkage back onto another subassembly, and the remaining joints rigidly fasten parts together.
+    Optionally a chain of rigidly joined links, like a belt, is attached to the frame.
+    """
+    occurrences: dict[str, StubOccurrence] = {}
+    subassemblies: list[list[str]] = []
+    axisCount = max(1, jointCount * 5 // 6)
+    partsPerSubassembly = max(1, (occurrenceCount - chainLength) // (axisCount + 1))
+
+    for i in range(axisCount + 1):
+        tokens = [f"sub{i}_part{j}" for j in range(partsPerSubassembly)]
+        for j, token in enumerate(tokens):
+            occurrences[token] = StubOccurrence(isGrounded=(i == 0 and j == 0))
+            if j > 0:
+                # Nest parts a few levels deep under the root of the subassembly
+                occurrences[tokens[(j - 1) // 4]].children.append(token)
+        subassemblies.append(tokens)
+
+    joints = []
+    for i in range(1, axisCount + 1):
+        parent = subassemblies[random.randrange(max(0, i - 3), i)]
+        joints.append(StubJoint(random.choice((1, 2)), subassemblies[i][0], random.choice(parent)))
+
+        if i % 10 == 0:
+            # Close a four bar style linkage onto another earlier subassembly
+            joints.append(StubJoint(1, subassemblies[i][0], random.choice(subassemblies[random.randrange(i)])))
+
+    while len(joints) < jointCount:
+        # Parts fastened together within a subassembly
+        parts = subassemblies[random.randrange(axisCount + 1)]
+        joints.append(StubJoint(0, random.choice(parts), random.choice(parts)))
+
+    previous = subassemblies[0][-1]
+    for i in range(chainLength):
+        token = f"link{i}"
+        occurrences[token] = StubOccurrence()
+        joints.append(StubJoint(0, previous, token))
+        previous = token
+
+    return occurrences, joints
+
+
+def recursiveTraversal(occurrences: dict[str, StubOccurrence], joints: list[StubJoint], grounded: str) -> set[str]:
+    """The traversal `JointParser` used before `JointGraph`, without the Fusion API calls."""
+    occurrenceJoints: dict[str, list[StubJoint]] = {}
+    for joint in joints:
+        for token in dict.fromkeys((joint.occurrenceOne, joint.occurrenceTwo)):
+            occurrenceJoints.setdefault(token, []).append(joint)
+
+    dynamicJoints = {}
+    for joint in joints:
+        if joint.jointType != 0:
+            dynamicJoints.setdefault(joint.occurrenceOne, joint)
+
+    class Node:
+        def __init__(self, token: str):
+            self.token = token
+            self.edges = []
+
+    def populate(token, prev, relationship, traversal, isGround=False):
+        occ = occurrences[token]
+        if occ.isGrounded and not isGround:
+            return
+        elif relationship == OccurrenceRelationship.NEXT and prev is not None:
+            prev.edges.append((relationship, Node(token)))
+            return
+        elif (token in dynamicJoints and prev is not None) or traversal.get(token) is not None:
+            return
+
+        node = Node(token)
+        traversal[token] = True
+
+        for child in occ.children:
+            populate(child, node, OccurrenceRelationship.TRANSFORM, traversal, isGround)
+
+        for joint in occurrenceJoints.get(token, []):
+            connection = None
+            rigid = joint.jointType == 0
+            if rigid:
+                if joint.occurrenceOne == token:
+                    connection = joint.occurrenceTwo
+                if joint.occurrenceTwo == token:
+                    connection = joint.occurrenceOne
+            elif joint.occurrenceOne != token:
+                connection = joint.occurrenceOne
+
+            if connection is not None and (prev is None or connection != prev.token):
+                connectionType = OccurrenceRelationship.CONNECTION if rigid else OccurrenceRelationship.NEXT
+                populate(connection, node, connectionType, traversal, isGround)
+
+        if prev is not None:
+            prev.edges.append((relationship, node))
+
+        traversal[token] = node
+        return node
+
+    roots = {GROUND: populate(grounded, None, None, {}, isGround=True)}
+    for token in dynamicJoints:
+        root = populate(token, None, None, {})
+        if root is not None:
+            roots[token] = root
+
+    def connectedAxisTokens(node):
+        tokens = []
+        for relationship, child in node.edges:
+            if relationship == OccurrenceRelationship.NEXT:
+                tokens.append(child.token)
+            else:
+                tokens.extend(connectedAxisTokens(child))
+        return tokens
+
+    # Like JointParser._recurseLink this revisits an axis once for every path leading to it
+    linked = set()
+
+    def recurseLink(key):
+        for token in connectedAxisTokens(roots[key]):
+            if token in roots:
+                linked.add(token)
+                recurseLink(token)
+
+    recurseLink(GROUND)
+    return linked
+
+
+def timeRun(name: str, func: callable, *args: any) -> any:
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    except RecursionError:
+        print(f"{name:<24}RecursionError")
+        return None
+
+    print(f"{name:<24}{time.perf_counter() - start:8.4f}s")
+    return result
+
+
+def main(args: list[str] = sys.argv[1:]) -> None:
+    occurrenceCount = int(args[0]) if len(args) > 0 else 5000
+    jointCount = int(args[1]) if len(args) > 1 else 300
+    chainLength = int(args[2]) if len(args) > 2 else 0
+
+    random.seed(0)
+    occurrences, joints = buildAssembly(occurrenceCount, jointCount, chainLength)
+    print(f"Synthetic assembly with {len(occurrences)} occurrences and {len(joints)} joints\n")
+
+    grounded = next(token for token, occurrence in occurrences.items() if occurrence.isGrounded)
+    linked = timeRun("recursive traversal", recursiveTraversal, occurrences, joints, grounded)
+    graph = timeRun("JointGraph", JointGraph, occurrences, joints, grounded)
+
+    print(f"\n{len(graph.trees) - 1} axes, {len(graph.links)} linked to the grounded occurrence")
+    if linked is not None:
+        assert linked == {child for _, child in graph.links}, "Linked axes do not match!"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Micro-benchmark for copying raw mesh arrays into mirabuf `Mesh` messages.
+
+Requires the compiled protobuf files in `proto/proto_out`, see `proto/build.sh`.
+
+Usage: python tools/benchmarkMeshTransfer.py [vertex count]
+"""
+
+import os
+import random
+import sys
+import time
+from array import array
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+sys.path.insert(1, os.path.join(ROOT_EXPORTER_DIR, "proto", "proto_out"))
+
+from proto.proto_out import assembly_pb2  # isort:skip
+from src.Parser.SynthesisParser.MeshBuffers import fillMesh  # isort:skip
+
+
+def appendEach(mesh: assembly_pb2.Mesh, verts: list, normals: list, indices: list, uv: list) -> None:
+    for field, values in ((mesh.verts, verts), (mesh.normals, normals), (mesh.uv, uv), (mesh.indices, indices)):
+        for value in values:
+            field.append(value)
+
+
+def extendLists(mesh: assembly_pb2.Mesh, verts: list, normals: list, indices: list, uv: list) -> None:
+    mesh.verts.extend(verts)
+    mesh.normals.extend(normals)
+    mesh.indices.extend(indices)
+    mesh.uv.extend(uv)
+
+
+def timeRun(name: str, func: callable, *args: any) -> assembly_pb2.Mesh:
+    mesh = assembly_pb2.Mesh()
+    start = time.perf_counter()
+    func(mesh, *args)
+    print(f"{name:<32}{time.perf_counter() - start:8.4f}s")
+    return mesh
+
+
+def main(args: list[str] = sys.argv[1:]) -> None:
+    vertexCount = int(args[0]) if len(args) else 1_000_000
+    print(f"Stub mesh with {vertexCount} vertices and {vertexCount} triangles\n")
+
+    verts = [random.uniform(-100.0, 100.0) for _ in range(vertexCount * 3)]
+    normals = [random.uniform(-1.0, 1.0) for _ in range(vertexCount * 3)]
+    uv = [random.random() for _ in range(vertexCount * 2)]
+    indices = [random.randrange(vertexCount) for _ in range(vertexCount * 3)]
+
+    expected = timeRun("append per value", appendEach, verts, normals, indices, uv).SerializeToString()
+    results = [
+        timeRun("extend with lists", extendLists, verts, normals, indices, uv),
+        timeRun("fillMesh with lists", fillMesh, verts, normals, indices, uv),
+    ]
+
+    start = time.perf_counter()
+    buffers = [array("f", values) for values in (verts, normals, uv)]
+    print(f"{'packing lists into array(f)':<32}{time.perf_counter() - start:8.4f}s")
+
+    results.append(timeRun("fillMesh with array(f)", fillMesh, buffers[0], buffers[1], indices, buffers[2]))
+    results.append(timeRun("extend with array(f)", extendLists, buffers[0], buffers[1], indices, buffers[2]))
+
+    assert all(result.SerializeToString() == expected for result in results), "Mesh outputs do not match!"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark for computing occurrence world transforms on a deep stub assembly.
+
+Compares walking `assemblyContext` up to the root for every occurrence (the old `GetMatrixWorld`)
+against passing the parent world transform down the traversal like `Components.__parseChildOccurrence`.
+
+Usage: python tools/benchmarkWorldTransforms.py [depth] [children per occurrence]
+"""
+
+import random
+import sys
+import time
+
+
+class StubMatrix:
+    """Minimal stand in for `adsk.core.Matrix3D`, a row major 4x4 matrix."""
+
+    multiplies = 0
+
+    def __init__(self, values: list[float]):
+        self.values = values
+
+    def transformBy(self, matrix: "StubMatrix") -> None:
+        # Same semantics as Matrix3D.transformBy: self = matrix * self
+        StubMatrix.multiplies += 1
+        a, b = matrix.values, self.values
+        self.values = [sum(a[row * 4 + k] * b[k * 4 + col] for k in range(4)) for row in range(4) for col in range(4)]
+
+    def asArray(self) -> list[float]:
+        return self.values
+
+
+class StubOccurrence:
+    def __init__(self, assemblyContext: "StubOccurrence | None"):
+        self.assemblyContext = assemblyContext
+        self.childOccurrences: list[StubOccurrence] = []
+        self.local = [random.uniform(-1.0, 1.0) for _ in range(12)] + [0.0, 0.0, 0.0, 1.0]
+
+    @property
+    def transform(self) -> StubMatrix:
+        # Like the Fusion API, every access returns a new copy
+        return StubMatrix(list(self.local))
+
+
+def buildAssembly(depth: int, children: int) -> list[StubOccurrence]:
+    roots = [StubOccurrence(None) for _ in range(children)]
+    level = roots
+    for _ in range(depth - 1):
+        nextLevel = []
+        for parent in level:
+            parent.childOccurrences = [StubOccurrence(parent) for _ in range(children)]
+            nextLevel.extend(parent.childOccurrences)
+        level = nextLevel
+
+    return roots
+
+
+def walkToRoot(occurrences: list[StubOccurrence], out: list[list[float]]) -> None:
+    for occurrence in occurrences:
+        matrix = occurrence.transform
+        context = occurrence
+        while context.assemblyContext:
+            matrix.transformBy(context.assemblyContext.transform)
+            context = context.assemblyContext
+
+        out.append(matrix.asArray())
+        walkToRoot(occurrence.childOccurrences, out)
+
+
+def passDown(occurrences: list[StubOccurrence], out: list[list[float]], parentTransform: StubMatrix = None) -> None:
+    for occurrence in occurrences:
+        worldTransform = occurrence.transform
+        if parentTransform:
+            worldTransform.transformBy(parentTransform)
+
+        out.append(worldTransform.asArray())
+        passDown(occurrence.childOccurrences, out, worldTransform)
+
+
+def timeRun(name: str, func: callable, roots: list[StubOccurrence]) -> list[list[float]]:
+    out = []
+    StubMatrix.multiplies = 0
+    start = time.perf_counter()
+    func(roots, out)
+    print(f"{name:<24}{time.perf_counter() - start:8.4f}s{StubMatrix.multiplies:>12} multiplies")
+    return out
+
+
+def main(args: list[str] = sys.argv[1:]) -> None:
+    depth = int(args[0]) if len(args) > 0 else 8
+    children = int(args[1]) if len(args) > 1 else 3
+    roots = buildAssembly(depth, children)
+    print(f"Stub assembly {depth} levels deep with {children} children per occurrence\n")
+
+    expected = timeRun("walk to root", walkToRoot, roots)
+    result = timeRun("pass parent down", passDown, roots)
+
+    assert len(expected) == len(result)
+    for a, b in zip(expected, result):
+        assert all(abs(x - y) <= 1e-6 * max(1.0, abs(x)) for x, y in zip(a, b)), "World transforms do not match!"
+
+
+if __name__ == "__main__":
+    main()
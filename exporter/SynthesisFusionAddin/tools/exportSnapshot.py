@@ -0,0 +1,56 @@
+"""Exports a recorded design snapshot outside of Fusion and reports how long each stage took.
+
+Snapshots are recorded by enabling "Record Snapshot" in the exporter settings, see
+`src/Parser/SynthesisParser/Snapshot.py`. Requires the generated protobuf files in `proto/proto_out`.
+
+Usage: python tools/exportSnapshot.py <snapshot> [output .mira] [repeat count]
+"""
+
+import io
+import os
+import sys
+import time
+
+ROOT_EXPORTER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_EXPORTER_DIR)
+
+from src.Parser.SynthesisParser import SnapshotAdsk  # isort:skip
+
+SnapshotAdsk.install()
+
+from src.Parser.SynthesisParser.HeadlessExport import HeadlessExport  # isort:skip
+from src.Parser.SynthesisParser.Snapshot import readSnapshot  # isort:skip
+
+
+def main(args: list[str] = sys.argv[1:]) -> None:
+    if len(args) < 1:
+        print(__doc__)
+        sys.exit(1)
+
+    outputPath = args[1] if len(args) > 1 else None
+    repeatCount = int(args[2]) if len(args) > 2 else 1
+
+    start = time.perf_counter()
+    snapshot = readSnapshot(args[0])
+    bodyCount = sum(len(component.bodies) for component in snapshot.components.values())
+    print(f"Read snapshot in {time.perf_counter() - start:.4f}s")
+    print(
+        f"{len(snapshot.components)} components, {bodyCount} bodies, {len(snapshot.occurrences)} occurrences "
+        f"and {len(snapshot.joints)} joints\n"
+    )
+
+    export = HeadlessExport(snapshot)
+    for run in range(repeatCount):
+        out = open(outputPath, "wb") if outputPath is not None and run == 0 else io.BytesIO()
+        with out:
+            start = time.perf_counter()
+            export.export(out)
+            total = time.perf_counter() - start
+            size = out.tell()
+
+        stages = "  ".join(f"{name} {seconds:.4f}s" for name, seconds in export.stageTimes.items())
+        print(f"run {run + 1}: {total:.4f}s, {size / 1e6:.2f} MB, {bodyCount / total:.0f} bodies/s  ({stages})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import { mirabuf } from "@/proto/mirabuf"
+
+// Quantized meshes written by the exporter into TriangleMesh.bmesh. See
+// exporter/SynthesisFusionAddin/src/Parser/SynthesisParser/MeshEncoding.py for the format.
+const MAGIC = "MQM1"
+const HAS_NORMALS = 1
+const HAS_UV = 2
+const HEADER_SIZE = 56
+const NORMAL_MAX = 32767
+
+/**
+ * Decodes a quantized binary mesh back into a regular mesh.
+ *
+ * @param {Uint8Array} data Contents of a BinaryMesh.
+ *
+ * @returns {mirabuf.Mesh} Mesh with the decoded verts, normals, uvs and indices.
+ */
+export function DecodeBinaryMesh(data: Uint8Array): mirabuf.Mesh {
+    const view = new DataView(data.buffer, data.byteOffset, data.byteLength)
+    const magic = String.fromCharCode(data[0], data[1], data[2], data[3])
+    if (magic != MAGIC) {
+        throw new Error(`Unknown binary mesh format '${magic}'`)
+    }
+
+    const flags = view.getUint32(4, true)
+    const vertexCount = view.getUint32(8, true)
+    const indexCount = view.getUint32(12, true)
+    const header = (i: number) => view.getFloat32(16 + i * 4, true)
+    const positionOffset = [header(0), header(1), header(2)]
+    const positionScale = [header(3), header(4), header(5)]
+    const uvOffset = [header(6), header(7)]
+    const uvScale = [header(8), header(9)]
+
+    let offset = HEADER_SIZE
+    const verts = new Array<number>(vertexCount * 3)
+    for (let i = 0; i < verts.length; i++) {
+        verts[i] = positionOffset[i % 3] + view.getUint16(offset + i * 2, true) * positionScale[i % 3]
+    }
+    offset += vertexCount * 6
+
+    const normals: number[] = []
+    if (flags & HAS_NORMALS) {
+        for (let i = 0; i < vertexCount; i++) {
+            let x = view.getInt16(offset + i * 4, true) / NORMAL_MAX
+            let y = view.getInt16(offset + i * 4 + 2, true) / NORMAL_MAX
+            const z = 1 - Math.abs(x) - Math.abs(y)
+            if (z < 0) {
+                ;[x, y] = [(1 - Math.abs(y)) * (x >= 0 ? 1 : -1), (1 - Math.abs(x)) * (y >= 0 ? 1 : -1)]
+            }
+
+            const length = Math.sqrt(x * x + y * y + z * z)
+            normals.push(x / length, y / length, z / length)
+        }
+        offset += vertexCount * 4
+    }
+
+    const uv: number[] = []
+    if (flags & HAS_UV) {
+        for (let i = 0; i < vertexCount * 2; i++) {
+            uv.push(uvOffset[i % 2] + view.getUint16(offset + i * 2, true) * uvScale[i % 2])
+        }
+        offset += vertexCount * 4
+    }
+
+    // Zigzag varint encoded differences to the previous index
+    const indices = new Array<number>(indexCount)
+    let previous = 0
+    for (let i = 0; i < indexCount; i++) {
+        let value = 0
+        let shift = 0
+        let byte
+        do {
+            byte = data[offset++]
+            value += (byte & 0x7f) * 2 ** shift
+            shift += 7
+        } while (byte >= 0x80)
+
+        previous += value % 2 ? -(value + 1) / 2 : value / 2
+        indices[i] = previous
+    }
+
+    return new mirabuf.Mesh({ verts: verts, normals: normals, uv: uv, indices: indices })
+}
+
+/**
+ * Replaces every quantized body mesh of an assembly with the decoded mesh, so the rest of the viewer only has to
+ * handle regular meshes.
+ *
+ * @param {mirabuf.Assembly} assembly Assembly to expand in place.
+ */
+export function ExpandBinaryMeshes(assembly: mirabuf.Assembly) {
+    const definitions = assembly.data?.parts?.partDefinitions
+    if (!definitions) return
+
+    for (const definition of Object.values(definitions)) {
+        for (const body of definition.bodies ?? []) {
+            const triangleMesh = body.triangleMesh
+            if (triangleMesh?.bmesh?.data) {
+                triangleMesh.mesh = DecodeBinaryMesh(triangleMesh.bmesh.data)
+                triangleMesh.bmesh = null
+            }
+        }
+    }
+}
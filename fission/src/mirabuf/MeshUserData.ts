@@ -0,0 +1,102 @@
+import { mirabuf } from "@/proto/mirabuf"
+import { DecodeBinaryMesh } from "./BinaryMesh"
+
+// Extra meshes the exporter stores in Parts.userData, since mirabuf has no fields for them. See
+// exporter/SynthesisFusionAddin/src/Parser/SynthesisParser/PartDefinitions.py for the format.
+const LOD_PREFIX = "lod/"
+const COLLISION_PREFIX = "collision/"
+
+export interface LodLevel {
+    /** The level is drawn while the body covers less than this fraction of the screen height. */
+    screenSize: number
+    triangles: number
+    mesh: mirabuf.Mesh
+}
+
+/**
+ * Decodes a base64 serialized TriangleMesh into a regular mesh.
+ *
+ * @param {string} encoded Base64 of the serialized TriangleMesh.
+ *
+ * @returns {mirabuf.Mesh | undefined} The mesh, or undefined if the TriangleMesh holds none.
+ */
+export function DecodeUserDataMesh(encoded: string): mirabuf.Mesh | undefined {
+    const triangleMesh = mirabuf.TriangleMesh.decode(Uint8Array.from(atob(encoded), c => c.charCodeAt(0)))
+    if (triangleMesh.bmesh?.data?.length) {
+        return DecodeBinaryMesh(triangleMesh.bmesh.data)
+    }
+
+    return triangleMesh.mesh ? new mirabuf.Mesh(triangleMesh.mesh) : undefined
+}
+
+/**
+ * Reads the level of detail chains of every body stored by the exporter.
+ *
+ * @param {mirabuf.Assembly} assembly Assembly to read the chains of.
+ *
+ * @returns {Map<string, Map<number, LodLevel[]>>} Part definition -> body index -> levels, most detailed first.
+ */
+export function ReadLods(assembly: mirabuf.Assembly): Map<string, Map<number, LodLevel[]>> {
+    const lods = new Map<string, Map<number, LodLevel[]>>()
+    const userData = assembly.data?.parts?.userData?.data
+    if (!userData) return lods
+
+    for (const [key, value] of Object.entries(userData)) {
+        if (!key.startsWith(LOD_PREFIX)) continue
+
+        // Definitions can contain slashes, the body index never does
+        const separator = key.lastIndexOf("/")
+        const definition = key.substring(LOD_PREFIX.length, separator)
+        const bodyIndex = Number(key.substring(separator + 1))
+
+        try {
+            const levels: LodLevel[] = []
+            for (const level of JSON.parse(value).levels) {
+                const mesh = DecodeUserDataMesh(level.mesh)
+                if (mesh) levels.push({ screenSize: level.screenSize, triangles: level.triangles, mesh: mesh })
+            }
+
+            let bodies = lods.get(definition)
+            if (!bodies) {
+                bodies = new Map()
+                lods.set(definition, bodies)
+            }
+            bodies.set(bodyIndex, levels)
+        } catch (e) {
+            console.warn(`Skipping unreadable levels of detail '${key}'`, e)
+        }
+    }
+
+    return lods
+}
+
+/**
+ * Reads the convex collision hulls of every part definition stored by the exporter.
+ *
+ * @param {mirabuf.Assembly} assembly Assembly to read the hulls of.
+ *
+ * @returns {Map<string, Map<number, mirabuf.Mesh>>} Part definition -> body index -> hull. Bodies without a hull are
+ * missing, and should use their own mesh instead.
+ */
+export function ReadCollisionHulls(assembly: mirabuf.Assembly): Map<string, Map<number, mirabuf.Mesh>> {
+    const hulls = new Map<string, Map<number, mirabuf.Mesh>>()
+    const userData = assembly.data?.parts?.userData?.data
+    if (!userData) return hulls
+
+    for (const [key, value] of Object.entries(userData)) {
+        if (!key.startsWith(COLLISION_PREFIX)) continue
+
+        try {
+            const bodies = new Map<number, mirabuf.Mesh>()
+            for (const hull of JSON.parse(value).hulls) {
+                const mesh = DecodeUserDataMesh(hull.mesh)
+                if (mesh) bodies.set(hull.body, mesh)
+            }
+            hulls.set(key.substring(COLLISION_PREFIX.length), bodies)
+        } catch (e) {
+            console.warn(`Skipping unreadable collision hulls '${key}'`, e)
+        }
+    }
+
+    return hulls
+}
@@ -3,6 +3,7 @@ import { mirabuf } from "../proto/mirabuf"
 import MirabufParser, { ParseErrorSeverity } from "./MirabufParser.ts"
 import World from "@/systems/World.ts"
 import { ProgressHandle } from "@/ui/components/ProgressNotificationData.ts"
+import { LodLevel, ReadLods } from "./MeshUserData.ts"
 
 type MirabufPartInstanceGUID = string
 
@@ -85,15 +86,34 @@ const transformGeometry = (geometry: THREE.BufferGeometry, mesh: mirabuf.IMesh)
 
     geometry.setAttribute("position", new THREE.BufferAttribute(new Float32Array(newVerts), 3))
     geometry.setAttribute("normal", new THREE.BufferAttribute(new Float32Array(newNorms), 3))
-    geometry.setAttribute("uv", new THREE.BufferAttribute(new Float32Array(mesh.uv!), 2))
+    // Levels of detail have no uvs, but every geometry of a batch needs the same attributes
+    const uv = mesh.uv?.length ? mesh.uv : new Array<number>((mesh.verts!.length / 3) * 2).fill(0)
+    geometry.setAttribute("uv", new THREE.BufferAttribute(new Float32Array(uv), 2))
     geometry.setIndex(mesh.indices!)
 }
 
+/**
+ * The full detail mesh of a body instance and its simplified levels, all in the same batch. Only one of them is
+ * visible at a time.
+ */
+interface LodGroup {
+    batch: THREE.BatchedMesh
+    /** Geometry ids of the full detail mesh followed by every level. */
+    ids: number[]
+    screenSizes: number[]
+    bounds: THREE.Sphere
+    visible: number
+}
+
+const lodCenter = new THREE.Vector3()
+const lodMatrix = new THREE.Matrix4()
+
 class MirabufInstance {
     private _mirabufParser: MirabufParser
     private _materials: Map<string, THREE.Material>
     private _meshes: Map<MirabufPartInstanceGUID, Array<[THREE.BatchedMesh, number]>>
     private _batches: Array<THREE.BatchedMesh>
+    private _lodGroups: Array<LodGroup>
 
     public get parser() {
         return this._mirabufParser
@@ -117,6 +137,7 @@ class MirabufInstance {
         this._materials = new Map()
         this._meshes = new Map()
         this._batches = new Array<THREE.BatchedMesh>()
+        this._lodGroups = new Array<LodGroup>()
 
         progressHandle?.Update("Loading materials...", 0.4)
         this.LoadMaterials(materialStyle ?? MaterialStyle.Regular)
@@ -174,15 +195,19 @@ class MirabufInstance {
             maxIndices: number
         }
 
-        const batchMap = new Map<THREE.Material, Map<string, [mirabuf.IBody, Array<mirabuf.IPartInstance>]>>()
+        // Body, its instances and its levels of detail
+        type BodyInstances = [mirabuf.IBody, Array<mirabuf.IPartInstance>, LodLevel[]]
+
+        const batchMap = new Map<THREE.Material, Map<string, BodyInstances>>()
         const countMap = new Map<THREE.Material, BatchCounts>()
+        const lods = ReadLods(assembly)
 
         // Filter all instances by first material, then body
         for (const instance of Object.values(instances)) {
             const definition = assembly.data!.parts!.partDefinitions![instance.partDefinitionReference!]!
             const bodies = definition.bodies
             if (bodies) {
-                for (const body of bodies) {
+                for (const [bodyIndex, body] of bodies.entries()) {
                     if (!body) continue
                     const mesh = body.triangleMesh
                     if (
@@ -202,31 +227,26 @@ class MirabufInstance {
 
                         let materialBodyMap = batchMap.get(material)
                         if (!materialBodyMap) {
-                            materialBodyMap = new Map<string, [mirabuf.IBody, Array<mirabuf.IPartInstance>]>()
+                            materialBodyMap = new Map<string, BodyInstances>()
                             batchMap.set(material, materialBodyMap)
                         }
 
+                        const levels = lods.get(instance.partDefinitionReference!)?.get(bodyIndex) ?? []
                         const partBodyGuid = this.GetPartBodyGuid(definition, body)
                         let bodyInstances = materialBodyMap.get(partBodyGuid)
                         if (!bodyInstances) {
-                            bodyInstances = [body, new Array<mirabuf.IPartInstance>()]
+                            bodyInstances = [body, new Array<mirabuf.IPartInstance>(), levels]
                             materialBodyMap.set(partBodyGuid, bodyInstances)
                         }
                         bodyInstances[1].push(instance)
 
-                        if (countMap.has(material)) {
-                            const count = countMap.get(material)!
-                            count.maxInstances += 1
-                            count.maxVertices += mesh.mesh.verts.length / 3
-                            count.maxIndices += mesh.mesh.indices.length
-                        } else {
-                            const count: BatchCounts = {
-                                maxInstances: 1,
-                                maxVertices: mesh.mesh.verts.length / 3,
-                                maxIndices: mesh.mesh.indices.length,
-                            }
-                            countMap.set(material, count)
-                        }
+                        // Every instance adds the full detail mesh and each of its levels to the batch
+                        const meshes = [mesh.mesh, ...levels.map(level => level.mesh)]
+                        const count = countMap.get(material) ?? { maxInstances: 0, maxVertices: 0, maxIndices: 0 }
+                        count.maxInstances += meshes.length
+                        count.maxVertices += meshes.reduce((sum, m) => sum + m.verts!.length / 3, 0)
+                        count.maxIndices += meshes.reduce((sum, m) => sum + m.indices!.length, 0)
+                        countMap.set(material, count)
                     }
                 }
             }
@@ -245,28 +265,75 @@ class MirabufInstance {
             batchedMesh.receiveShadow = true
 
             materialBodyMap.forEach(instances => {
-                const body = instances[0]
-                instances[1].forEach(instance => {
+                const [body, bodyInstances, levels] = instances
+                const meshes = [body.triangleMesh!.mesh!, ...levels.map(level => level.mesh)]
+                bodyInstances.forEach(instance => {
                     const mat = this._mirabufParser.globalTransforms.get(instance.info!.GUID!)!
 
-                    const geometry = new THREE.BufferGeometry()
-                    transformGeometry(geometry, body.triangleMesh!.mesh!)
-                    const geoId = batchedMesh.addGeometry(geometry)
-
-                    batchedMesh.setMatrixAt(geoId, mat)
-
                     let bodies = this._meshes.get(instance.info!.GUID!)
                     if (!bodies) {
                         bodies = new Array<[THREE.BatchedMesh, number]>()
                         this._meshes.set(instance.info!.GUID!, bodies)
                     }
 
-                    bodies.push([batchedMesh, geoId])
+                    const ids = meshes.map(mesh => {
+                        const geometry = new THREE.BufferGeometry()
+                        transformGeometry(geometry, mesh)
+                        const geoId = batchedMesh.addGeometry(geometry)
+
+                        batchedMesh.setMatrixAt(geoId, mat)
+                        bodies!.push([batchedMesh, geoId])
+                        return geoId
+                    })
+
+                    if (levels.length) {
+                        ids.slice(1).forEach(id => batchedMesh.setVisibleAt(id, false))
+
+                        const geometry = new THREE.BufferGeometry()
+                        geometry.setAttribute("position", new THREE.BufferAttribute(transformVerts(meshes[0]), 3))
+                        geometry.computeBoundingSphere()
+                        this._lodGroups.push({
+                            batch: batchedMesh,
+                            ids: ids,
+                            screenSizes: levels.map(level => level.screenSize),
+                            bounds: geometry.boundingSphere!,
+                            visible: 0,
+                        })
+                        geometry.dispose()
+                    }
                 })
             })
         })
     }
 
+    /**
+     * Shows the level of detail of every body instance that matches how much of the screen it covers.
+     *
+     * @param camera Camera the scene is rendered with.
+     */
+    public UpdateLods(camera: THREE.PerspectiveCamera) {
+        const tanHalfFov = Math.tan(THREE.MathUtils.degToRad(camera.fov) / 2)
+        this._lodGroups.forEach(group => {
+            group.batch.getMatrixAt(group.ids[0], lodMatrix)
+            lodCenter.copy(group.bounds.center).applyMatrix4(lodMatrix)
+
+            // Fraction of the screen height covered by the bounding sphere
+            const distance = Math.max(lodCenter.distanceTo(camera.position), camera.near)
+            const screenSize = group.bounds.radius / (distance * tanHalfFov)
+
+            let visible = 0
+            while (visible < group.screenSizes.length && screenSize < group.screenSizes[visible]) {
+                visible++
+            }
+
+            if (visible != group.visible) {
+                group.batch.setVisibleAt(group.ids[group.visible], false)
+                group.batch.setVisibleAt(group.ids[visible], true)
+                group.visible = visible
+            }
+        })
+    }
+
     private GetPartBodyGuid(partDef: mirabuf.IPartDefinition, body: mirabuf.IPartDefinition) {
         return `${partDef.info!.GUID!}_BODY_${body.info!.GUID!}`
     }
@@ -290,6 +357,7 @@ class MirabufInstance {
         })
         this._batches = []
         this._meshes.clear()
+        this._lodGroups = []
 
         this._materials.forEach(x => x.dispose())
         this._materials.clear()
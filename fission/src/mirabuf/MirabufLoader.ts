@@ -2,6 +2,7 @@ import { Data, downloadData } from "@/aps/APSDataManagement"
 import { mirabuf } from "@/proto/mirabuf"
 import World from "@/systems/World"
 import Pako from "pako"
+import { ExpandBinaryMeshes } from "./BinaryMesh"
 
 const MIRABUF_LOCALSTORAGE_GENERATION_KEY = "Synthesis Nonce Key"
 const MIRABUF_LOCALSTORAGE_GENERATION = "4543246"
@@ -29,13 +30,46 @@ const root = await navigator.storage.getDirectory()
 const robotFolderHandle = await root.getDirectoryHandle(robotsDirName, { create: true })
 const fieldFolderHandle = await root.getDirectoryHandle(fieldsDirName, { create: true })
 
+// Every exported assembly starts with its info, field 1 of mirabuf.Assembly
+const ASSEMBLY_INFO_TAG = 0x0a
+
+/**
+ * Decompresses a mirabuf file compressed by the exporter with gzip, zlib or raw deflate.
+ *
+ * @param {Uint8Array} buff Contents of the file.
+ *
+ * @returns {Uint8Array} Decompressed assembly, or the file itself if it isn't compressed.
+ */
 export function UnzipMira(buff: Uint8Array): Uint8Array {
     // Check if file is gzipped via magic gzip numbers 31 139
     if (buff[0] == 31 && buff[1] == 139) {
         return Pako.ungzip(buff)
-    } else {
-        return buff
     }
+
+    // zlib header, deflate with a header checksum that is a multiple of 31
+    if ((buff[0] & 0x0f) == 8 && (buff[0] * 256 + buff[1]) % 31 == 0) {
+        return Pako.inflate(buff)
+    }
+
+    if (buff[0] == 0x28 && buff[1] == 0xb5 && buff[2] == 0x2f && buff[3] == 0xfd) {
+        throw new Error("Mirabuf files compressed with zstd can't be opened, export them with gzip instead")
+    }
+
+    if (buff[0] == 0x04 && buff[1] == 0x22 && buff[2] == 0x4d && buff[3] == 0x18) {
+        throw new Error("Mirabuf files compressed with lz4 can't be opened, export them with gzip instead")
+    }
+
+    // Raw deflate has no header, anything that doesn't start like an assembly is tried as raw deflate
+    if (buff[0] != ASSEMBLY_INFO_TAG) {
+        try {
+            // Pako returns nothing instead of throwing when the data ends in the middle of a block
+            return Pako.inflateRaw(buff) ?? buff
+        } catch {
+            return buff
+        }
+    }
+
+    return buff
 }
 
 class MirabufCachingService {
@@ -347,7 +381,9 @@ class MirabufCachingService {
     }
 
     private static AssemblyFromBuffer(buffer: ArrayBuffer): mirabuf.Assembly {
-        return mirabuf.Assembly.decode(UnzipMira(new Uint8Array(buffer)))
+        const assembly = mirabuf.Assembly.decode(UnzipMira(new Uint8Array(buffer)))
+        ExpandBinaryMeshes(assembly)
+        return assembly
     }
 }
 
@@ -224,6 +224,8 @@ class MirabufSceneObject extends SceneObject {
             }
         })
 
+        this._mirabufInstance.UpdateLods(World.SceneRenderer.mainCamera)
+
         this._mirabufInstance.batches.forEach(x => {
             x.computeBoundingBox()
             x.computeBoundingSphere()
@@ -12,6 +12,7 @@ import Jolt from "@barclah/jolt-physics"
 import * as THREE from "three"
 import { mirabuf } from "../../proto/mirabuf"
 import MirabufParser, { GAMEPIECE_SUFFIX, GROUNDED_JOINT_ID, RigidNodeReadOnly } from "../../mirabuf/MirabufParser"
+import { ReadCollisionHulls } from "../../mirabuf/MeshUserData"
 import WorldSystem from "../WorldSystem"
 import Mechanism from "./Mechanism"
 import {
@@ -641,6 +642,8 @@ class PhysicsSystem extends WorldSystem {
 
         const reservedLayer: number | undefined = layerReserve?.layer
 
+        const hulls = ReadCollisionHulls(parser.assembly)
+
         filterNonPhysicsNodes([...parser.rigidNodes.values()], parser.assembly).forEach(rn => {
             const compoundShapeSettings = new JOLT.StaticCompoundShapeSettings()
             let shapesAdded = 0
@@ -668,7 +671,10 @@ class PhysicsSystem extends WorldSystem {
                         parser.assembly.data!.parts!.partDefinitions![partInstance.partDefinitionReference!]!
 
                     const partShapeResult = rn.isDynamic
-                        ? this.CreateConvexShapeSettingsFromPart(partDefinition)
+                        ? this.CreateConvexShapeSettingsFromPart(
+                              partDefinition,
+                              hulls.get(partInstance.partDefinitionReference!)
+                          )
                         : this.CreateConcaveShapeSettingsFromPart(partDefinition)
 
                     if (partShapeResult) {
@@ -744,10 +750,12 @@ class PhysicsSystem extends WorldSystem {
      * Creates the Jolt ShapeSettings for a given part using the Part Definition of said part.
      *
      * @param   partDefinition  Definition of the part to create.
+     * @param   hulls           Convex hulls the exporter built for the bodies of the part, by body index.
      * @returns If successful, the created convex hull shape settings from the given Part Definition.
      */
     private CreateConvexShapeSettingsFromPart(
-        partDefinition: mirabuf.IPartDefinition
+        partDefinition: mirabuf.IPartDefinition,
+        hulls?: Map<number, mirabuf.Mesh>
     ): [Jolt.ShapeSettings, Jolt.Vec3, Jolt.Vec3] | undefined | null {
         const settings = new JOLT.ConvexHullShapeSettings()
 
@@ -755,10 +763,11 @@ class PhysicsSystem extends WorldSystem {
         const max = new JOLT.Vec3(-1000000.0, -1000000.0, -1000000.0)
 
         const points = settings.mPoints
-        partDefinition.bodies!.forEach(body => {
-            if (body.triangleMesh && body.triangleMesh.mesh && body.triangleMesh.mesh.verts) {
-                const vertArr = body.triangleMesh.mesh.verts
-                for (let i = 0; i < body.triangleMesh.mesh.verts.length; i += 3) {
+        partDefinition.bodies!.forEach((body, index) => {
+            // Hull vertices are all the shape needs, and there are far fewer of them than of the render mesh
+            const vertArr = hulls?.get(index)?.verts ?? body.triangleMesh?.mesh?.verts
+            if (vertArr) {
+                for (let i = 0; i < vertArr.length; i += 3) {
                     const vert = MirabufFloatArr_JoltVec3(vertArr, i)
                     points.push_back(vert)
                     this.UpdateMinMaxBounds(vert, min, max)
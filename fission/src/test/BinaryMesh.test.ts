@@ -0,0 +1,77 @@
+import { describe, test, expect } from "vitest"
+import { mirabuf } from "../proto/mirabuf"
+import { DecodeBinaryMesh, ExpandBinaryMeshes } from "../mirabuf/BinaryMesh"
+
+// Written by MeshEncoding.encodeBinaryMesh in the exporter, with the meshes of its tests/test_MeshEncoding.py
+const FULL_MESH =
+    "TVFNMQMAAAAFAAAADAAAAAAAAAAAAAAAAAAAP4AAADiAAIA3AAAAAAAAAAAAAAAAgACAN4AAgDcAAAAAAAD//wAAAAD/////AAAAAP//AAAAgACAAAAAAAAAAAAAANs2AAAkSQGAd6XmYwAAAAD//wAA/////wAA//8AgACACAEBBAUBAAQBBAUI"
+const POSITIONS_ONLY_MESH =
+    "TVFNMQAAAAAFAAAACQAAAAAAAAAAAAAAAAAAP4AAADiAAIA3AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAD//wAAAAD/////AAAAAP//AAAAgACAAAAA4MUI3cUI1gQB1QT+////D/3///8PCg=="
+
+// Flat square at z = 0.5, the quad indices run backwards and the last triangle jumps far back
+const VERTS = [0, 0, 0.5, 2, 0, 0.5, 2, 1, 0.5, 0, 1, 0.5, 1, 0.5, 0.5]
+const NORMALS = [0, 0, 1, 0, 0, 1, 0.6, 0, 0.8, 0, -0.6, -0.8, -0.36, 0.48, -0.8]
+const UV = [0, 0, 1, 0, 1, 1, 0, 1, 0.5, 0.5]
+const INDICES = [4, 3, 2, 4, 1, 0, 0, 2, 1, 3, 0, 4]
+
+function fixture(encoded: string): Uint8Array {
+    return Uint8Array.from(atob(encoded), c => c.charCodeAt(0))
+}
+
+function expectClose(actual: number[], expected: number[], tolerance: number) {
+    expect(actual.length).toBe(expected.length)
+    actual.forEach((value, i) => expect(Math.abs(value - expected[i])).toBeLessThanOrEqual(tolerance))
+}
+
+describe("Binary Mesh", () => {
+    test("Decode with normals and uvs", () => {
+        const mesh = DecodeBinaryMesh(fixture(FULL_MESH))
+
+        expectClose(mesh.verts, VERTS, 2 / 65535)
+        // Nothing to quantize across a flat axis, so it decodes exactly
+        expect(mesh.verts.filter((_, i) => i % 3 == 2)).toEqual([0.5, 0.5, 0.5, 0.5, 0.5])
+        expectClose(mesh.normals, NORMALS, 1e-3)
+        expectClose(mesh.uv, UV, 1 / 65535)
+        expect(mesh.indices).toEqual(INDICES)
+    })
+
+    test("Decode without normals and uvs", () => {
+        const mesh = DecodeBinaryMesh(fixture(POSITIONS_ONLY_MESH))
+
+        expectClose(mesh.verts, VERTS, 2 / 65535)
+        expect(mesh.normals).toEqual([])
+        expect(mesh.uv).toEqual([])
+        // Deltas that take several varint bytes, in both directions
+        expect(mesh.indices).toEqual([0, 70000, 1, 300, 299, 0, 2 ** 31 - 1, 0, 5])
+    })
+
+    test("Decode from the middle of a buffer", () => {
+        // Decoded protobuf bytes are views into the whole file, at any offset
+        const data = fixture(FULL_MESH)
+        const file = new Uint8Array(data.length + 1)
+        file.set(data, 1)
+
+        expect(DecodeBinaryMesh(file.subarray(1)).indices).toEqual(INDICES)
+    })
+
+    test("Reject unknown formats", () => {
+        expect(() => DecodeBinaryMesh(new Uint8Array(56))).toThrow("Unknown binary mesh format")
+    })
+
+    test("Expand the binary meshes of an assembly", () => {
+        const assembly = new mirabuf.Assembly({
+            data: {
+                parts: {
+                    partDefinitions: {
+                        part: { bodies: [{ triangleMesh: { bmesh: { data: fixture(FULL_MESH) } } }] },
+                    },
+                },
+            },
+        })
+        ExpandBinaryMeshes(assembly)
+
+        const triangleMesh = assembly.data!.parts!.partDefinitions!["part"].bodies![0].triangleMesh!
+        expect(triangleMesh.bmesh).toBeNull()
+        expect(triangleMesh.mesh!.indices).toEqual(INDICES)
+    })
+})
@@ -0,0 +1,64 @@
+import { describe, test, expect } from "vitest"
+import { mirabuf } from "../proto/mirabuf"
+import { ReadCollisionHulls, ReadLods } from "../mirabuf/MeshUserData"
+
+function encodeMesh(mesh: mirabuf.IMesh): string {
+    const data = mirabuf.TriangleMesh.encode(new mirabuf.TriangleMesh({ mesh: mesh })).finish()
+    return btoa(String.fromCharCode(...data))
+}
+
+function assemblyWithUserData(data: Record<string, string>): mirabuf.Assembly {
+    return new mirabuf.Assembly({ data: { parts: { userData: { data: data } } } })
+}
+
+describe("Mesh User Data", () => {
+    const triangle = { verts: [0, 0, 0, 1, 0, 0, 0, 1, 0], normals: [0, 0, 1, 0, 0, 1, 0, 0, 1], indices: [0, 1, 2] }
+
+    test("Read levels of detail", () => {
+        const levels = {
+            levels: [
+                { screenSize: 0.3, triangles: 1, mesh: encodeMesh(triangle) },
+                { screenSize: 0.1, triangles: 1, mesh: encodeMesh({ ...triangle, indices: [0, 2, 1] }) },
+            ],
+        }
+        const lods = ReadLods(
+            assemblyWithUserData({
+                "lod/part/with/slashes/1": JSON.stringify(levels),
+                "collision/part": "{}",
+                "unrelated": "value",
+            })
+        )
+
+        expect([...lods.keys()]).toEqual(["part/with/slashes"])
+        const body = lods.get("part/with/slashes")!.get(1)!
+        expect(body.map(level => level.screenSize)).toEqual([0.3, 0.1])
+        expect(body[0].mesh.verts).toEqual(triangle.verts)
+        expect(body[1].mesh.indices).toEqual([0, 2, 1])
+    })
+
+    test("Skip unreadable levels of detail", () => {
+        const lods = ReadLods(assemblyWithUserData({ "lod/part/0": "not json" }))
+        expect(lods.size).toBe(0)
+    })
+
+    test("Read collision hulls", () => {
+        const tetrahedron = { verts: [...triangle.verts, 0, 0, 1], indices: [0, 2, 1, 0, 1, 3, 1, 2, 3, 2, 0, 3] }
+        const hulls = ReadCollisionHulls(
+            assemblyWithUserData({
+                "collision/part/with/slashes": JSON.stringify({ hulls: [{ body: 2, mesh: encodeMesh(tetrahedron) }] }),
+                "collision/broken": "not json",
+                "lod/part/0": "{}",
+            })
+        )
+
+        expect([...hulls.keys()]).toEqual(["part/with/slashes"])
+        const bodies = hulls.get("part/with/slashes")!
+        expect([...bodies.keys()]).toEqual([2])
+        expect(bodies.get(2)!.verts).toEqual(tetrahedron.verts)
+    })
+
+    test("Assembly without user data", () => {
+        expect(ReadLods(new mirabuf.Assembly()).size).toBe(0)
+        expect(ReadCollisionHulls(new mirabuf.Assembly()).size).toBe(0)
+    })
+})
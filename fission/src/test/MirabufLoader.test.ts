@@ -0,0 +1,60 @@
+import { describe, test, expect } from "vitest"
+import Pako from "pako"
+import { mirabuf } from "../proto/mirabuf"
+import { UnzipMira } from "../mirabuf/MirabufLoader"
+
+describe("Unzip Mira", () => {
+    const assembly = mirabuf.Assembly.encode(new mirabuf.Assembly({ info: { name: "Robot" }, dynamic: true })).finish()
+
+    test("Uncompressed assembly", () => {
+        expect(UnzipMira(assembly)).toEqual(assembly)
+    })
+
+    test("Gzip", () => {
+        expect(UnzipMira(Pako.gzip(assembly))).toEqual(assembly)
+    })
+
+    test("Zlib", () => {
+        // The level changes the second byte of the header, which has to keep the header a multiple of 31
+        for (const level of [0, 1, 6, 9] as const) {
+            expect(UnzipMira(Pako.deflate(assembly, { level: level }))).toEqual(assembly)
+        }
+    })
+
+    test("Raw deflate", () => {
+        expect(UnzipMira(Pako.deflateRaw(assembly))).toEqual(assembly)
+        expect(UnzipMira(Pako.deflateRaw(assembly, { level: 0 }))).toEqual(assembly)
+    })
+
+    test("Raw deflate starting like a zlib header", () => {
+        // A stored block whose unused header bits are set, so the first byte has the deflate method of a zlib header
+        const length = assembly.length
+        expect((0x08 * 256 + (length & 0xff)) % 31).not.toBe(0)
+        const compressed = new Uint8Array([
+            0x08,
+            length & 0xff,
+            length >> 8,
+            ~length & 0xff,
+            (~length >> 8) & 0xff,
+            ...assembly,
+            // Empty final stored block
+            0x01,
+            0x00,
+            0x00,
+            0xff,
+            0xff,
+        ])
+
+        expect(UnzipMira(compressed)).toEqual(assembly)
+    })
+
+    test("Data that isn't compressed is returned unchanged", () => {
+        const data = new Uint8Array([0x08, 0x01, 0x02, 0x03])
+        expect(UnzipMira(data)).toEqual(data)
+    })
+
+    test("Zstd and lz4 are rejected", () => {
+        expect(() => UnzipMira(new Uint8Array([0x28, 0xb5, 0x2f, 0xfd, 0x00]))).toThrow("zstd")
+        expect(() => UnzipMira(new Uint8Array([0x04, 0x22, 0x4d, 0x18, 0x00]))).toThrow("lz4")
+    })
+})